@@ -1,8 +1,12 @@
 import os
 import logging
-from flask import Flask, render_template, g, session, redirect, url_for  # <-- Import g, session, redirect, url_for
+from flask import Flask, render_template, g, session, redirect, url_for, jsonify  # <-- Import g, session, redirect, url_for
 from .extensions import db, migrate
-from .utils import load_user_into_g  # <-- Import the new function
+from .utils import RequestGlobals
+from .sessions import init_sessions
+from .instrumentation import init_instrumentation
+from .metrics import init_metrics
+from .profiling import init_profiling
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +18,8 @@ def env_to_bool(name, default=False):
 
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
+    # g.user / g.fit_integrated load lazily, once per request
+    app.app_ctx_globals_class = RequestGlobals
     try:
         app.config.from_pyfile("config.py", silent=True)
     except Exception:
@@ -37,6 +43,18 @@ def create_app(test_config=None):
     app.config["GOOGLE_OAUTH_CLIENT_SECRET"] = os.environ.get("GOOGLE_OAUTH_CLIENT_SECRET", app.config.get("GOOGLE_OAUTH_CLIENT_SECRET"))
     app.config["GOOGLE_OAUTH_REDIRECT_URI"] = os.environ.get("GOOGLE_OAUTH_REDIRECT_URI", app.config.get("GOOGLE_OAUTH_REDIRECT_URI"))
     app.config["GOOGLE_OAUTH_CLIENT_CONFIG_JSON"] = os.environ.get("GOOGLE_OAUTH_CLIENT_CONFIG_JSON", app.config.get("GOOGLE_OAUTH_CLIENT_CONFIG_JSON"))
+    app.config["ADMIN_EMAILS"] = os.environ.get("ADMIN_EMAILS", app.config.get("ADMIN_EMAILS", ""))
+    if test_config:
+        app.config.update(test_config)
+
+    # the cookie holds a signed session id; the session lives in SESSION_STORE_PATH
+    init_sessions(app)
+    # per-request SQL counts and timings; see instrumentation.py
+    init_instrumentation(app)
+    # request latency histograms and in-flight gauges, scraped from /metrics
+    init_metrics(app)
+    # cProfile around requests that ask for it (signed X-Profile header) or are sampled; off by default
+    init_profiling(app)
 
     try:
         db.init_app(app)
@@ -48,12 +66,6 @@ def create_app(test_config=None):
     except Exception:
         logger.debug("Flask-Migrate not configured or init failed (continuing)")
 
-    # --- NEW: Add before_request handler ---
-    @app.before_request
-    def before_request_hook():
-        load_user_into_g()
-    # ---------------------------------------
-
     try:
         from .google_fit import google_fit_bp
         app.register_blueprint(google_fit_bp, url_prefix="/google-fit")
@@ -72,6 +84,18 @@ def create_app(test_config=None):
         logger.info("Registered blueprint 'leaderboard' at /leaderboard")
     except Exception:
         logger.exception("Failed to import/register 'leaderboard' blueprint")
+    try:
+        from .groups import groups_bp
+        app.register_blueprint(groups_bp, url_prefix="/groups")
+        logger.info("Registered blueprint 'groups' at /groups")
+    except Exception:
+        logger.exception("Failed to import/register 'groups' blueprint")
+    try:
+        from .profiling import profiles_bp
+        app.register_blueprint(profiles_bp, url_prefix="/admin/profiles")
+        logger.info("Registered blueprint 'profiles' at /admin/profiles")
+    except Exception:
+        logger.exception("Failed to import/register 'profiles' blueprint")
     try:
         from .auth import auth_bp
         app.register_blueprint(auth_bp)
@@ -91,6 +115,29 @@ def create_app(test_config=None):
     except Exception:
         logger.exception("Failed to import/register 'activities' blueprint")
 
+    if env_to_bool("PRELOAD_MODEL", default=False):
+        try:
+            from .nutrition import preload_target_model
+            preload_target_model()
+        except Exception:
+            logger.exception("Model preload failed (continuing; it will load lazily)")
+
+    @app.route("/healthz/ready")
+    def readiness():
+        from .nutrition import load_target_model, model_status, target_memo_stats
+        from .leaderboard_engine import engine_status
+        from .leaderboard_stream import stream_status
+        load_target_model()
+        status = model_status()
+        payload = {"ready": status["ready"], "model": status, "target_memo": target_memo_stats(),
+                   "leaderboard_engine": engine_status(), "leaderboard_stream": stream_status()}
+        return jsonify(payload), (200 if status["ready"] else 503)
+
+    @app.route("/metrics")
+    def metrics():
+        from .metrics import render
+        return render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
     @app.route("/")
     def index():
         # --- UPDATED: Redirect if logged in ---
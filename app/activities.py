@@ -1,9 +1,12 @@
 from flask import Blueprint, request, render_template, redirect, url_for, flash, current_app
 from .extensions import db
-from .models import Activity, FitnessData, LifestylePoint
-from .utils import login_required, get_current_user
+from .models import Activity, FitnessData, LifestylePoint, DailyAggregate
+from .utils import login_required, get_current_user, upsert
+from .leaderboard import apply_points_delta
+from .signals import lifestyle_points_changed
 from datetime import datetime, date
-from sqlalchemy import func
+from sqlalchemy import func, case, select, update
+import numpy as np
 
 activities_bp = Blueprint("activities", __name__, template_folder="templates")
 
@@ -11,79 +14,245 @@ def _server_now():
     now = datetime.now()
     return now.date(), now.time()
 
-def compute_lifestyle_points_for_user_date(user_id, target_date):
+def lifestyle_points_from_totals(activity_minutes=0.0, activity_kcal=0.0, fit_kcal=None, avg_bpm=None, sleep_hours=None):
+    """Score one day from its totals. Pure: returns (points, reason_text)."""
     points = 0.0
     reasons = []
-    activities = Activity.query.filter_by(user_id=user_id, date=target_date).all()
-    total_activity_minutes = 0.0
-    total_activity_calories = 0.0
-    for a in activities:
-        try:
-            if a.duration_minutes:
-                total_activity_minutes += float(a.duration_minutes)
-            if a.calories_burned:
-                total_activity_calories += float(a.calories_burned)
-        except Exception:
-            continue
-    activity_points = (total_activity_minutes / 30.0) * 10.0 + (total_activity_calories / 100.0) * 2.0
+    activity_points = (float(activity_minutes or 0.0) / 30.0) * 10.0 + (float(activity_kcal or 0.0) / 100.0) * 2.0
     if activity_points:
         points += activity_points
         reasons.append(f"activity:{activity_points:.1f}")
-    fd = FitnessData.query.filter_by(user_id=user_id, date=target_date).first()
-    if fd:
-        if fd.avg_bpm is not None:
-            try:
-                bpm = float(fd.avg_bpm)
-                bpm_pts = 0.0
-                if 60 <= bpm < 90:
-                    bpm_pts = 2.0
-                elif 90 <= bpm < 110:
-                    bpm_pts = 6.0
-                elif bpm >= 110:
-                    bpm_pts = 3.0
-                points += bpm_pts
-                reasons.append(f"bpm:{bpm_pts:.1f}")
-            except Exception:
-                pass
-        if fd.sleep_hours is not None:
-            try:
-                sh = float(fd.sleep_hours)
+    if avg_bpm is not None:
+        try:
+            bpm = float(avg_bpm)
+            bpm_pts = 0.0
+            if 60 <= bpm < 90:
+                bpm_pts = 2.0
+            elif 90 <= bpm < 110:
+                bpm_pts = 6.0
+            elif bpm >= 110:
+                bpm_pts = 3.0
+            points += bpm_pts
+            reasons.append(f"bpm:{bpm_pts:.1f}")
+        except Exception:
+            pass
+    if sleep_hours is not None:
+        try:
+            sh = float(sleep_hours)
+            sleep_pts = 0.0
+            if 7.0 <= sh <= 9.0:
+                sleep_pts = 20.0
+            elif 6.0 <= sh < 7.0 or 9.0 < sh <= 10.0:
+                sleep_pts = 10.0
+            else:
                 sleep_pts = 0.0
-                if 7.0 <= sh <= 9.0:
-                    sleep_pts = 20.0
-                elif 6.0 <= sh < 7.0 or 9.0 < sh <= 10.0:
-                    sleep_pts = 10.0
-                else:
-                    sleep_pts = 0.0
-                points += sleep_pts
-                reasons.append(f"sleep:{sleep_pts:.1f}")
-            except Exception:
-                pass
-        if fd.calories_burned:
-            try:
-                cal = float(fd.calories_burned)
-                fd_cal_pts = (cal / 200.0) * 2.0
-                points += fd_cal_pts
-                reasons.append(f"fitcal:{fd_cal_pts:.1f}")
-            except Exception:
-                pass
-    points = round(points, 1)
-    reason_text = ", ".join(reasons) if reasons else None
-    lp = LifestylePoint.query.filter_by(user_id=user_id, date=target_date).first()
-    if not lp:
-        lp = LifestylePoint(user_id=user_id, date=target_date, points=points, reason=reason_text)
-        db.session.add(lp)
+            points += sleep_pts
+            reasons.append(f"sleep:{sleep_pts:.1f}")
+        except Exception:
+            pass
+    if fit_kcal:
+        try:
+            cal = float(fit_kcal)
+            fd_cal_pts = (cal / 200.0) * 2.0
+            points += fd_cal_pts
+            reasons.append(f"fitcal:{fd_cal_pts:.1f}")
+        except Exception:
+            pass
+    return round(points, 1), (", ".join(reasons) if reasons else None)
+
+def lifestyle_points_from_totals_batch(activity_minutes, activity_kcal, fit_kcal, avg_bpm, sleep_hours):
+    """
+    lifestyle_points_from_totals() over arrays, one element per day. Missing values
+    are NaN. Components are added in the scalar order so the float results match;
+    returns (points list, reason list).
+    """
+    minutes = np.nan_to_num(np.asarray(activity_minutes, dtype=float))
+    kcal = np.nan_to_num(np.asarray(activity_kcal, dtype=float))
+    fit = np.asarray(fit_kcal, dtype=float)
+    bpm = np.asarray(avg_bpm, dtype=float)
+    sleep = np.asarray(sleep_hours, dtype=float)
+
+    activity_pts = (minutes / 30.0) * 10.0 + (kcal / 100.0) * 2.0
+    has_bpm = ~np.isnan(bpm)
+    bpm_pts = np.select([(bpm >= 60) & (bpm < 90), (bpm >= 90) & (bpm < 110), bpm >= 110], [2.0, 6.0, 3.0], 0.0)
+    has_sleep = ~np.isnan(sleep)
+    sleep_pts = np.select([(sleep >= 7.0) & (sleep <= 9.0),
+                           ((sleep >= 6.0) & (sleep < 7.0)) | ((sleep > 9.0) & (sleep <= 10.0))], [20.0, 10.0], 0.0)
+    has_fit = ~np.isnan(fit) & (fit != 0)
+    fit_pts = np.where(has_fit, (np.nan_to_num(fit) / 200.0) * 2.0, 0.0)
+
+    total = activity_pts + np.where(has_bpm, bpm_pts, 0.0)
+    total = total + np.where(has_sleep, sleep_pts, 0.0)
+    total = total + fit_pts
+
+    points, reasons = [], []
+    for p, a, hb, b, hs, sp, hf, f in zip(total.tolist(), activity_pts.tolist(), has_bpm.tolist(), bpm_pts.tolist(),
+                                          has_sleep.tolist(), sleep_pts.tolist(), has_fit.tolist(), fit_pts.tolist()):
+        parts = []
+        if a:
+            parts.append(f"activity:{a:.1f}")
+        if hb:
+            parts.append(f"bpm:{b:.1f}")
+        if hs:
+            parts.append(f"sleep:{sp:.1f}")
+        if hf:
+            parts.append(f"fitcal:{f:.1f}")
+        points.append(round(p, 1))
+        reasons.append(", ".join(parts) if parts else None)
+    return points, reasons
+
+def totals_from_rows(user_id, target_date):
+    """Full recompute of a day's totals from the Activity and FitnessData tables."""
+    count, minutes, kcal = db.session.query(
+        func.count(Activity.id),
+        func.coalesce(func.sum(Activity.duration_minutes), 0.0),
+        func.coalesce(func.sum(Activity.calories_burned), 0.0),
+    ).filter(Activity.user_id == user_id, Activity.date == target_date).one()
+    fd = FitnessData.query.filter_by(user_id=user_id, date=target_date).first()
+    return {
+        "activity_count": int(count or 0),
+        "activity_minutes": float(minutes or 0.0),
+        "activity_kcal": float(kcal or 0.0),
+        "fit_kcal": fd.calories_burned if fd else None,
+        "avg_bpm": fd.avg_bpm if fd else None,
+        "sleep_hours": fd.sleep_hours if fd else None,
+    }
+
+_AGG_FIELDS = ("activity_count", "activity_minutes", "activity_kcal", "fit_kcal", "avg_bpm", "sleep_hours")
+
+def _day(model, user_id, target_date):
+    return (model.user_id == user_id) & (model.date == target_date)
+
+def _seed_aggregate(user_id, target_date):
+    """Insert the day's aggregate from the tables. Returns False if another writer already created it."""
+    row = upsert(DailyAggregate, {"user_id": user_id, "date": target_date, **totals_from_rows(user_id, target_date)},
+                 update_fields=(), returning=True)
+    return row is not None
+
+def _apply_aggregate_delta(user_id, target_date, values):
+    """UPDATE the day's aggregate, seeding it from the tables if it doesn't exist yet."""
+    where = _day(DailyAggregate, user_id, target_date)
+    if db.session.execute(update(DailyAggregate.__table__).where(where).values(**values)).rowcount:
+        return
+    if not _seed_aggregate(user_id, target_date):
+        # lost the race to seed: the other writer's seed can't include our uncommitted change
+        db.session.execute(update(DailyAggregate.__table__).where(where).values(**values))
+
+def record_activity_change(activity, sign=1):
+    """
+    Apply one Activity insert (sign=1) or delete (sign=-1) to its day's aggregate.
+    Call once the change is flushed: a day without an aggregate is seeded from the
+    tables, which then already reflect it. Deltas are applied in SQL so concurrent
+    writers don't lose updates; the sums reset exactly when the last activity goes.
+    """
+    minutes = float(activity.duration_minutes or 0.0)
+    kcal = float(activity.calories_burned or 0.0)
+    if sign > 0:
+        values = {
+            "activity_count": DailyAggregate.activity_count + 1,
+            "activity_minutes": DailyAggregate.activity_minutes + minutes,
+            "activity_kcal": DailyAggregate.activity_kcal + kcal,
+        }
     else:
-        lp.points = points
-        lp.reason = reason_text
+        emptied = DailyAggregate.activity_count <= 1
+        values = {
+            "activity_count": case((emptied, 0), else_=DailyAggregate.activity_count - 1),
+            "activity_minutes": case((emptied, 0.0), else_=DailyAggregate.activity_minutes - minutes),
+            "activity_kcal": case((emptied, 0.0), else_=DailyAggregate.activity_kcal - kcal),
+        }
+    values["updated_at"] = datetime.utcnow()
+    _apply_aggregate_delta(activity.user_id, activity.date, values)
+
+def record_fitness_change(fd):
+    """Copy an upserted FitnessData row (model or result row) onto its day's aggregate."""
+    _apply_aggregate_delta(fd.user_id, fd.date, {
+        "fit_kcal": fd.calories_burned, "avg_bpm": fd.avg_bpm, "sleep_hours": fd.sleep_hours,
+        "updated_at": datetime.utcnow(),
+    })
+
+def aggregate_totals(user_id, target_date):
+    """The day's aggregate totals, seeding the row on first use."""
+    cols = [getattr(DailyAggregate, f) for f in _AGG_FIELDS]
+    row = db.session.execute(select(*cols).where(_day(DailyAggregate, user_id, target_date))).first()
+    if row is None:
+        _seed_aggregate(user_id, target_date)
+        row = db.session.execute(select(*cols).where(_day(DailyAggregate, user_id, target_date))).first()
+    return dict(zip(_AGG_FIELDS, row))
+
+def _points_for_day(user_id, target_date):
+    t = aggregate_totals(user_id, target_date)
+    points, reason_text = lifestyle_points_from_totals(t["activity_minutes"], t["activity_kcal"],
+                                                       t["fit_kcal"], t["avg_bpm"], t["sleep_hours"])
+    return {"user_id": user_id, "date": target_date, "points": points, "reason": reason_text}
+
+def compute_lifestyle_points_for_user_date(user_id, target_date):
+    """Derive the day's points from its aggregate, upsert them and move the leaderboard rollups by the change."""
+    points = None
     try:
+        # lock the day's points row before reading the aggregate, so concurrent writers
+        # derive their points and rollup deltas in turn and the last one sees every
+        # committed change. A no-op UPDATE takes the lock (SQLite's write lock as well).
+        lock = (update(LifestylePoint.__table__).where(_day(LifestylePoint, user_id, target_date))
+                .values(updated_at=LifestylePoint.updated_at).returning(LifestylePoint.points))
+        row = db.session.execute(lock).first()
+        values = _points_for_day(user_id, target_date)
+        if row is None and upsert(LifestylePoint, values, update_fields=(), returning=True) is not None:
+            old = None
+        else:
+            if row is None:
+                # lost the race to insert the day's row: wait for the winner's, then start over from it
+                row = db.session.execute(lock).first()
+                values = _points_for_day(user_id, target_date)
+            upsert(LifestylePoint, values)
+            old = row[0]
+        points = values["points"]
+        delta = points - float(old or 0.0)
+        apply_points_delta(user_id, target_date, delta)
         db.session.commit()
     except Exception:
         db.session.rollback()
         current_app.logger.exception("Failed to commit LifestylePoint upsert")
+        return points
 
+    if delta or old is None:
+        try:
+            lifestyle_points_changed.send(current_app._get_current_object(), user_id=user_id, date=target_date,
+                                          points=points, delta=delta)
+        except Exception:
+            current_app.logger.exception("lifestyle_points_changed receiver failed")
     return points
 
+def check_daily_aggregates(user_id=None, fix=False, tolerance=1e-6):
+    """
+    Compare every stored aggregate (optionally one user's) with a full recompute.
+    Returns a list of mismatches; with fix=True the aggregate is overwritten with
+    the recomputed totals and the day's points are refreshed.
+    """
+    q = db.session.query(DailyAggregate.id, DailyAggregate.user_id, DailyAggregate.date)
+    if user_id is not None:
+        q = q.filter(DailyAggregate.user_id == user_id)
+    mismatches = []
+    for agg_id, uid, day in q.order_by(DailyAggregate.id.asc()).all():
+        agg = db.session.get(DailyAggregate, agg_id, populate_existing=True)
+        stored, expected = agg.totals(), totals_from_rows(uid, day)
+        diff = {}
+        for key, want in expected.items():
+            have = stored[key]
+            if want is None or have is None:
+                same = want is None and have is None
+            else:
+                same = abs(float(have) - float(want)) <= tolerance
+            if not same:
+                diff[key] = {"aggregate": have, "recomputed": want}
+        if not diff:
+            continue
+        mismatches.append({"user_id": uid, "date": day.isoformat(), "fields": diff})
+        if fix:
+            for key, want in expected.items():
+                setattr(agg, key, want)
+            compute_lifestyle_points_for_user_date(uid, day)
+    return mismatches
+
 @activities_bp.route("/", methods=["GET"])
 @login_required
 def index():
@@ -141,44 +310,40 @@ def add_activity():
         )
         try:
             db.session.add(a)
+            db.session.flush()
+            record_activity_change(a, 1)
             db.session.commit()
             flash("Activity logged.", "success")
         except Exception:
             db.session.rollback()
             current_app.logger.exception("Failed to save Activity")
             flash("Failed to save activity (server error).", "danger")
-    fd = FitnessData.query.filter_by(user_id=user.id, date=now_date).first()
-    created_fd = False
-    if not fd:
-        fd = FitnessData(user_id=user.id, date=now_date, calories_burned=0.0)
-        created_fd = True
-
-    updated = False
+    fields = {}
     if bpm:
         try:
-            fd.avg_bpm = float(bpm)
-            updated = True
+            fields["avg_bpm"] = float(bpm)
         except Exception:
             current_app.logger.debug("Invalid bpm input: %s", bpm)
 
     if sleep_hours:
         try:
-            fd.sleep_hours = float(sleep_hours)
-            updated = True
+            fields["sleep_hours"] = float(sleep_hours)
         except Exception:
             current_app.logger.debug("Invalid sleep input: %s", sleep_hours)
     if request.form.get("fd_calories"):
         try:
-            fd.calories_burned = float(request.form.get("fd_calories"))
-            updated = True
+            fields["calories_burned"] = float(request.form.get("fd_calories"))
         except Exception:
             current_app.logger.debug("Invalid fd_calories input")
 
     try:
-        if created_fd:
-            db.session.add(fd)
-        if updated or created_fd:
-            db.session.commit()
+        # creates the day's row or updates just the submitted fields; None when nothing changed
+        fd = upsert(FitnessData, {"user_id": user.id, "date": now_date, "calories_burned": 0.0, **fields},
+                    update_fields=tuple(fields), returning=True)
+        if fd is not None:
+            record_fitness_change(fd)
+        db.session.commit()
+        if fd is not None:
             flash("Fitness summary updated.", "success")
     except Exception:
         db.session.rollback()
@@ -201,6 +366,8 @@ def delete_activity(activity_id):
     try:
         date_of = a.date
         db.session.delete(a)
+        db.session.flush()
+        record_activity_change(a, -1)
         db.session.commit()
         flash("Activity removed.", "success")
     except Exception:
@@ -195,6 +195,9 @@ def login():
         flash(msg, "danger")
         return redirect(url_for("auth.login"))
 
+    if hasattr(session, "regenerate"):
+        # new session id on login, so an id planted before it is worthless after
+        session.regenerate()
     session["user_id"] = user.id
     if request.is_json:
         return jsonify({"ok": True, "user": {"id": user.id, "email": user.email}}), 200
@@ -204,7 +207,10 @@ def login():
 
 @auth_bp.route("/logout", methods=["POST", "GET"])
 def logout():
-    session.pop("user_id", None)
+    # drop everything, OAuth state and tokens included, not just the login
+    session.clear()
+    if hasattr(session, "regenerate"):
+        session.regenerate()
     if request.is_json:
         return jsonify({"ok": True}), 200
     flash("Logged out.", "success")
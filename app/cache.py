@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INSTANCE_DIR = os.path.join(os.getcwd(), "instance")
+
+NUTRITION_CACHE_PATH = os.environ.get("NUTRITION_CACHE_PATH", os.path.join(INSTANCE_DIR, "nutrition_cache.sqlite3"))
+NUTRITION_CACHE_TTL = float(os.environ.get("NUTRITION_CACHE_TTL", 7 * 24 * 3600))
+NUTRITION_CACHE_NEGATIVE_TTL = float(os.environ.get("NUTRITION_CACHE_NEGATIVE_TTL", 3600))
+NUTRITION_CACHE_MAX_ENTRIES = int(os.environ.get("NUTRITION_CACHE_MAX_ENTRIES", 20000))
+NUTRITION_CACHE_ENABLED = str(os.environ.get("NUTRITION_CACHE_ENABLED", "1")).strip().lower() in ("1", "true", "yes")
+
+LEADERBOARD_CACHE_PATH = os.environ.get("LEADERBOARD_CACHE_PATH", os.path.join(INSTANCE_DIR, "leaderboard_cache.sqlite3"))
+LEADERBOARD_CACHE_TTL = float(os.environ.get("LEADERBOARD_CACHE_TTL", 300))
+LEADERBOARD_CACHE_ENABLED = str(os.environ.get("LEADERBOARD_CACHE_ENABLED", "1")).strip().lower() in ("1", "true", "yes")
+
+# hit/miss counts and LRU touches are written in batches: with the next set(), or
+# from a lookup once this many seconds or CACHE_FLUSH_EVERY of them have piled up
+CACHE_FLUSH_SECONDS = float(os.environ.get("CACHE_FLUSH_SECONDS", 5.0))
+CACHE_FLUSH_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (namespace, accessed_at);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cache_generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def normalize_query(text: Optional[str]) -> str:
+    """Canonical cache key for free-text food queries ("  1  Banana " -> "1 banana")."""
+    if not text:
+        return ""
+    return " ".join(str(text).lower().split())
+
+
+class SQLiteCache:
+    """
+    Small key/value cache stored in a SQLite file so every gunicorn worker on the
+    box shares the same entries. Entries expire after a TTL and the least recently
+    used ones are evicted once a namespace grows past max_entries. A stored value
+    of None is a negative entry ("looked up, nothing found") and is a cache hit.
+    Lookups only read: each process counts its hits and misses and remembers the
+    keys it read, and writes them in batches, so stats() and the LRU order lag a
+    little behind other processes. delete_where() and clear() bump the namespace's
+    generation, so a value computed before an invalidation can be stored with
+    set(if_generation=...) and is dropped instead of outliving it.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int,
+                 negative_ttl: Optional[float] = None, enabled: bool = True):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl if negative_ttl is not None else ttl)
+        self.max_entries = int(max_entries)
+        self.enabled = enabled
+        self._local = threading.local()
+        self._schema_ready = False
+        self._pending_lock = threading.Lock()
+        self._pending = self._new_pending()
+
+    def _connect(self) -> sqlite3.Connection:
+        # one connection per thread, re-opened after fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _new_pending() -> Dict[str, Any]:
+        return {"pid": os.getpid(), "hits": 0, "misses": 0, "touched": {}, "since": time.monotonic()}
+
+    def _note(self, outcome: str, key: Optional[str] = None, now: Optional[float] = None) -> None:
+        with self._pending_lock:
+            pending = self._pending
+            if pending["pid"] != os.getpid():
+                pending = self._pending = self._new_pending()
+            pending[outcome] += 1
+            if key is not None:
+                pending["touched"][key] = now
+            due = (pending["hits"] + pending["misses"] >= CACHE_FLUSH_EVERY
+                   or time.monotonic() - pending["since"] >= CACHE_FLUSH_SECONDS)
+        if due:
+            try:
+                with self._transaction() as conn:
+                    self._write_pending(conn)
+            except Exception:
+                logger.exception("Cache stats flush failed for %s", self.namespace)
+
+    def _take_pending(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = self._new_pending()
+        return pending if pending["pid"] == os.getpid() else self._new_pending()
+
+    def _write_pending(self, conn: sqlite3.Connection) -> None:
+        pending = self._take_pending()
+        if pending["touched"]:
+            conn.executemany(
+                "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+                [(at, self.namespace, key) for key, at in pending["touched"].items()]
+            )
+        if pending["hits"] or pending["misses"]:
+            conn.execute(
+                "INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                (self.namespace, pending["hits"], pending["misses"])
+            )
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value). A hit with value None is a cached negative result."""
+        if not self.enabled or not key:
+            return False, None
+        try:
+            now = time.time()
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._note("misses")
+                return False, None
+            self._note("hits", key, now)
+            return True, (json.loads(row[0]) if row[0] is not None else None)
+        except Exception:
+            logger.exception("Cache lookup failed for %s:%s", self.namespace, key)
+            return False, None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        hit, value = self.lookup(key)
+        return value if hit else default
+
+    def _generation(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT generation FROM cache_generations WHERE namespace = ?",
+                           (self.namespace,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_generation(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) "
+            "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+            (self.namespace,)
+        )
+
+    def generation(self) -> int:
+        """Current invalidation generation of this namespace; -1 when it can't be read (so no set matches)."""
+        if not self.enabled:
+            return 0
+        try:
+            return self._generation(self._connect())
+        except Exception:
+            logger.exception("Cache generation read failed for %s", self.namespace)
+            return -1
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, if_generation: Optional[int] = None) -> None:
+        """Store value; with if_generation, only if no invalidation happened since generation() returned it."""
+        if not self.enabled or not key:
+            return
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        try:
+            now = time.time()
+            payload = json.dumps(value) if value is not None else None
+            with self._transaction() as conn:
+                if if_generation is not None and self._generation(conn) != if_generation:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, payload, now + float(ttl), now)
+                )
+                self._write_pending(conn)
+                self._evict(conn, now)
+        except Exception:
+            logger.exception("Cache store failed for %s:%s", self.namespace, key)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        (count,) = conn.execute("SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at ASC LIMIT ?)",
+                (self.namespace, self.namespace, overflow)
+            )
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except Exception:
+            logger.exception("Cache delete failed for %s:%s", self.namespace, key)
+
+    def delete_where(self, match: Callable[[str], bool]) -> int:
+        """Delete every key in this namespace for which match(key) is true. Returns how many went."""
+        try:
+            with self._transaction() as conn:
+                keys = [k for (k,) in conn.execute("SELECT key FROM cache_entries WHERE namespace = ?",
+                                                   (self.namespace,)) if match(k)]
+                self._bump_generation(conn)
+                conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                                 [(self.namespace, k) for k in keys])
+            return len(keys)
+        except Exception:
+            logger.exception("Cache delete_where failed for %s", self.namespace)
+            return 0
+
+    def clear(self) -> None:
+        try:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+                conn.execute("DELETE FROM cache_stats WHERE namespace = ?", (self.namespace,))
+                self._bump_generation(conn)
+            self._take_pending()
+        except Exception:
+            logger.exception("Cache clear failed for %s", self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (this process's unwritten ones included) and entry count, shared across all processes."""
+        out = {"namespace": self.namespace, "hits": 0, "misses": 0, "entries": 0, "hit_rate": None}
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT hits, misses FROM cache_stats WHERE namespace = ?", (self.namespace,)).fetchone()
+            if row:
+                out["hits"], out["misses"] = int(row[0]), int(row[1])
+            (out["entries"],) = conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time())
+            ).fetchone()
+            with self._pending_lock:
+                if self._pending["pid"] == os.getpid():
+                    out["hits"] += self._pending["hits"]
+                    out["misses"] += self._pending["misses"]
+            total = out["hits"] + out["misses"]
+            out["hit_rate"] = (out["hits"] / total) if total else None
+        except Exception:
+            logger.exception("Cache stats failed for %s", self.namespace)
+        return out
+
+
+def _nutrition_namespace(namespace: str) -> SQLiteCache:
+    return SQLiteCache(
+        NUTRITION_CACHE_PATH,
+        namespace,
+        ttl=NUTRITION_CACHE_TTL,
+        max_entries=NUTRITION_CACHE_MAX_ENTRIES,
+        negative_ttl=NUTRITION_CACHE_NEGATIVE_TTL,
+        enabled=NUTRITION_CACHE_ENABLED,
+    )
+
+
+# full macro lookups from nutrition.lookup_nutrition_text
+nutrition_cache = _nutrition_namespace("nutrition")
+# calorie-only lookups from meals.lookup_calories_calorieninjas
+calorie_cache = _nutrition_namespace("calorieninjas")
+# leaderboard windows from leaderboard.cached_leaderboard; entries are dropped when points inside them change
+leaderboard_cache = SQLiteCache(LEADERBOARD_CACHE_PATH, "leaderboard", ttl=LEADERBOARD_CACHE_TTL, max_entries=256,
+                                enabled=LEADERBOARD_CACHE_ENABLED)
@@ -0,0 +1,102 @@
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .extensions import db
+from .models import Meal
+from .nutrition import lookup_nutrition_text, compute_flags_for_meal
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_pool_state = {"pid": None, "pool": None}
+_pool_lock = threading.Lock()
+
+
+def enrichment_mode() -> str:
+    """'async' inserts meals first and resolves nutrition in the background; anything else is 'sync'."""
+    return (os.environ.get("MEAL_ENRICHMENT_MODE") or "sync").strip().lower()
+
+
+def _pool() -> ThreadPoolExecutor:
+    pid = os.getpid()
+    if _pool_state["pid"] != pid:
+        with _pool_lock:
+            if _pool_state["pid"] != pid:
+                workers = int(os.environ.get("MEAL_ENRICHMENT_WORKERS", 2))
+                _pool_state["pool"] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meal-enrichment")
+                _pool_state["pid"] = pid
+    return _pool_state["pool"]
+
+
+def submit_meal_enrichment(app, meal_id: int):
+    """Queue a pending meal for background enrichment. `app` must be the real app object, not the proxy."""
+    return _pool().submit(_run_in_app, app, meal_id)
+
+
+def _run_in_app(app, meal_id: int) -> Optional[str]:
+    with app.app_context():
+        try:
+            return enrich_meal(meal_id)
+        except Exception:
+            logger.exception("Meal enrichment crashed for meal_id=%s", meal_id)
+            db.session.rollback()
+            return None
+
+
+def enrich_meal(meal_id: int) -> Optional[str]:
+    """
+    Resolve kcal and macros for a pending meal, store its flags, then recompute that
+    day's lifestyle points. Returns the final enrichment status. Must run inside an
+    app context.
+    """
+    from .activities import compute_lifestyle_points_for_user_date
+
+    meal = Meal.query.get(meal_id)
+    if meal is None or meal.enrichment_status != PENDING:
+        return None
+
+    status = DONE
+    try:
+        info = lookup_nutrition_text(meal.name)
+    except Exception:
+        logger.exception("Nutrition lookup failed for meal_id=%s", meal_id)
+        info = None
+        status = FAILED
+    if info:
+        # a provider answer wins over calories the user typed, as in the synchronous path
+        meal.calories = info.get("kcal")
+        meal.protein_g = info.get("protein_g")
+        meal.carbs_g = info.get("carbs_g")
+        meal.fat_g = info.get("fat_g")
+    flagged, reason = compute_flags_for_meal(meal)
+    meal.flagged = flagged
+    meal.flag_reason = reason or None
+    meal.enrichment_status = status
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Failed to save enrichment for meal_id=%s", meal_id)
+        return None
+
+    try:
+        compute_lifestyle_points_for_user_date(meal.user_id, meal.date)
+    except Exception:
+        logger.exception("Failed to recompute lifestyle points after enriching meal_id=%s", meal_id)
+    return status
+
+
+def enrich_pending_meals(limit: int = 500) -> int:
+    """Synchronously enrich meals left pending (e.g. by a worker restart). Must run inside an app context."""
+    ids = [mid for (mid,) in db.session.query(Meal.id).filter(Meal.enrichment_status == PENDING)
+           .order_by(Meal.id.asc()).limit(limit).all()]
+    for mid in ids:
+        enrich_meal(mid)
+    return len(ids)
@@ -0,0 +1,212 @@
+import os
+import re
+import csv
+import json
+import mmap
+import struct
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from .cache import normalize_query
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INSTANCE_DIR = os.path.join(os.getcwd(), "instance")
+FOOD_DB_JSON_PATH = os.environ.get("FOOD_DB_JSON_PATH", os.path.join(INSTANCE_DIR, "indian_nutrition.json"))
+FOOD_DB_PATH = os.environ.get("FOOD_DB_PATH", os.path.join(INSTANCE_DIR, "food_db.bin"))
+
+# File layout (little endian):
+#   header   : magic, version, count, offsets_at, records_at, keys_at
+#   offsets  : (count + 1) x uint32, start of each key inside the key blob
+#   records  : count x 4 float64 (kcal, protein_g, carbs_g, fat_g)
+#   keys     : normalized UTF-8 keys, sorted bytewise, concatenated
+MAGIC = b"FGXFOOD1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+_OFFSET = struct.Struct("<I")
+_RECORD = struct.Struct("<4d")
+
+FIELDS = ("kcal", "protein_g", "carbs_g", "fat_g")
+
+_QUANTITY_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:x\s+)?(.+)$")
+
+
+def _record_from_json(rec) -> Tuple[float, float, float, float]:
+    return (
+        float(rec.get("energy_kcal", rec.get("kcal", 0) or 0) or 0),
+        float(rec.get("protein_g", 0) or 0),
+        float(rec.get("carbs_g", 0) or 0),
+        float(rec.get("fat_g", 0) or 0),
+    )
+
+
+def iter_food_table(path: str) -> Iterable[Tuple[str, Tuple[float, float, float, float]]]:
+    """
+    Yield (name, record) pairs from a local food table. JSON tables map name -> record
+    (the indian_nutrition.json shape); CSV tables need a 'name' column plus any of
+    energy_kcal/kcal, protein_g, carbs_g, fat_g.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                name = row.get("name") or row.get("food")
+                if name:
+                    yield name, _record_from_json(row)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for name, rec in data.items():
+        if isinstance(rec, dict):
+            yield name, _record_from_json(rec)
+
+
+def compile_food_db(sources: Iterable[str], out_path: str) -> int:
+    """Compile one or more food tables into the sorted, mmap-able format. Later tables win on duplicate names."""
+    merged: Dict[bytes, Tuple[float, float, float, float]] = {}
+    for src in sources:
+        for name, rec in iter_food_table(src):
+            key = normalize_query(name).encode("utf-8")
+            if key:
+                merged[key] = rec
+    keys = sorted(merged)
+
+    offsets = bytearray()
+    pos = 0
+    for k in keys:
+        offsets += _OFFSET.pack(pos)
+        pos += len(k)
+    offsets += _OFFSET.pack(pos)
+    records = b"".join(_RECORD.pack(*merged[k]) for k in keys)
+    blob = b"".join(keys)
+
+    offsets_at = _HEADER.size
+    records_at = offsets_at + len(offsets)
+    keys_at = records_at + len(records)
+    tmp_path = out_path + ".part"
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(keys), offsets_at, records_at, keys_at))
+        f.write(offsets)
+        f.write(records)
+        f.write(blob)
+    os.replace(tmp_path, out_path)
+    return len(keys)
+
+
+class FoodDB:
+    """Read-only view over a compiled food table; lookups binary-search the mmapped key index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, offsets_at, records_at, keys_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled food database (version {VERSION})")
+        self.count = count
+        self._offsets_at = offsets_at
+        self._records_at = records_at
+        self._keys_at = keys_at
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    def _key(self, i: int) -> bytes:
+        start, = _OFFSET.unpack_from(self._mm, self._offsets_at + i * 4)
+        end, = _OFFSET.unpack_from(self._mm, self._offsets_at + (i + 1) * 4)
+        return self._mm[self._keys_at + start:self._keys_at + end]
+
+    def get(self, name: str) -> Optional[Tuple[float, float, float, float]]:
+        needle = normalize_query(name).encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == needle:
+            return _RECORD.unpack_from(self._mm, self._records_at + lo * _RECORD.size)
+        return None
+
+
+class _JsonFoodTable:
+    """Fallback when no compiled file exists: the JSON table parsed once per process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = {normalize_query(k): v for k, v in iter_food_table(path)}
+
+    def __len__(self):
+        return len(self._data)
+
+    def close(self):
+        pass
+
+    def get(self, name: str):
+        return self._data.get(normalize_query(name))
+
+
+_db_lock = threading.Lock()
+_db_state = {"table": None, "stamp": None}
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def get_food_db():
+    """
+    The per-process food table: the compiled file when present, else the raw JSON
+    table. Reopened only if the underlying file is replaced.
+    """
+    stamp = _stamp(FOOD_DB_PATH) or _stamp(FOOD_DB_JSON_PATH)
+    if stamp == _db_state["stamp"]:
+        return _db_state["table"]
+    with _db_lock:
+        if stamp == _db_state["stamp"]:
+            return _db_state["table"]
+        table = None
+        if stamp is not None:
+            try:
+                table = FoodDB(stamp[0]) if stamp[0] == FOOD_DB_PATH else _JsonFoodTable(stamp[0])
+                logger.info("Loaded local food table %s (%d entries)", stamp[0], len(table))
+            except Exception:
+                logger.exception("Failed to open local food table %s", stamp[0])
+        # the previous table is left for the GC; a concurrent reader may still hold it
+        _db_state["table"] = table
+        _db_state["stamp"] = stamp
+        return table
+
+
+def lookup_local_food(text: str) -> Optional[Dict[str, float]]:
+    """
+    Look a food up in the local table. Matches on the normalized name, then retries
+    with a leading count stripped ("2 roti" -> 2 x "roti").
+    """
+    table = get_food_db()
+    if table is None:
+        return None
+    key = normalize_query(text)
+    scale = 1.0
+    rec = table.get(key)
+    if rec is None:
+        m = _QUANTITY_RE.match(key)
+        if m:
+            scale = float(m.group(1))
+            rec = table.get(m.group(2))
+    if rec is None:
+        return None
+    out = {name: float(v) * scale for name, v in zip(FIELDS, rec)}
+    out["source"] = "indian_db"
+    return out
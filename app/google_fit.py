@@ -4,13 +4,14 @@ import time
 import traceback
 from functools import wraps
 
-import requests
 from flask import (
     Blueprint, current_app, request, session, redirect, url_for,
     jsonify, make_response, flash
 )
 from google_auth_oauthlib.flow import Flow
 
+from . import http_client
+
 google_fit_bp = Blueprint("google_fit", __name__, template_folder="templates")
 
 _DEFAULT_SCOPE_STR = os.environ.get(
@@ -113,7 +114,8 @@ def _attempt_manual_token_exchange(client_config, redirect_uri, code):
             "redirect_uri": redirect_uri,
             "grant_type": "authorization_code"
         }
-        r = requests.post(token_uri, data=payload, timeout=10)
+        # authorization codes are single-use, so a retried exchange can only fail
+        r = http_client.post("google_oauth", token_uri, data=payload, timeout=10, retries=0)
         current_app.logger.info("Manual token endpoint HTTP %s body=%s", r.status_code, r.text)
         try:
             return r.json()
@@ -279,7 +281,7 @@ def refresh_token():
             "refresh_token": refresh_token,
             "grant_type": "refresh_token"
         }
-        r = requests.post(token_uri, data=payload, timeout=10)
+        r = http_client.post("google_oauth", token_uri, data=payload, timeout=10)
         current_app.logger.info("Refresh token endpoint HTTP %s body=%s", r.status_code, r.text)
         if r.status_code == 200:
             resp = r.json()
@@ -0,0 +1,125 @@
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, abort
+from sqlalchemy import select, delete, update
+
+from .extensions import db
+from .models import Group, GroupMembership
+from .utils import login_required, upsert
+from .leaderboard import window_from_args, group_rows, group_member_rows, move_member_totals
+
+groups_bp = Blueprint("groups", __name__, template_folder="templates")
+
+GROUP_SEARCH_LIMIT = 50
+
+
+def join_group(group_id, user_id):
+    """
+    Add the membership, the user's totals to the group rollup and one to the
+    member count, in one transaction. Returns False if they were already a member.
+    """
+    joined = upsert(GroupMembership, {"group_id": group_id, "user_id": user_id, "joined_at": datetime.utcnow()},
+                    index_elements=("group_id", "user_id"), update_fields=(), returning=True)
+    if joined is None:
+        return False
+    move_member_totals(group_id, user_id, 1)
+    db.session.execute(update(Group).where(Group.id == group_id).values(member_count=Group.member_count + 1))
+    db.session.commit()
+    return True
+
+
+def leave_group(group_id, user_id):
+    """Undo join_group(). Returns False if they weren't a member."""
+    left = db.session.execute(delete(GroupMembership).where(
+        GroupMembership.group_id == group_id, GroupMembership.user_id == user_id)).rowcount
+    if not left:
+        db.session.rollback()
+        return False
+    move_member_totals(group_id, user_id, -1)
+    db.session.execute(update(Group).where(Group.id == group_id).values(member_count=Group.member_count - 1))
+    db.session.commit()
+    return True
+
+
+def _my_group_ids(user_id):
+    return set(db.session.execute(select(GroupMembership.group_id).where(GroupMembership.user_id == user_id)).scalars())
+
+
+@groups_bp.route("/", methods=["GET", "POST"])
+@login_required
+def index():
+    user_id = session["user_id"]
+    if request.method == "POST":
+        name = (request.form.get("name") or "").strip()[:120]
+        if not name:
+            flash("Group name is required", "warning")
+            return redirect(url_for("groups.index"))
+        try:
+            group = Group(name=name, created_by=user_id)
+            db.session.add(group)
+            db.session.flush()
+            join_group(group.id, user_id)
+            flash(f"Created group {name}", "success")
+            return redirect(url_for("groups.detail", group_id=group.id))
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Failed to create group")
+            flash("Failed to create group", "danger")
+            return redirect(url_for("groups.index"))
+
+    mine = _my_group_ids(user_id)
+    my_groups = Group.query.filter(Group.id.in_(mine)).order_by(Group.name.asc()).all() if mine else []
+    q = (request.args.get("q") or "").strip()
+    found = Group.query
+    if q:
+        found = found.filter(Group.name.ilike(f"%{q}%"))
+    found = found.order_by(Group.member_count.desc(), Group.id.asc()).limit(GROUP_SEARCH_LIMIT).all()
+    return render_template("groups.html", my_groups=my_groups, groups=found, mine=mine, q=q)
+
+
+@groups_bp.route("/board", methods=["GET"])
+@login_required
+def board():
+    date_from, date_to, days = window_from_args()
+    by = "average" if request.args.get("by") == "average" else "total"
+    rows = group_rows(date_from, date_to, by=by)
+    return render_template("group_board.html", rows=rows, date_from=date_from, date_to=date_to, days=days, by=by,
+                           mine=_my_group_ids(session["user_id"]))
+
+
+@groups_bp.route("/<int:group_id>", methods=["GET"])
+@login_required
+def detail(group_id):
+    group = db.session.get(Group, group_id) or abort(404)
+    date_from, date_to, days = window_from_args()
+    rows = group_member_rows(group_id, date_from, date_to)
+    return render_template("group_detail.html", group=group, leaderboard=rows, date_from=date_from,
+                           date_to=date_to, days=days, is_member=group_id in _my_group_ids(session["user_id"]))
+
+
+@groups_bp.route("/<int:group_id>/join", methods=["POST"])
+@login_required
+def join(group_id):
+    group = db.session.get(Group, group_id) or abort(404)
+    try:
+        if join_group(group.id, session["user_id"]):
+            flash(f"Joined {group.name}", "success")
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Failed to join group %s", group_id)
+        flash("Failed to join group", "danger")
+    return redirect(url_for("groups.detail", group_id=group_id))
+
+
+@groups_bp.route("/<int:group_id>/leave", methods=["POST"])
+@login_required
+def leave(group_id):
+    group = db.session.get(Group, group_id) or abort(404)
+    try:
+        if leave_group(group.id, session["user_id"]):
+            flash(f"Left {group.name}", "success")
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Failed to leave group %s", group_id)
+        flash("Failed to leave group", "danger")
+    return redirect(url_for("groups.detail", group_id=group_id))
@@ -0,0 +1,204 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException, Timeout, ConnectionError
+
+from .metrics import OUTBOUND_LATENCY
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 1))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", 0.25))
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", 2.0))
+HTTP_BREAKER_THRESHOLD = int(os.environ.get("HTTP_BREAKER_THRESHOLD", 5))
+HTTP_BREAKER_RESET = float(os.environ.get("HTTP_BREAKER_RESET", 30.0))
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(RequestException):
+    """Raised without touching the network while a provider's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `threshold` failures in a row the provider is
+    skipped for `reset_after` seconds, then a single trial request is let through;
+    its outcome closes the breaker or re-opens it.
+    """
+
+    def __init__(self, threshold: int = HTTP_BREAKER_THRESHOLD, reset_after: float = HTTP_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        attempts = self.requests
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "latency_avg_ms": round(self.latency_total / attempts * 1000, 2) if attempts else None,
+            "latency_max_ms": round(self.latency_max * 1000, 2),
+        }
+
+
+_lock = threading.Lock()
+_session_state = {"pid": None, "session": None}
+_breakers: Dict[str, CircuitBreaker] = {}
+_stats: Dict[str, ProviderStats] = {}
+
+
+def get_session() -> requests.Session:
+    """Per-process session; urllib3 keeps a keep-alive pool per host. Rebuilt after fork."""
+    pid = os.getpid()
+    if _session_state["pid"] == pid:
+        return _session_state["session"]
+    with _lock:
+        if _session_state["pid"] != pid:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session_state["session"] = s
+            _session_state["pid"] = pid
+    return _session_state["session"]
+
+
+def _provider(name: str):
+    with _lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker()
+            _stats[name] = ProviderStats()
+        return _breakers[name], _stats[name]
+
+
+def _backoff(attempt: int) -> float:
+    # "full jitter": uniform over the exponential window
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(provider: str, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared session on behalf of `provider`.
+    Connection errors, timeouts and 429/5xx answers are retried up to `retries`
+    times with jittered backoff and count against the provider's breaker. Other
+    responses are returned as-is; callers keep their own status handling.
+    """
+    breaker, stats = _provider(provider)
+    if not breaker.allow():
+        stats.rejected += 1
+        raise CircuitOpenError(f"{provider} circuit open; skipping {method} {url}")
+
+    retries = HTTP_RETRIES if retries is None else retries
+    session = get_session()
+    attempt = 0
+    while True:
+        t0 = time.perf_counter()
+        error = None
+        resp = None
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (Timeout, ConnectionError) as e:
+            error = e
+        except RequestException:
+            breaker.record_failure()
+            raise
+        elapsed = time.perf_counter() - t0
+        stats.requests += 1
+        stats.latency_total += elapsed
+        stats.latency_max = max(stats.latency_max, elapsed)
+
+        failed = error is not None or resp.status_code in RETRY_STATUSES
+        OUTBOUND_LATENCY.observe(elapsed, provider=provider, outcome="error" if failed else "ok")
+        if not failed:
+            breaker.record_success()
+            return resp
+
+        stats.errors += 1
+        if attempt >= retries:
+            breaker.record_failure()
+            if error is not None:
+                raise error
+            return resp
+        attempt += 1
+        stats.retries += 1
+        if resp is not None:
+            resp.close()
+        delay = _backoff(attempt)
+        logger.debug("%s %s %s failed (%s); retry %d in %.2fs", provider, method, url,
+                     error or resp.status_code, attempt, delay)
+        time.sleep(delay)
+
+
+def get(provider: str, url: str, **kwargs) -> requests.Response:
+    return request(provider, "GET", url, **kwargs)
+
+
+def post(provider: str, url: str, **kwargs) -> requests.Response:
+    return request(provider, "POST", url, **kwargs)
+
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-provider counters for this worker, plus the breaker state."""
+    with _lock:
+        names = list(_stats)
+    out = {}
+    for name in names:
+        d = _stats[name].as_dict()
+        d["circuit"] = _breakers[name].state
+        out[name] = d
+    return out
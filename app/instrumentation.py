@@ -0,0 +1,157 @@
+"""
+Per-request SQL instrumentation. Engine event hooks count the statements a
+request runs, their total time, the slowest one and the commits. When the
+request ends the numbers are added to a per-endpoint registry in this worker
+and, with SQL_STATS_HEADER (default: on in debug mode), sent back in an
+X-DB-Stats response header.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# "1"/"0" to force the X-DB-Stats header on or off; unset follows app.debug
+SQL_STATS_HEADER = os.environ.get("SQL_STATS_HEADER")
+# requests running more statements than this are logged with their endpoint
+SQL_QUERY_WARN = int(os.environ.get("SQL_QUERY_WARN", 25))
+# slowest statements are kept truncated to this many characters
+STATEMENT_CHARS = 300
+
+
+class RequestStats:
+    """What one request did against the database."""
+
+    __slots__ = ("queries", "db_seconds", "commits", "slowest_seconds", "slowest_statement", "started")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.commits = 0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.started = time.perf_counter()
+
+    def record(self, seconds, statement):
+        self.queries += 1
+        self.db_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = " ".join(statement.split())[:STATEMENT_CHARS]
+
+    def header(self):
+        return (f"queries={self.queries}; db_ms={self.db_seconds * 1000:.1f}; commits={self.commits}; "
+                f"slowest_ms={self.slowest_seconds * 1000:.1f}")
+
+
+def current_stats():
+    """The running request's RequestStats, or None outside a request."""
+    return g.get("_db_stats") if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_query_started")
+    stats = current_stats()
+    if started and stats is not None:
+        stats.record(time.perf_counter() - started.pop(), statement)
+
+
+@event.listens_for(Engine, "commit")
+def _on_commit(conn):
+    stats = current_stats()
+    if stats is not None:
+        stats.commits += 1
+
+
+_state = {"pid": None, "endpoints": {}}
+_lock = threading.Lock()
+_captures = []
+
+
+def _record(endpoint, stats, seconds):
+    pid = os.getpid()
+    with _lock:
+        if _state["pid"] != pid:
+            _state.update(pid=pid, endpoints={})
+        m = _state["endpoints"].get(endpoint)
+        if m is None:
+            m = _state["endpoints"][endpoint] = {
+                "requests": 0, "seconds": 0.0, "max_seconds": 0.0, "queries": 0, "max_queries": 0,
+                "db_seconds": 0.0, "commits": 0, "slowest_seconds": 0.0, "slowest_statement": None,
+            }
+        m["requests"] += 1
+        m["seconds"] += seconds
+        m["max_seconds"] = max(m["max_seconds"], seconds)
+        m["queries"] += stats.queries
+        m["max_queries"] = max(m["max_queries"], stats.queries)
+        m["db_seconds"] += stats.db_seconds
+        m["commits"] += stats.commits
+        if stats.slowest_seconds > m["slowest_seconds"]:
+            m["slowest_seconds"] = stats.slowest_seconds
+            m["slowest_statement"] = stats.slowest_statement
+        for captured in _captures:
+            captured.append((endpoint, stats))
+
+
+def endpoint_metrics():
+    """{endpoint: totals} for the requests this worker has served."""
+    with _lock:
+        if _state["pid"] != os.getpid():
+            return {}
+        return {endpoint: dict(m) for endpoint, m in _state["endpoints"].items()}
+
+
+def reset_metrics():
+    with _lock:
+        _state.update(pid=os.getpid(), endpoints={})
+
+
+@contextmanager
+def capture_requests():
+    """Collect (endpoint, RequestStats) for every request finished in this process inside the block."""
+    captured = []
+    with _lock:
+        _captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with _lock:
+            _captures.remove(captured)
+
+
+def init_instrumentation(app):
+    forced = None if SQL_STATS_HEADER is None else SQL_STATS_HEADER.strip().lower() in ("1", "true", "yes")
+
+    @app.before_request
+    def _start_request_stats():
+        g._db_stats = RequestStats()
+
+    @app.after_request
+    def _finish_request_stats(response):
+        stats = g.pop("_db_stats", None)
+        if stats is None:
+            return response
+        endpoint = request.endpoint or "<unmatched>"
+        try:
+            _record(endpoint, stats, time.perf_counter() - stats.started)
+        except Exception:
+            logger.exception("Recording request stats failed")
+        if stats.queries > SQL_QUERY_WARN:
+            logger.warning("%s ran %d SQL statements (%s)", endpoint, stats.queries, stats.header())
+        if (app.debug if forced is None else forced):
+            response.headers["X-DB-Stats"] = stats.header()
+        return response
@@ -1,15 +1,494 @@
-from flask import Blueprint, render_template, request
-from .models import User, LifestylePoint
-from .utils import login_required, get_current_user
-from datetime import date, timedelta
-from sqlalchemy import func
+import os
+import json
+import math
+import time
+import base64
+import binascii
+import hashlib
+from collections import Counter, defaultdict
+from flask import Blueprint, render_template, request, session, make_response, current_app, jsonify, g
+from .models import User, LifestylePoint, LeaderboardRollup, LeaderboardRankBucket, Group, GroupMembership, GroupRollup
+from .utils import login_required, get_current_user, upsert
+from .cache import leaderboard_cache
+from .signals import lifestyle_points_changed, display_name_changed
+from . import leaderboard_engine, leaderboard_stream
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import func, select, delete, insert, update, literal, or_, and_
 from .extensions import db
 
 leaderboard_bp = Blueprint("leaderboard", __name__, template_folder="templates")
 
-@leaderboard_bp.route("/", methods=["GET"])
-@login_required
-def view_leaderboard():
+LEADERBOARD_LIMIT = 100
+# rolling windows kept pre-summed in leaderboard_rollup; other window lengths sum the daily rows
+ROLLING_DAYS = tuple(sorted({int(n) for n in os.environ.get("LEADERBOARD_ROLLING_DAYS", "7,30").split(",") if n.strip()}))
+
+_ROLLUP_KEY = ("period", "anchor_date", "user_id")
+_BUCKET_KEY = ("period", "anchor_date", "bucket")
+_GROUP_KEY = ("period", "anchor_date", "group_id")
+# score bucket width for rank counts; a rank lookup counts rows inside one bucket
+RANK_BUCKET_WIDTH = float(os.environ.get("LEADERBOARD_RANK_BUCKET_WIDTH", 10.0))
+
+
+def week_start(d):
+    return d - timedelta(days=d.weekday())
+
+
+def rollup_anchors(day):
+    """Every (period, anchor_date) whose total includes `day`."""
+    anchors = [("day", day), ("week", week_start(day))]
+    for n in ROLLING_DAYS:
+        anchors.extend((f"rolling{n}", day + timedelta(days=k)) for k in range(n))
+    return anchors
+
+
+def rank_bucket(total):
+    """Bucket b with b * width <= total < (b + 1) * width, exact at the edges (SQL compares with those bounds)."""
+    b = math.floor(total / RANK_BUCKET_WIDTH)
+    if total < b * RANK_BUCKET_WIDTH:
+        b -= 1
+    elif total >= (b + 1) * RANK_BUCKET_WIDTH:
+        b += 1
+    return b
+
+
+def _write_bucket_moves(moves):
+    rows = [{"period": p, "anchor_date": a, "bucket": b, "users": n} for (p, a, b), n in moves.items() if n]
+    if rows:
+        upsert(LeaderboardRankBucket, rows, index_elements=_BUCKET_KEY, update_fields=(), increments=("users",))
+
+
+def apply_points_delta(user_id, day, delta):
+    """
+    Add `delta` to every rollup total that covers (user_id, day), in one
+    INSERT ... ON CONFLICT DO UPDATE SET total = total + delta, likewise to the
+    totals of the user's groups, and move the user between rank buckets where a
+    total crosses a bucket edge. A zero delta still creates the user's missing
+    rollup rows, so a user whose points are all 0 is on the board. Runs in the
+    caller's transaction so the rollups commit together with the point change.
+    """
+    anchors = rollup_anchors(day)
+    wanted = set(anchors)
+    old = {}
+    q = select(LeaderboardRollup.period, LeaderboardRollup.anchor_date, LeaderboardRollup.total_points).where(
+        LeaderboardRollup.user_id == user_id,
+        LeaderboardRollup.anchor_date >= min(a for _, a in anchors),
+        LeaderboardRollup.anchor_date <= max(a for _, a in anchors),
+    ).with_for_update()
+    for period, anchor, total in db.session.execute(q):
+        if (period, anchor) in wanted:
+            old[(period, anchor)] = total
+    if not delta and len(old) == len(wanted):
+        return
+
+    rows = [{"period": p, "anchor_date": a, "user_id": user_id, "total_points": delta} for p, a in anchors]
+    upsert(LeaderboardRollup, rows, index_elements=_ROLLUP_KEY, update_fields=(), increments=("total_points",))
+    group_ids = db.session.execute(select(GroupMembership.group_id).where(GroupMembership.user_id == user_id)).scalars().all()
+    if group_ids and delta:
+        rows = [{"period": p, "anchor_date": a, "group_id": g, "total_points": delta} for g in group_ids for p, a in anchors]
+        upsert(GroupRollup, rows, index_elements=_GROUP_KEY, update_fields=(), increments=("total_points",))
+
+    moves = Counter()
+    for key in anchors:
+        if key in old:
+            before, after = rank_bucket(old[key]), rank_bucket(old[key] + delta)
+            if before != after:
+                moves[(*key, before)] -= 1
+                moves[(*key, after)] += 1
+        else:
+            moves[(*key, rank_bucket(delta))] += 1
+    _write_bucket_moves(moves)
+
+
+def rebuild_leaderboard_rollup(first_user_id=None, last_user_id=None):
+    """
+    Recompute rollup rows from lifestyle_points, for all users or an id range, e.g.
+    after the table is created or points are rewritten in bulk, and bring the rank
+    buckets along (recounted for a full rebuild, adjusted for a range). A full
+    rebuild also rebuilds the group rollup; after range rebuilds, callers run
+    rebuild_group_rollup() once at the end. Does not commit. Returns the number
+    of rollup rows written.
+    """
+    full = first_user_id is None and last_user_id is None
+    stmt = delete(LeaderboardRollup.__table__)
+    old_rows = select(LeaderboardRollup.period, LeaderboardRollup.anchor_date, LeaderboardRollup.total_points)
+    q = db.session.query(LifestylePoint.user_id, LifestylePoint.date, LifestylePoint.points)
+    if first_user_id is not None:
+        stmt = stmt.where(LeaderboardRollup.user_id >= first_user_id)
+        old_rows = old_rows.where(LeaderboardRollup.user_id >= first_user_id)
+        q = q.filter(LifestylePoint.user_id >= first_user_id)
+    if last_user_id is not None:
+        stmt = stmt.where(LeaderboardRollup.user_id <= last_user_id)
+        old_rows = old_rows.where(LeaderboardRollup.user_id <= last_user_id)
+        q = q.filter(LifestylePoint.user_id <= last_user_id)
+
+    moves = Counter()
+    if not full:
+        for period, anchor, total in db.session.execute(old_rows.execution_options(yield_per=5000)):
+            moves[(period, anchor, rank_bucket(total))] -= 1
+    db.session.execute(stmt)
+
+    written = 0
+    totals = defaultdict(float)
+    current_user = None
+    for uid, day, points in q.order_by(LifestylePoint.user_id.asc()).yield_per(5000):
+        if uid != current_user and totals:
+            written += _write_totals(totals, moves)
+            totals.clear()
+        current_user = uid
+        for period, anchor in rollup_anchors(day):
+            totals[(period, anchor, uid)] += float(points or 0.0)
+    if totals:
+        written += _write_totals(totals, moves)
+    if full:
+        recount_rank_buckets()
+        rebuild_group_rollup()
+    else:
+        _write_bucket_moves(moves)
+    return written
+
+
+def recount_rank_buckets():
+    """Recount every rank bucket from the rollup rows, e.g. to repair drift. Does not commit."""
+    db.session.execute(delete(LeaderboardRankBucket.__table__))
+    counts = Counter()
+    q = select(LeaderboardRollup.period, LeaderboardRollup.anchor_date, LeaderboardRollup.total_points)
+    for period, anchor, total in db.session.execute(q.execution_options(yield_per=5000)):
+        counts[(period, anchor, rank_bucket(total))] += 1
+    _write_bucket_moves(counts)
+    return len(counts)
+
+
+def rebuild_group_rollup():
+    """
+    Recompute group_leaderboard_rollup and member counts from the user rollup and
+    memberships, as one INSERT ... SELECT ... GROUP BY. Does not commit.
+    """
+    db.session.execute(delete(GroupRollup.__table__))
+    r, m = LeaderboardRollup.__table__, GroupMembership.__table__
+    summed = select(r.c.period, r.c.anchor_date, m.c.group_id, func.sum(r.c.total_points),
+                    literal(datetime.utcnow())).join(
+        m, m.c.user_id == r.c.user_id).group_by(r.c.period, r.c.anchor_date, m.c.group_id)
+    db.session.execute(insert(GroupRollup.__table__).from_select(
+        ["period", "anchor_date", "group_id", "total_points", "updated_at"], summed))
+    members = select(func.count()).where(m.c.group_id == Group.id).scalar_subquery()
+    db.session.execute(update(Group.__table__).values(member_count=members))
+
+
+def move_member_totals(group_id, user_id, sign):
+    """
+    Add (sign=1) or take away (sign=-1) all of a user's rollup totals from a
+    group's, when they join or leave it. The user's rollup rows are locked so a
+    concurrent point write lands either before (and is moved here) or after
+    (and sees the new membership). Does not commit.
+    """
+    q = select(LeaderboardRollup.period, LeaderboardRollup.anchor_date, LeaderboardRollup.total_points).where(
+        LeaderboardRollup.user_id == user_id).with_for_update()
+    rows = [{"period": p, "anchor_date": a, "group_id": group_id, "total_points": sign * t}
+            for p, a, t in db.session.execute(q) if t]
+    for i in range(0, len(rows), 5000):
+        upsert(GroupRollup, rows[i:i + 5000], index_elements=_GROUP_KEY, update_fields=(), increments=("total_points",))
+    return len(rows)
+
+
+def _write_totals(totals, moves):
+    rows = [{"period": p, "anchor_date": a, "user_id": u, "total_points": t} for (p, a, u), t in totals.items()]
+    upsert(LeaderboardRollup, rows, index_elements=_ROLLUP_KEY, update_fields=("total_points",))
+    for (p, a, _), t in totals.items():
+        moves[(p, a, rank_bucket(t))] += 1
+    return len(rows)
+
+
+def rollup_window(date_from, date_to):
+    """(period, anchor_date) of the rollup rows that hold [date_from, date_to] pre-summed, or (None, None)."""
+    days = (date_to - date_from).days + 1
+    if days == 1:
+        return "day", date_to
+    if days in ROLLING_DAYS:
+        return f"rolling{days}", date_to
+    if days == 7 and date_from.weekday() == 0:
+        return "week", date_from
+    return None, None
+
+
+def _ranking(date_from, date_to):
+    """(user_id, total_points) per user for the window: rollup rows directly, or day rows summed."""
+    period, anchor = rollup_window(date_from, date_to)
+    if period is not None:
+        return select(LeaderboardRollup.user_id, LeaderboardRollup.total_points).where(
+            LeaderboardRollup.period == period, LeaderboardRollup.anchor_date == anchor).subquery()
+    return select(LeaderboardRollup.user_id, func.sum(LeaderboardRollup.total_points).label("total_points")).where(
+        LeaderboardRollup.period == "day",
+        LeaderboardRollup.anchor_date >= date_from, LeaderboardRollup.anchor_date <= date_to,
+    ).group_by(LeaderboardRollup.user_id).subquery()
+
+
+def encode_cursor(total_points, user_id, position):
+    raw = f"{float(total_points)!r}:{int(user_id)}:{int(position)}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(total_points, user_id, position) from encode_cursor; raises ValueError on garbage."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        total, uid, position = raw.split(":")
+        return float(total), int(uid), int(position)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"bad cursor: {e}")
+
+
+def _after(r, total, user_id):
+    """Rows ranked after (total, user_id) in the (total desc, user_id asc) order."""
+    # spelled with a plain upper bound on total so it stays an index range scan
+    return and_(r.c.total_points <= total, or_(r.c.total_points < total, r.c.user_id > user_id))
+
+
+def _before(r, total, user_id):
+    return and_(r.c.total_points >= total, or_(r.c.total_points > total, r.c.user_id < user_id))
+
+
+def _row(r, position):
+    return {
+        "position": position,
+        "user_id": r.user_id,
+        "display_name": User.display_name_for(r.full_name, r.email),
+        # totals are kept by adding deltas; hide float noise
+        "total_points": round(float(r.total_points or 0.0), 2),
+    }
+
+
+def leaderboard_page(date_from, date_to, cursor=None, limit=LEADERBOARD_LIMIT):
+    """
+    One page of the full ranking, in one joined query. Pages are keyset-paginated:
+    `cursor` is the previous page's next_cursor, so deep pages cost the same as the
+    first. Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    r = _ranking(date_from, date_to)
+    q = select(r.c.user_id, r.c.total_points, User.full_name, User.email).join(User, User.id == r.c.user_id)
+    position = 0
+    if cursor:
+        total, after_id, position = decode_cursor(cursor)
+        q = q.where(_after(r, total, after_id))
+    found = db.session.execute(q.order_by(r.c.total_points.desc(), r.c.user_id.asc()).limit(limit + 1)).all()
+    rows = [_row(x, position + i) for i, x in enumerate(found[:limit], start=1)]
+    next_cursor = None
+    if len(found) > limit:
+        last = found[limit - 1]
+        next_cursor = encode_cursor(last.total_points, last.user_id, position + limit)
+    return rows, next_cursor
+
+
+def _engine_board(date_from, date_to):
+    """This worker's in-memory board for a rolling window ending today, when the engine is on."""
+    days = (date_to - date_from).days + 1
+    if not leaderboard_engine.ENGINE_ENABLED or days not in ROLLING_DAYS or date_to != date.today():
+        return None
+    try:
+        return leaderboard_engine.get_board(days, date_to)
+    except Exception:
+        current_app.logger.exception("Leaderboard engine unavailable; using the rollup")
+        return None
+
+
+def _engine_rows(entries):
+    """[(position, user_id, total)] from the engine -> page rows, names in one primary-key query."""
+    ids = [uid for _, uid, _ in entries]
+    names = {r.id: User.display_name_for(r.full_name, r.email) for r in
+             db.session.execute(select(User.id, User.full_name, User.email).where(User.id.in_(ids)))} if ids else {}
+    return [{"position": pos, "user_id": uid, "display_name": names.get(uid, ""), "total_points": round(total, 2)}
+            for pos, uid, total in entries]
+
+
+def leaderboard_rows(date_from, date_to, limit=LEADERBOARD_LIMIT):
+    """Top users for [date_from, date_to] with display names, in one joined query over the rollup."""
+    board = _engine_board(date_from, date_to)
+    if board is not None:
+        return _engine_rows([(i, uid, total) for i, (uid, total) in enumerate(board.top(limit), start=1)])
+    return leaderboard_page(date_from, date_to, limit=limit)[0]
+
+
+def user_rank(user_id, date_from, date_to, around=5):
+    """
+    The user's standing for the window, or None if they have no points row in it:
+    rank (ties share a rank, as RANK() does), position in the tie-broken order,
+    total, the `around` users either side, and next_cursor to page on from there.
+    For rollup windows the rank is the bucket counts above the user's bucket plus
+    an index count inside it; other windows count every row above. Rolling windows
+    ending today come from the in-memory engine when LEADERBOARD_ENGINE is on.
+    """
+    board = _engine_board(date_from, date_to)
+    if board is not None:
+        found = board.rank(user_id, around=around)
+        if found is None:
+            return None
+        neighbors = _engine_rows(found["neighbors"])
+        last = found["neighbors"][-1]
+        return {
+            "user_id": user_id,
+            "rank": found["rank"],
+            "position": found["position"],
+            "total_points": round(found["total"], 2),
+            "neighbors": neighbors,
+            "next_cursor": encode_cursor(last[2], last[1], last[0]) if last[0] < len(board) else None,
+        }
+
+    r = _ranking(date_from, date_to)
+    cols = (r.c.user_id, r.c.total_points, User.full_name, User.email)
+    mine = db.session.execute(select(*cols).join(User, User.id == r.c.user_id).where(r.c.user_id == user_id)).first()
+    if mine is None:
+        return None
+    total = mine.total_points
+    period, anchor = rollup_window(date_from, date_to)
+    if period is not None:
+        # whole buckets above ours from the bucket counts, then the rows above us inside our bucket
+        b = rank_bucket(total)
+        above = select(func.coalesce(func.sum(LeaderboardRankBucket.users), 0)).where(
+            LeaderboardRankBucket.period == period, LeaderboardRankBucket.anchor_date == anchor,
+            LeaderboardRankBucket.bucket > b).scalar_subquery()
+        in_bucket = select(func.count()).select_from(r).where(
+            r.c.total_points > total, r.c.total_points < (b + 1) * RANK_BUCKET_WIDTH).scalar_subquery()
+        above = above + in_bucket
+    else:
+        above = select(func.count()).select_from(r).where(r.c.total_points > total).scalar_subquery()
+    tied = select(func.count()).select_from(r).where(r.c.total_points == total, r.c.user_id < user_id).scalar_subquery()
+    higher, tied_before = db.session.execute(select(above, tied)).one()
+    position = higher + tied_before + 1
+
+    before = db.session.execute(
+        select(*cols).join(User, User.id == r.c.user_id)
+        .where(_before(r, total, user_id))
+        .order_by(r.c.total_points.asc(), r.c.user_id.desc()).limit(around)
+    ).all()
+    neighbors = [_row(x, position - i) for i, x in enumerate(before, start=1)][::-1]
+    neighbors.append(_row(mine, position))
+    after, next_cursor = leaderboard_page(date_from, date_to, encode_cursor(total, user_id, position), limit=around)
+    neighbors.extend(after)
+    return {
+        "user_id": user_id,
+        "rank": higher + 1,
+        "position": position,
+        "total_points": round(float(total or 0.0), 2),
+        "neighbors": neighbors,
+        "next_cursor": next_cursor,
+    }
+
+
+def _cache_key(date_from, date_to):
+    return f"lb:{date_from.isoformat()}:{date_to.isoformat()}"
+
+
+def _key_covers(key, day):
+    try:
+        _, date_from, date_to = key.split(":")
+        return date.fromisoformat(date_from) <= day <= date.fromisoformat(date_to)
+    except ValueError:
+        return False
+
+
+def cached_leaderboard(date_from, date_to):
+    """
+    leaderboard_rows() through the shared cache. The entry carries a content hash
+    (the ETag basis) and the time it was computed. A point write that invalidates
+    the cache while the rows are being read keeps them from being stored.
+    """
+    key = _cache_key(date_from, date_to)
+    hit, entry = leaderboard_cache.lookup(key)
+    if hit and entry:
+        return entry
+    generation = leaderboard_cache.generation()
+    rows = leaderboard_rows(date_from, date_to)
+    digest = hashlib.sha1(json.dumps([key, rows], sort_keys=True).encode("utf-8")).hexdigest()
+    entry = {"rows": rows, "etag": digest, "generated_at": time.time()}
+    leaderboard_cache.set(key, entry, if_generation=generation)
+    return entry
+
+
+def invalidate_leaderboard_cache(day=None):
+    """Drop cached windows containing `day` (every window when day is None)."""
+    if day is None:
+        leaderboard_cache.clear()
+        return
+    leaderboard_cache.delete_where(lambda key: _key_covers(key, day))
+
+
+@lifestyle_points_changed.connect
+def _on_points_changed(sender, **kwargs):
+    invalidate_leaderboard_cache(kwargs.get("date"))
+
+
+@display_name_changed.connect
+def _on_display_name_changed(sender, **kwargs):
+    # cached rows carry display names, in every window
+    invalidate_leaderboard_cache()
+
+
+def _set_validators(resp, etag, last_modified):
+    resp.set_etag(etag, weak=True)
+    resp.last_modified = last_modified
+    # always revalidate; the page is per user, so the ETag is too
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Cookie")
+    return resp
+
+
+def group_rows(date_from, date_to, limit=LEADERBOARD_LIMIT, by="total"):
+    """
+    Team-vs-team board for the window from the group rollup, ordered by the
+    members' summed points or, with by="average", by points per member.
+    """
+    period, anchor = rollup_window(date_from, date_to)
+    if period is not None:
+        total = GroupRollup.total_points
+        q = select(GroupRollup.group_id, total.label("total_points")).where(
+            GroupRollup.period == period, GroupRollup.anchor_date == anchor)
+    else:
+        total = func.sum(GroupRollup.total_points)
+        q = select(GroupRollup.group_id, total.label("total_points")).where(
+            GroupRollup.period == "day", GroupRollup.anchor_date >= date_from, GroupRollup.anchor_date <= date_to,
+        ).group_by(GroupRollup.group_id)
+    g = q.subquery()
+    average = g.c.total_points / func.nullif(Group.member_count, 0)
+    order = average.desc() if by == "average" else g.c.total_points.desc()
+    q = select(g.c.group_id, g.c.total_points, Group.name, Group.member_count).join(Group, Group.id == g.c.group_id)
+    return [
+        {
+            "position": i,
+            "group_id": r.group_id,
+            "name": r.name,
+            "members": r.member_count,
+            "total_points": round(float(r.total_points or 0.0), 2),
+            "average_points": round(float(r.total_points or 0.0) / r.member_count, 2) if r.member_count else 0.0,
+        }
+        for i, r in enumerate(db.session.execute(q.order_by(order, g.c.group_id.asc()).limit(limit)), start=1)
+    ]
+
+
+def group_member_rows(group_id, date_from, date_to, limit=500):
+    """
+    A group's own board: every member with their window total (0 without points),
+    best first. Members are joined to their rollup rows by the unique
+    (period, anchor_date, user_id) key, so the cost follows the group's size.
+    """
+    period, anchor = rollup_window(date_from, date_to)
+    LR, M = LeaderboardRollup, GroupMembership
+    if period is not None:
+        on = and_(LR.user_id == M.user_id, LR.period == period, LR.anchor_date == anchor)
+        total = func.coalesce(LR.total_points, 0.0)
+        group_by = ()
+    else:
+        on = and_(LR.user_id == M.user_id, LR.period == "day", LR.anchor_date >= date_from, LR.anchor_date <= date_to)
+        total = func.coalesce(func.sum(LR.total_points), 0.0)
+        group_by = (M.user_id, User.full_name, User.email)
+    q = (select(M.user_id, total.label("total_points"), User.full_name, User.email)
+         .join(User, User.id == M.user_id).outerjoin(LR, on).where(M.group_id == group_id))
+    if group_by:
+        q = q.group_by(*group_by)
+    q = q.order_by(total.desc(), M.user_id.asc()).limit(limit)
+    return [_row(x, i) for i, x in enumerate(db.session.execute(q), start=1)]
+
+
+def window_from_args():
+    """(date_from, date_to, days) from ?days=, ?date_to= and ?period=week."""
     days = int(request.args.get("days", 7))
     date_to_str = request.args.get("date_to")
     if date_to_str:
@@ -20,18 +499,94 @@ def view_leaderboard():
     else:
         date_to = date.today()
 
-    date_from = date_to - timedelta(days=days-1)
-    rows = db.session.query(
-        LifestylePoint.user_id,
-        func.coalesce(func.sum(LifestylePoint.points), 0.0).label("total_points")
-    ).filter(LifestylePoint.date >= date_from, LifestylePoint.date <= date_to).group_by(LifestylePoint.user_id).order_by(func.sum(LifestylePoint.points).desc()).limit(100).all()
-    leaderboard = []
-    for r in rows:
-        user = User.query.get(r.user_id)
-        leaderboard.append({
-            "user_id": r.user_id,
-            "display_name": user.display_name() if user else f"user:{r.user_id}",
-            "total_points": float(r.total_points or 0.0)
-        })
-
-    return render_template("leaderboard.html", leaderboard=leaderboard, date_from=date_from, date_to=date_to, days=days)
+    if request.args.get("period") == "week":
+        date_from = week_start(date_to)
+        date_to = date_from + timedelta(days=6)
+        days = 7
+    else:
+        date_from = date_to - timedelta(days=days-1)
+    return date_from, date_to, days
+
+
+@leaderboard_bp.route("/", methods=["GET"])
+@login_required
+def view_leaderboard():
+    date_from, date_to, days = window_from_args()
+    entry = cached_leaderboard(date_from, date_to)
+    last_modified = datetime.fromtimestamp(int(entry["generated_at"]), timezone.utc)
+
+    # outside the top rows, show where the user stands
+    standing = None
+    uid = session.get("user_id")
+    if uid and all(r["user_id"] != uid for r in entry["rows"]):
+        standing = user_rank(uid, date_from, date_to, around=2)
+
+    # pending flashes must be rendered, so such responses are neither validated nor
+    # given validators. Last-Modified is informational: a date can't tell two users'
+    # pages apart, so 304s are decided on the ETag only. Besides the cached rows it
+    # covers everything else the page renders: the standing (which can move while the
+    # top rows stay put) and the user's own name and Google Fit state in the layout.
+    conditional = not session.get("_flashes")
+    if conditional:
+        user = g.user
+        shown = json.dumps([user.display_name() if user else None, bool(g.fit_integrated), standing],
+                           sort_keys=True, default=str)
+        etag = hashlib.sha1(f"{entry['etag']}:{uid}:{shown}".encode("utf-8")).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            return _set_validators(current_app.response_class(status=304), etag, last_modified)
+
+    resp = make_response(render_template("leaderboard.html", leaderboard=entry["rows"], date_from=date_from,
+                                         date_to=date_to, days=days, standing=standing))
+    return _set_validators(resp, etag, last_modified) if conditional else resp
+
+
+@leaderboard_bp.route("/rank", methods=["GET"])
+@login_required
+def rank_api():
+    """JSON standing for ?user_id= (default: the current user) over the same window args as the page."""
+    date_from, date_to, _ = window_from_args()
+    try:
+        user_id = int(request.args.get("user_id") or session["user_id"])
+        around = max(0, min(int(request.args.get("around", 5)), 50))
+    except ValueError:
+        return jsonify({"error": "user_id and around must be integers"}), 400
+    standing = user_rank(user_id, date_from, date_to, around=around)
+    if standing is None:
+        return jsonify({"error": "no points in this period", "user_id": user_id}), 404
+    standing.update(date_from=date_from.isoformat(), date_to=date_to.isoformat())
+    return jsonify(standing)
+
+
+@leaderboard_bp.route("/page", methods=["GET"])
+@login_required
+def page_api():
+    """JSON page of the full ranking; pass the returned next_cursor as ?cursor= for the next one."""
+    date_from, date_to, _ = window_from_args()
+    try:
+        limit = max(1, min(int(request.args.get("limit", LEADERBOARD_LIMIT)), 500))
+        rows, next_cursor = leaderboard_page(date_from, date_to, request.args.get("cursor"), limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"rows": rows, "next_cursor": next_cursor,
+                    "date_from": date_from.isoformat(), "date_to": date_to.isoformat()})
+
+
+@leaderboard_bp.route("/stream", methods=["GET"])
+@login_required
+def stream():
+    """Server-Sent Events for the page's window: a snapshot of the rows, then deltas as points change."""
+    date_from, date_to, _ = window_from_args()
+    feed = leaderboard_stream.get_feed(current_app._get_current_object())
+    window = feed.subscribe(date_from, date_to)
+    if window is None:
+        resp = jsonify({"error": "too many live leaderboard subscribers; try again later"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "30"
+        return resp
+    resp = current_app.response_class(feed.stream(window, request.headers.get("Last-Event-ID")),
+                                      mimetype="text/event-stream")
+    # runs however the response ends, even if the body was never iterated
+    resp.call_on_close(lambda: feed.unsubscribe(window))
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
@@ -0,0 +1,318 @@
+"""
+In-process rolling N-day leaderboard. Each worker keeps, per window length, every
+user's points per day inside the window and their running total in a sorted
+structure, so top-K and rank queries are answered from memory. Built from
+lifestyle_points in a background thread on first use, fed by
+lifestyle_points_changed in this worker and by a periodic updated_at poll for
+writes made by other workers.
+"""
+import os
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from .extensions import db
+from .models import LifestylePoint
+from .signals import lifestyle_points_changed
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+ENGINE_ENABLED = os.environ.get("LEADERBOARD_ENGINE", "0").lower() in ("1", "true", "yes")
+# how often a worker polls lifestyle_points for other workers' writes
+ENGINE_SYNC_SECONDS = float(os.environ.get("LEADERBOARD_ENGINE_SYNC_SECONDS", 2.0))
+# re-read rows stamped this long before the last poll: updated_at is taken before commit
+ENGINE_SYNC_SLACK = float(os.environ.get("LEADERBOARD_ENGINE_SYNC_SLACK", 30.0))
+
+
+class SortedKeys:
+    """
+    Sorted list of comparable keys stored as a list of short sorted lists, so
+    inserts and removals move at most `load` * 2 items and index lookups bisect
+    the sublist maxima, then count the preceding sublists' lengths.
+    """
+
+    def __init__(self, keys=(), load=1000):
+        self._load = load
+        keys = sorted(keys)
+        self._lists = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [lst[-1] for lst in self._lists]
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+        else:
+            i = min(bisect_left(self._maxes, key), len(self._lists) - 1)
+            lst = self._lists[i]
+            insort(lst, key)
+            self._maxes[i] = lst[-1]
+            if len(lst) > 2 * self._load:
+                self._lists[i:i + 1] = [lst[:self._load], lst[self._load:]]
+                self._maxes[i:i + 1] = [lst[self._load - 1], lst[-1]]
+        self._len += 1
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        lst = self._lists[i] if i < len(self._lists) else []
+        j = bisect_left(lst, key)
+        if j == len(lst) or lst[j] != key:
+            raise KeyError(key)
+        del lst[j]
+        if lst:
+            self._maxes[i] = lst[-1]
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+        self._len -= 1
+
+    def index(self, key):
+        """Number of stored keys < key."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return self._len
+        return sum(len(lst) for lst in self._lists[:i]) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        out = []
+        pos = 0
+        for lst in self._lists:
+            if pos + len(lst) > start:
+                out.extend(lst[max(0, start - pos):stop - pos])
+                if pos + len(lst) >= stop:
+                    break
+            pos += len(lst)
+        return out
+
+
+class SlidingWindowBoard:
+    """
+    Totals over the `days` days ending at `anchor`. Users are ordered by
+    (total desc, user_id asc), the same order as the SQL ranking; points for days
+    past the anchor slide the window forward and expire the oldest days.
+    """
+
+    def __init__(self, days, anchor):
+        self.days = days
+        self.anchor = anchor
+        self._by_day = {}    # date -> {user_id: points}, one bucket per day in the window
+        self._totals = {}    # user_id -> total over the window
+        self._keys = SortedKeys()
+        self._lock = threading.RLock()
+        self.synced_to = datetime.utcnow()
+
+    @property
+    def first_day(self):
+        return self.anchor - timedelta(days=self.days - 1)
+
+    def __len__(self):
+        return len(self._totals)
+
+    def load(self, rows):
+        """Bulk-fill from (user_id, date, points) rows; replaces the current contents."""
+        by_day, totals = {}, {}
+        first, last = self.first_day, self.anchor
+        for uid, day, points in rows:
+            if first <= day <= last:
+                points = float(points or 0.0)
+                by_day.setdefault(day, {})[uid] = points
+                totals[uid] = totals.get(uid, 0.0) + points
+        keys = SortedKeys((-total, uid) for uid, total in totals.items())
+        with self._lock:
+            self._by_day, self._totals, self._keys = by_day, totals, keys
+
+    def _sum(self, uid):
+        # summed afresh from at most `days` buckets, so totals never drift
+        total, present = 0.0, False
+        for bucket in self._by_day.values():
+            points = bucket.get(uid)
+            if points is not None:
+                total += points
+                present = True
+        return total if present else None
+
+    def _retotal(self, uid):
+        old = self._totals.get(uid)
+        if old is not None:
+            self._keys.remove((-old, uid))
+        total = self._sum(uid)
+        if total is not None:
+            self._totals[uid] = total
+            self._keys.add((-total, uid))
+        else:
+            self._totals.pop(uid, None)
+
+    def set_points(self, uid, day, points):
+        """Record the user's points for `day` (an absolute value, so replays are harmless)."""
+        points = float(points or 0.0)
+        with self._lock:
+            if day > self.anchor:
+                self.advance(day)
+            if day < self.first_day:
+                return
+            bucket = self._by_day.setdefault(day, {})
+            if bucket.get(uid) == points:
+                return
+            bucket[uid] = points
+            self._retotal(uid)
+
+    def advance(self, anchor):
+        """Slide the window to end at `anchor`, expiring the day buckets that fall out of it."""
+        with self._lock:
+            if anchor <= self.anchor:
+                return
+            self.anchor = anchor
+            first = self.first_day
+            expired = [self._by_day.pop(d) for d in [d for d in self._by_day if d < first]]
+            affected = set().union(*expired)
+            if len(affected) * 8 < len(self._totals):
+                for uid in affected:
+                    self._retotal(uid)
+                return
+            # a large share of users moved: one sort beats that many single moves
+            for uid in affected:
+                total = self._sum(uid)
+                if total is None:
+                    del self._totals[uid]
+                else:
+                    self._totals[uid] = total
+            self._keys = SortedKeys((-total, uid) for uid, total in self._totals.items())
+
+    def top(self, k):
+        """[(user_id, total)] for the first k users."""
+        with self._lock:
+            return [(uid, -neg) for neg, uid in self._keys.slice(0, k)]
+
+    def rank(self, uid, around=0):
+        """
+        {rank, position, total, neighbors} for the user, or None if they have no
+        points in the window. rank counts strictly higher totals, as RANK() does;
+        neighbors is [(position, user_id, total)] around the user.
+        """
+        with self._lock:
+            total = self._totals.get(uid)
+            if total is None:
+                return None
+            higher = self._keys.index((-total, float("-inf")))
+            position = self._keys.index((-total, uid)) + 1
+            start = max(0, position - 1 - around)
+            neighbors = [(start + i + 1, u, -neg)
+                         for i, (neg, u) in enumerate(self._keys.slice(start, position + around))]
+            return {"rank": higher + 1, "position": position, "total": total, "neighbors": neighbors}
+
+
+_state = {"pid": None, "boards": {}, "building": set(), "synced_at": 0.0}
+_lock = threading.Lock()
+
+
+def _window_rows(first_day, last_day):
+    q = select(LifestylePoint.user_id, LifestylePoint.date, LifestylePoint.points).where(
+        LifestylePoint.date >= first_day, LifestylePoint.date <= last_day)
+    return db.session.execute(q.execution_options(yield_per=10000))
+
+
+def build_board(days, today=None):
+    """Load a board from lifestyle_points and install it for this worker. Must run inside an app context."""
+    today = today or date.today()
+    t0 = time.perf_counter()
+    board = SlidingWindowBoard(days, today)
+    # rows written while loading are stamped after this and replayed by the next poll
+    board.synced_to = datetime.utcnow()
+    board.load(_window_rows(board.first_day, today))
+    with _lock:
+        _state["boards"][days] = board
+        _state["building"].discard(days)
+    logger.info("Leaderboard engine: built %d-day board with %d users in %.2fs (pid %d)",
+                days, len(board), time.perf_counter() - t0, os.getpid())
+    return board
+
+
+def _build_in_background(app, days, today):
+    try:
+        with app.app_context():
+            build_board(days, today)
+    except Exception:
+        logger.exception("Leaderboard engine: building the %d-day board failed", days)
+        with _lock:
+            _state["building"].discard(days)
+
+
+def _sync(boards):
+    """Apply lifestyle_points rows written since the last poll (by any worker)."""
+    now = datetime.utcnow()
+    since = min(b.synced_to for b in boards) - timedelta(seconds=ENGINE_SYNC_SLACK)
+    first = min(b.first_day for b in boards)
+    q = select(LifestylePoint.user_id, LifestylePoint.date, LifestylePoint.points).where(
+        LifestylePoint.updated_at >= since, LifestylePoint.date >= first)
+    applied = 0
+    for uid, day, points in db.session.execute(q):
+        for board in boards:
+            board.set_points(uid, day, points)
+        applied += 1
+    for board in boards:
+        board.synced_to = now
+    return applied
+
+
+def get_board(days, today=None):
+    """
+    This worker's board for the rolling `days`-day window ending today, synced
+    with other workers' writes at most every ENGINE_SYNC_SECONDS. The first call
+    starts loading it in a background thread and returns None, as do calls until
+    it's ready; callers fall back to SQL meanwhile. Must run inside an app context.
+    """
+    today = today or date.today()
+    pid = os.getpid()
+    with _lock:
+        if _state["pid"] != pid:
+            _state.update(pid=pid, boards={}, building=set(), synced_at=0.0)
+        board = _state["boards"].get(days)
+        if board is None:
+            if days not in _state["building"]:
+                _state["building"].add(days)
+                threading.Thread(target=_build_in_background, args=(current_app._get_current_object(), days, today),
+                                 name=f"leaderboard-engine-{days}", daemon=True).start()
+            return None
+        sync = time.monotonic() - _state["synced_at"] >= ENGINE_SYNC_SECONDS
+        if sync:
+            _state["synced_at"] = time.monotonic()
+        boards = list(_state["boards"].values())
+    if sync:
+        try:
+            _sync(boards)
+        except Exception:
+            logger.exception("Leaderboard engine sync failed")
+    board.advance(today)
+    return board
+
+
+def engine_status():
+    """Boards loaded in this worker, for /healthz/ready."""
+    mine = _state["pid"] == os.getpid()
+    boards = dict(_state["boards"]) if mine else {}
+    return {
+        "enabled": ENGINE_ENABLED,
+        "boards": {str(days): {"users": len(b), "anchor": b.anchor.isoformat()} for days, b in boards.items()},
+        "building": sorted(_state["building"]) if mine else [],
+    }
+
+
+def reset_boards():
+    """Drop this worker's boards; the next get_board() rebuilds from the database."""
+    with _lock:
+        _state.update(boards={}, synced_at=0.0)
+
+
+@lifestyle_points_changed.connect
+def _on_points_changed(sender, **kwargs):
+    for board in list(_state["boards"].values()) if _state["pid"] == os.getpid() else ():
+        board.set_points(kwargs["user_id"], kwargs["date"], kwargs["points"])
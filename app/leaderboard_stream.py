@@ -0,0 +1,239 @@
+"""
+Live leaderboard updates over Server-Sent Events. Each worker runs one change
+feed: subscribers register the window they're watching, and a single feed
+thread re-reads each watched window from the shared leaderboard cache (whose
+entries every committed point change invalidates, in any worker), diffs it
+against the last published rows and publishes the difference once per window,
+however many subscribers are waiting on it. Local changes wake the thread at
+once; bursts within STREAM_COALESCE_SECONDS go out as one event.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from .signals import lifestyle_points_changed
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# how often watched windows are re-checked for other workers' writes
+STREAM_POLL_SECONDS = float(os.environ.get("LEADERBOARD_STREAM_POLL_SECONDS", 2.0))
+# wait this long after a change before publishing, to fold bursts into one event
+STREAM_COALESCE_SECONDS = float(os.environ.get("LEADERBOARD_STREAM_COALESCE_SECONDS", 0.5))
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("LEADERBOARD_STREAM_HEARTBEAT_SECONDS", 15.0))
+# streams end after this long and the browser reconnects, so no connection holds a thread forever
+STREAM_MAX_SECONDS = float(os.environ.get("LEADERBOARD_STREAM_MAX_SECONDS", 300.0))
+# keep below gunicorn.conf.py threads, or streams starve page requests
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get("LEADERBOARD_STREAM_MAX_SUBSCRIBERS", 48))
+# published events kept per window; a subscriber further behind gets a fresh snapshot
+STREAM_BACKLOG = 32
+
+
+class WindowFeed:
+    """Published state of one watched window: the current rows and recent deltas."""
+
+    def __init__(self, date_from, date_to, entry):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.subscribers = 0
+        self.seq = 0
+        self.etag = entry["etag"]
+        self.rows = entry["rows"]
+        self.events = deque(maxlen=STREAM_BACKLOG)   # (seq, payload)
+
+    def snapshot(self):
+        return {"etag": self.etag, "rows": self.rows}
+
+    def publish(self, entry):
+        """Diff the entry against the published rows; returns the delta payload or None if nothing changed."""
+        if entry["etag"] == self.etag:
+            return None
+        before = {r["user_id"]: r for r in self.rows}
+        rows = entry["rows"]
+        changed = [r for r in rows if before.get(r["user_id"]) != r]
+        kept = {r["user_id"] for r in rows}
+        removed = [uid for uid in before if uid not in kept]
+        self.etag, self.rows = entry["etag"], rows
+        if not changed and not removed:
+            return None
+        self.seq += 1
+        payload = {"etag": self.etag, "size": len(rows), "changed": changed, "removed": removed}
+        self.events.append((self.seq, payload))
+        return payload
+
+
+class ChangeFeed:
+    """One per worker process; see the module docstring."""
+
+    def __init__(self, app):
+        self.app = app
+        self._cond = threading.Condition()
+        self._windows = {}        # (date_from, date_to) -> WindowFeed
+        self._subscribers = 0
+        self._dirty_at = None     # monotonic time of the first unpublished local change
+        self._thread = None
+
+    def subscribe(self, date_from, date_to):
+        """
+        Register a subscriber; returns its WindowFeed, or None when the worker is at
+        its limit. The caller must unsubscribe() when the stream closes.
+        """
+        from .leaderboard import cached_leaderboard
+
+        key = (date_from, date_to)
+        with self._cond:
+            if self._subscribers >= STREAM_MAX_SUBSCRIBERS:
+                return None
+            self._subscribers += 1
+            window = self._windows.get(key)
+        if window is None:
+            try:
+                fresh = WindowFeed(date_from, date_to, cached_leaderboard(date_from, date_to))
+            except Exception:
+                with self._cond:
+                    self._subscribers -= 1
+                raise
+        with self._cond:
+            window = self._windows.setdefault(key, window or fresh)
+            window.subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="leaderboard-stream", daemon=True)
+                self._thread.start()
+            return window
+
+    def unsubscribe(self, window):
+        with self._cond:
+            window.subscribers -= 1
+            self._subscribers -= 1
+            if window.subscribers <= 0:
+                self._windows.pop((window.date_from, window.date_to), None)
+            self._cond.notify_all()
+
+    def changed(self, day):
+        """A committed point change in this worker; watched windows holding `day` are re-read soon."""
+        with self._cond:
+            if self._dirty_at is None and any(w.date_from <= day <= w.date_to for w in self._windows.values()):
+                self._dirty_at = time.monotonic()
+                self._cond.notify_all()
+
+    def wait(self, window, after_seq, timeout):
+        """
+        Events for `window` published after `after_seq`, blocking up to `timeout`.
+        Returns [] on timeout, or None when the subscriber has fallen behind the
+        backlog and should be sent window.snapshot() instead.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while window.seq <= after_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            events = [e for e in window.events if e[0] > after_seq]
+            if not events or events[0][0] != after_seq + 1:
+                return None
+            return events
+
+    def _run(self):
+        from .leaderboard import cached_leaderboard
+
+        last_poll = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                now = time.monotonic()
+                if self._dirty_at is not None:
+                    delay = self._dirty_at + STREAM_COALESCE_SECONDS - now
+                else:
+                    delay = last_poll + STREAM_POLL_SECONDS - now
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._dirty_at = None
+                windows = list(self._windows.values())
+            last_poll = time.monotonic()
+            try:
+                with self.app.app_context():
+                    entries = [(w, cached_leaderboard(w.date_from, w.date_to)) for w in windows]
+            except Exception:
+                logger.exception("Leaderboard stream: re-reading watched windows failed")
+                continue
+            with self._cond:
+                published = [w.publish(entry) for w, entry in entries]
+                if any(published):
+                    self._cond.notify_all()
+
+    def stream(self, window, last_event_id=None):
+        """
+        The SSE body for one subscriber: a snapshot (skipped when the browser
+        reconnects already holding the current state), then deltas as they're
+        published, comment heartbeats in between, until STREAM_MAX_SECONDS.
+        The event id is the window's ETag, so reconnects can resume.
+        """
+        yield "retry: 3000\n\n"
+        with self._cond:
+            seq, snapshot = window.seq, window.snapshot()
+        if last_event_id != snapshot["etag"]:
+            yield format_event("snapshot", snapshot, snapshot["etag"])
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = self.wait(window, seq, min(STREAM_HEARTBEAT_SECONDS, remaining))
+            if events is None:
+                with self._cond:
+                    seq, snapshot = window.seq, window.snapshot()
+                yield format_event("snapshot", snapshot, snapshot["etag"])
+            elif not events:
+                yield ": keepalive\n\n"
+            else:
+                for seq, payload in events:
+                    yield format_event("delta", payload, payload["etag"])
+
+    def stats(self):
+        with self._cond:
+            return {"subscribers": self._subscribers, "windows": len(self._windows)}
+
+
+_state = {"pid": None, "feed": None}
+_lock = threading.Lock()
+
+
+def get_feed(app):
+    """This worker's ChangeFeed for `app`, created on first use and again after fork."""
+    pid = os.getpid()
+    feed = _state["feed"]
+    if _state["pid"] != pid or feed is None or feed.app is not app:
+        with _lock:
+            feed = _state["feed"]
+            if _state["pid"] != pid or feed is None or feed.app is not app:
+                feed = _state["feed"] = ChangeFeed(app)
+                _state["pid"] = pid
+    return feed
+
+
+def stream_status():
+    """Live subscribers in this worker, for /healthz/ready."""
+    feed = _state["feed"] if _state["pid"] == os.getpid() else None
+    return feed.stats() if feed is not None else {"subscribers": 0, "windows": 0}
+
+
+def format_event(event, payload, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(payload, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+@lifestyle_points_changed.connect
+def _on_points_changed(sender, **kwargs):
+    feed = _state["feed"] if _state["pid"] == os.getpid() else None
+    if feed is not None and kwargs.get("date") is not None:
+        feed.changed(kwargs["date"])
@@ -0,0 +1,249 @@
+import io
+import os
+import re
+import csv
+import json
+import logging
+from datetime import date, time as dtime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import insert
+
+from . import http_client
+from .cache import nutrition_cache, normalize_query
+from .extensions import db
+from .models import Meal
+from .nutrition import lookup_nutrition_text, compute_flags_for_meal
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("MEAL_IMPORT_CHUNK_SIZE", 1000))
+# CalorieNinjas parses several foods out of one query; keep each batch well under its length limit
+IMPORT_BATCH_FOODS = int(os.environ.get("MEAL_IMPORT_BATCH_FOODS", 20))
+IMPORT_BATCH_CHARS = int(os.environ.get("MEAL_IMPORT_BATCH_CHARS", 1000))
+
+_MACROS = ("protein_g", "carbs_g", "fat_g")
+# a leading amount and unit, as in "2 eggs", "100g rice", "1.5 cups of milk"
+_AMOUNT_RE = re.compile(r"^\d+(?:[./]\d+)?(?:\s*(?:x|g|kg|mg|oz|lbs?|ml|l|cups?|tbsp|tsp|slices?|pieces?|servings?)\b|\s)"
+                        r"\s*(?:of\s+)?")
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    return "csv"
+
+
+def iter_import_rows(stream: Iterable[str], fmt: str) -> Iterator[dict]:
+    """Yield raw row dicts from a text stream without reading it all into memory."""
+    if fmt == "ndjson":
+        for lineno, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = {"_error": f"line {lineno}: invalid JSON"}
+            yield row if isinstance(row, dict) else {"_error": f"line {lineno}: not an object"}
+        return
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def _opt_float(value) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    return float(value)
+
+
+def parse_row(row: dict) -> dict:
+    """Normalize one import row into Meal column values. Raises ImportRowError."""
+    if row.get("_error"):
+        raise ImportRowError(row["_error"])
+    name = str(row.get("name") or row.get("food") or row.get("title") or "").strip()
+    if not name:
+        raise ImportRowError("missing meal name")
+    try:
+        raw_date = row.get("date")
+        meal_date = date.fromisoformat(str(raw_date).strip()[:10]) if raw_date else date.today()
+        raw_time = row.get("time")
+        meal_time = dtime.fromisoformat(str(raw_time).strip()) if raw_time else None
+        calories = _opt_float(row.get("calories", row.get("kcal")))
+        macros = {k: _opt_float(row.get(k)) for k in _MACROS}
+    except (TypeError, ValueError) as e:
+        raise ImportRowError(str(e))
+    return {"name": name[:255], "date": meal_date, "time": meal_time, "calories": calories, **macros}
+
+
+def food_name(query: str) -> str:
+    """The food a query names, without its leading amount: "2 eggs" -> "eggs"."""
+    text = normalize_query(query)
+    return _AMOUNT_RE.sub("", text, count=1) or text
+
+
+def _query_calorieninjas_batch(names: List[str]) -> Optional[List[dict]]:
+    """
+    One compound CalorieNinjas query for several foods. Returns per-name results only
+    when the response maps back unambiguously (one item per food, in order, each
+    item named exactly as the food in its query); otherwise None so callers fall back.
+    """
+    api_key = os.environ.get("CALORIE_NINJAS_KEY") or os.environ.get("API_NINJAS_KEY")
+    if not api_key:
+        return None
+    r = http_client.get("calorieninjas", "https://api.calorieninjas.com/v1/nutrition",
+                        params={"query": ", ".join(names)}, headers={"X-Api-Key": api_key}, timeout=8)
+    r.raise_for_status()
+    items = r.json().get("items") or []
+    if len(items) != len(names):
+        return None
+    out = []
+    for name, item in zip(names, items):
+        item_name = normalize_query(item.get("name"))
+        if not item_name or item_name != food_name(name):
+            return None
+        out.append({
+            "kcal": float(item.get("calories", 0) or 0),
+            "protein_g": float(item.get("protein_g", 0) or 0),
+            "carbs_g": float(item.get("carbohydrates_total_g", 0) or 0),
+            "fat_g": float(item.get("fat_total_g", 0) or 0),
+            "source": "calorieninjas",
+        })
+    return out
+
+
+def _batches(names: List[str]) -> Iterator[List[str]]:
+    batch, size = [], 0
+    for n in names:
+        if batch and (len(batch) >= IMPORT_BATCH_FOODS or size + len(n) + 2 > IMPORT_BATCH_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(n)
+        size += len(n) + 2
+    if batch:
+        yield batch
+
+
+def resolve_nutrition_batch(names: Iterable[str], known: Optional[Dict[str, Optional[dict]]] = None) -> Dict[str, Optional[dict]]:
+    """
+    Resolve many food strings at once. Names are deduplicated on their normalized
+    form; the shared nutrition cache answers what it can, the rest go out as
+    compound provider queries, and anything that can't be mapped back is looked up
+    individually. `known` is an optional memo carried across calls.
+    """
+    resolved = known if known is not None else {}
+    todo, seen = [], set()
+    for n in names:
+        key = normalize_query(n)
+        if not key or key in resolved or key in seen:
+            continue
+        seen.add(key)
+        hit, value = nutrition_cache.lookup(key)
+        if hit:
+            resolved[key] = value
+        else:
+            todo.append(key)
+
+    for batch in _batches(todo):
+        results = None
+        if len(batch) > 1:
+            try:
+                results = _query_calorieninjas_batch(batch)
+            except Exception as e:
+                logger.debug("Batched CalorieNinjas lookup failed (%d foods): %s", len(batch), e)
+        if results is not None:
+            for key, value in zip(batch, results):
+                nutrition_cache.set(key, value)
+                resolved[key] = value
+            continue
+        for key in batch:
+            resolved[key] = lookup_nutrition_text(key)
+    return resolved
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_meals(user_id: int, rows: Iterable[dict], chunk_size: int = IMPORT_CHUNK_SIZE,
+                 max_errors: int = 50) -> dict:
+    """
+    Bulk-insert meals for one user. Rows are processed in chunks: nutrition for the
+    chunk's distinct foods is resolved in batch, the chunk is written with one
+    executemany INSERT and committed, and lifestyle points are recomputed once per
+    affected day at the end. Must run inside an app context.
+    """
+    from .activities import compute_lifestyle_points_for_user_date
+
+    summary = {"rows": 0, "inserted": 0, "errors": [], "foods_resolved": 0, "days_rescored": 0}
+    memo: Dict[str, Optional[dict]] = {}
+    days = set()
+    for chunk in _chunks(iter(rows), chunk_size):
+        parsed = []
+        for raw in chunk:
+            summary["rows"] += 1
+            try:
+                parsed.append(parse_row(raw))
+            except ImportRowError as e:
+                if len(summary["errors"]) < max_errors:
+                    summary["errors"].append({"row": summary["rows"], "error": str(e)})
+        need = [p["name"] for p in parsed if p["calories"] is None]
+        resolve_nutrition_batch(need, known=memo)
+
+        mappings = []
+        for p in parsed:
+            if p["calories"] is None:
+                info = memo.get(normalize_query(p["name"])) or {}
+                p["calories"] = info.get("kcal") or 0.0
+                for k in _MACROS:
+                    if p[k] is None:
+                        p[k] = info.get(k)
+            flagged, reason = compute_flags_for_meal(_MealValues(p["name"], p["calories"]))
+            p.update(user_id=user_id, flagged=flagged, flag_reason=reason or None)
+            mappings.append(p)
+            days.add(p["date"])
+        if not mappings:
+            continue
+        try:
+            db.session.execute(insert(Meal), mappings)
+            db.session.commit()
+            summary["inserted"] += len(mappings)
+        except Exception:
+            db.session.rollback()
+            logger.exception("Bulk meal insert failed for user_id=%s", user_id)
+            raise
+
+    summary["foods_resolved"] = len(memo)
+    for d in sorted(days):
+        try:
+            compute_lifestyle_points_for_user_date(user_id, d)
+            summary["days_rescored"] += 1
+        except Exception:
+            logger.exception("Failed to recompute lifestyle points for user_id=%s date=%s", user_id, d)
+    return summary
+
+
+class _MealValues:
+    """Just enough of a Meal for compute_flags_for_meal."""
+
+    def __init__(self, name, calories):
+        self.name = name
+        self.calories = calories
+
+
+def text_stream(binary) -> io.TextIOWrapper:
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
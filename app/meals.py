@@ -1,15 +1,21 @@
 import os
 import time
 import json
-import requests
 from flask import (
     Blueprint, request, jsonify, render_template, redirect, url_for, flash, current_app, session
 )
+from . import http_client
 from .extensions import db
 from .models import Meal, LifestylePoint, FitnessData
 from .schemas import MealSchema
 from .utils import login_required, get_current_user
-from .nutrition import compute_flags_for_meal, compute_daily_targets, compute_lifestyle_points
+from .nutrition import (
+    compute_flags_for_meal, compute_daily_targets, compute_lifestyle_points,
+    lookup_nutrition_text, nutrition_lookup_mode
+)
+from .cache import calorie_cache, normalize_query
+from .enrichment import enrichment_mode, submit_meal_enrichment, PENDING
+from .meal_import import import_meals, iter_import_rows, detect_format, text_stream
 from datetime import date, datetime, timezone
 from marshmallow import ValidationError
 
@@ -24,35 +30,58 @@ def lookup_calories_calorieninjas(query):
         current_app.logger.debug("CALORIE_NINJAS_KEY not set; skipping lookup")
         return None
 
+    key = normalize_query(query)
+    hit, cached = calorie_cache.lookup(key)
+    if hit:
+        current_app.logger.debug("Calorie cache hit for query=%s", key)
+        return cached
+
+    calories, definitive = _query_calorieninjas(query)
+    if calories is not None or definitive:
+        calorie_cache.set(key, calories)
+    return calories
+
+def _query_calorieninjas(query):
+    """Returns (calories, definitive); definitive is False on transport/HTTP errors."""
     try:
         headers = {"X-Api-Key": CALORIE_NINJAS_KEY}
         params = {"query": query}
-        resp = requests.get(CALORIE_NINJAS_URL, params=params, headers=headers, timeout=8)
+        resp = http_client.get("calorieninjas", CALORIE_NINJAS_URL, params=params, headers=headers, timeout=8)
         current_app.logger.debug("CalorieNinjas HTTP %s for query=%s", resp.status_code, query)
         if resp.status_code != 200:
             current_app.logger.warning("CalorieNinjas returned %s: %s", resp.status_code, resp.text)
-            return None
+            return None, False
         data = resp.json()
         items = data.get("items") or []
         if not items:
-            return None
+            return None, True
         for item in items:
             c = item.get("calories")
             if c is not None:
                 try:
-                    return float(c)
+                    return float(c), True
                 except Exception:
                     continue
         first = items[0]
         if "calories" in first:
             try:
-                return float(first["calories"])
+                return float(first["calories"]), True
             except Exception:
                 pass
-        return None
+        return None, True
     except Exception:
         current_app.logger.exception("CalorieNinjas lookup failed")
-        return None
+        return None, False
+
+def _lookup_meal_nutrition(name):
+    """
+    kcal (and macros when known) for a meal name. In hedged mode this is the
+    deadline-bounded multi-provider lookup; otherwise the CalorieNinjas calorie lookup.
+    """
+    if nutrition_lookup_mode() == "hedged":
+        return lookup_nutrition_text(name)
+    calories = lookup_calories_calorieninjas(name)
+    return {"kcal": calories} if calories is not None else None
 
 def _server_now():
     """
@@ -89,6 +118,13 @@ def index():
     except Exception:
         current_app.logger.exception("compute_daily_targets failed; using empty")
         targets = {}
+    if db.session.is_modified(user):
+        # the memoized target was (re)computed; keep it so later renders skip the model
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Failed to store memoized target for user_id=%s", user.id)
 
     target_calories = None
     if isinstance(targets, dict):
@@ -150,11 +186,17 @@ def add_meal():
         flash("Please provide a meal name (e.g. '1 apple').", "warning")
         return redirect(url_for("meals.index"))
     meal_date, meal_time = _server_now()
+    deferred = enrichment_mode() == "async"
     calories = None
-    try:
-        calories = lookup_calories_calorieninjas(name)
-    except Exception:
-        current_app.logger.exception("CalorieNinjas lookup raised (non-fatal)")
+    macros = {}
+    if not deferred:
+        try:
+            info = _lookup_meal_nutrition(name)
+            if info:
+                calories = info.get("kcal")
+                macros = {k: info.get(k) for k in ("protein_g", "carbs_g", "fat_g")}
+        except Exception:
+            current_app.logger.exception("Nutrition lookup raised (non-fatal)")
     if calories is None:
         try:
             calories = float(incoming.get("calories") or incoming.get("kcal") or 0.0)
@@ -165,11 +207,12 @@ def add_meal():
         user_id=user.id,
         name=name,
         calories=calories,
-        protein_g=None,
-        carbs_g=None,
-        fat_g=None,
+        protein_g=macros.get("protein_g"),
+        carbs_g=macros.get("carbs_g"),
+        fat_g=macros.get("fat_g"),
         date=meal_date,
-        time=meal_time
+        time=meal_time,
+        enrichment_status=PENDING if deferred else None
     )
     try:
         db.session.add(meal)
@@ -179,6 +222,13 @@ def add_meal():
         current_app.logger.exception("Failed to save meal")
         flash("Failed to save meal (server error)", "danger")
         return redirect(url_for("meals.index"))
+    if deferred:
+        try:
+            submit_meal_enrichment(current_app._get_current_object(), meal.id)
+        except Exception:
+            current_app.logger.exception("Failed to queue meal enrichment for meal_id=%s", meal.id)
+        flash("Meal logged", "success")
+        return redirect(url_for("meals.index"))
     try:
         compute_flags_for_meal(meal)
         compute_lifestyle_points(user)
@@ -187,3 +237,22 @@ def add_meal():
 
     flash("Meal logged", "success")
     return redirect(url_for("meals.index"))
+
+@meals_bp.route("/import", methods=["POST"])
+@login_required
+def import_meals_upload():
+    """Bulk import from an uploaded CSV/NDJSON file (field 'file') or a raw request body."""
+    user = get_current_user()
+    upload = request.files.get("file")
+    if upload is not None:
+        fmt = request.args.get("format") or detect_format(upload.filename, upload.mimetype)
+        stream = text_stream(upload.stream)
+    else:
+        fmt = request.args.get("format") or detect_format(None, request.content_type)
+        stream = text_stream(request.stream)
+    try:
+        summary = import_meals(user.id, iter_import_rows(stream, fmt))
+    except Exception:
+        current_app.logger.exception("Meal import failed for user_id=%s", user.id)
+        return jsonify({"error": "import_failed"}), 500
+    return jsonify(summary), 200
@@ -0,0 +1,310 @@
+"""
+Prometheus metrics, added up across gunicorn workers without an external
+collector. Each worker keeps its samples in memory; a background thread writes
+them to the worker's own file in METRICS_DIR every METRICS_FLUSH_SECONDS when
+they changed, and once more when the worker exits. /metrics merges every
+worker's file with the live samples of the worker serving the scrape. Counters and histograms of exited workers keep counting; gauges
+only count workers that are still running.
+"""
+import os
+import json
+import math
+import time
+import atexit
+import logging
+import secrets
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INSTANCE_DIR = os.path.join(os.getcwd(), "instance")
+
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(INSTANCE_DIR, "metrics"))
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1.0))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry = {}
+# the file name carries a per-process token as well, so a reused pid never overwrites an exited worker's file
+_state = {"pid": os.getpid(), "token": secrets.token_hex(4), "dirty": False, "flusher": None}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _reset(self):
+        self._values = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+            _state["dirty"] = True
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+            _state["dirty"] = True
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = float(value)
+            _state["dirty"] = True
+
+
+class Histogram(_Metric):
+    """Per-bucket counts (not cumulative until rendered), then sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(float(b) for b in buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[i] += 1
+            counts[-1] += value
+            _state["dirty"] = True
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+
+# --- the application's metrics -----------------------------------------------
+
+REQUEST_LATENCY = Histogram("fitgenix_http_request_duration_seconds",
+                            "Time to handle a request, by Flask endpoint.", ("endpoint", "method"))
+REQUESTS = Counter("fitgenix_http_requests_total", "Requests handled, by endpoint and status.",
+                   ("endpoint", "method", "status"))
+IN_FLIGHT = Gauge("fitgenix_http_requests_in_flight", "Requests being handled right now.", ("endpoint",))
+REQUEST_DB_QUERIES = Counter("fitgenix_http_request_db_queries_total", "SQL statements run by requests.",
+                             ("endpoint",))
+REQUEST_DB_SECONDS = Counter("fitgenix_http_request_db_seconds_total", "Time requests spent in SQL statements.",
+                             ("endpoint",))
+OUTBOUND_LATENCY = Histogram("fitgenix_outbound_request_duration_seconds",
+                             "Calls to external providers (CalorieNinjas, Edamam, Google...), per attempt.",
+                             ("provider", "outcome"))
+MODEL_LOAD_SECONDS = Histogram("fitgenix_model_load_seconds", "Loading the target-calorie model from disk.",
+                               buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+MODEL_PREDICT_SECONDS = Histogram("fitgenix_model_predict_seconds", "Target-calorie model predict() calls.",
+                                  ("path",), buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                                                      0.025, 0.05, 0.1, 0.25, 1.0, 5.0))
+
+
+# --- multiprocess store --------------------------------------------------------
+
+def _after_fork():
+    # samples taken in the master before fork belong to the master, not to every worker
+    for metric in list(_registry.values()):
+        metric._reset()
+    _state.update(pid=os.getpid(), token=secrets.token_hex(4), dirty=False, flusher=None)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _snapshot(flushing=False):
+    with _lock:
+        if flushing:
+            _state["dirty"] = False
+        return {name: {"kind": m.kind, "samples": [[list(k), (list(v) if isinstance(v, list) else v)]
+                                                    for k, v in m._values.items()]}
+                for name, m in _registry.items()}
+
+
+def _own_file():
+    return os.path.join(METRICS_DIR, f"{_state['pid']}-{_state['token']}.json")
+
+
+def flush():
+    """Write this process's samples to its file in METRICS_DIR."""
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _own_file()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"pid": _state["pid"], "metrics": _snapshot(flushing=True)}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except Exception:
+        logger.exception("Writing metrics to %s failed", METRICS_DIR)
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        if _state["dirty"]:
+            flush()
+
+
+def start_flusher():
+    """Start this process's flush thread, once per process (threads don't survive fork)."""
+    if _state["flusher"] is None:
+        with _lock:
+            if _state["flusher"] is None:
+                _state["flusher"] = threading.Thread(target=_flush_periodically, name="metrics-flush", daemon=True)
+                _state["flusher"].start()
+
+
+atexit.register(flush)
+
+
+def clear_metrics_dir():
+    """Remove every worker's file; gunicorn's master calls this on start."""
+    try:
+        for name in os.listdir(METRICS_DIR):
+            if name.endswith(".json") or name.endswith(".tmp"):
+                os.remove(os.path.join(METRICS_DIR, name))
+    except FileNotFoundError:
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _add(merged, kind, key, value):
+    if kind == "histogram":
+        have = merged.get(key)
+        merged[key] = [a + b for a, b in zip(have, value)] if have is not None else list(value)
+    else:
+        merged[key] = merged.get(key, 0.0) + value
+
+
+def collect():
+    """{name: {labels tuple: value}} summed over every worker's samples."""
+    merged = {name: {} for name in _registry}
+    sources = [(True, _snapshot())]
+    own = os.path.basename(_own_file())
+    try:
+        names = [n for n in os.listdir(METRICS_DIR) if n.endswith(".json") and n != own]
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue    # removed or being replaced mid-scrape
+        sources.append((_pid_alive(data.get("pid")), data.get("metrics", {})))
+    for alive, metrics in sources:
+        for name, data in metrics.items():
+            metric = _registry.get(name)
+            if metric is None or data.get("kind") != metric.kind or (metric.kind == "gauge" and not alive):
+                continue
+            for key, value in data["samples"]:
+                _add(merged[name], metric.kind, tuple(key), value)
+    return merged
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{n}="{escape(v)}"' for n, v in pairs) + "}"
+
+
+def _number(v):
+    v = float(v)
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(v) if v != int(v) else str(int(v))
+
+
+def render():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, samples in sorted(collect().items()):
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(samples.items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Request latency, status and in-flight metrics for every Flask endpoint."""
+    from flask import g, request
+    from .instrumentation import current_stats
+
+    @app.before_request
+    def _metrics_start():
+        start_flusher()
+        g._metrics = (request.endpoint or "<unmatched>", time.perf_counter())
+        IN_FLIGHT.inc(endpoint=g._metrics[0])
+
+    # registered after init_instrumentation's hook, so it runs first and still sees the request's DB stats
+    @app.after_request
+    def _metrics_response(response):
+        g._metrics_status = response.status_code
+        stats = current_stats()
+        if stats is not None and "_metrics" in g:
+            REQUEST_DB_QUERIES.inc(stats.queries, endpoint=g._metrics[0])
+            REQUEST_DB_SECONDS.inc(stats.db_seconds, endpoint=g._metrics[0])
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        started = g.pop("_metrics", None)
+        if started is None:
+            return
+        endpoint, t0 = started
+        status = g.pop("_metrics_status", None) or 500
+        IN_FLIGHT.dec(endpoint=endpoint)
+        REQUEST_LATENCY.observe(time.perf_counter() - t0, endpoint=endpoint, method=request.method)
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=status)
@@ -1,5 +1,9 @@
 from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
 from .extensions import db
+from .signals import display_name_changed
 
 class User(db.Model):
     __tablename__ = "users"
@@ -13,11 +17,42 @@ class User(db.Model):
     birth_date = db.Column(db.Date)
     activity_multiplier = db.Column(db.Float, default=None, nullable=True)
     activity_level = db.Column(db.String(50), default=None, nullable=True)
+    goal = db.Column(db.String(16), default=None, nullable=True)
+    # memoized daily target and the feature tuple it was computed from (see nutrition.compute_daily_targets)
+    target_calories = db.Column(db.Float, default=None, nullable=True)
+    target_key = db.Column(db.String(128), default=None, nullable=True)
     google_tokens = db.Column(db.Text, default=None, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def display_name(self):
-        return self.full_name or (self.email.split("@")[0] if self.email else "User")
+        return User.display_name_for(self.full_name, self.email)
+
+    @staticmethod
+    def display_name_for(full_name, email):
+        """display_name() from bare column values, for queries that don't load User objects."""
+        return full_name or (email.split("@")[0] if email else "User")
+
+@event.listens_for(Session, "after_flush")
+def _note_display_name_changes(session, flush_context):
+    # history is still there in after_flush; the signal waits for the commit
+    changed = {u.id for u in session.dirty if isinstance(u, User)
+               and any(inspect(u).attrs[f].history.has_changes() for f in ("full_name", "email"))}
+    changed.update(u.id for u in session.deleted if isinstance(u, User))
+    if changed:
+        session.info.setdefault("_display_names_changed", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _send_display_name_changes(session):
+    user_ids = session.info.pop("_display_names_changed", None)
+    if user_ids and has_app_context():
+        try:
+            display_name_changed.send(current_app._get_current_object(), user_ids=sorted(user_ids))
+        except Exception:
+            current_app.logger.exception("display_name_changed receiver failed")
+
+@event.listens_for(Session, "after_rollback")
+def _forget_display_name_changes(session):
+    session.info.pop("_display_names_changed", None)
 
 class Meal(db.Model):
     __tablename__ = "meals"
@@ -32,6 +67,8 @@ class Meal(db.Model):
     fat_g = db.Column(db.Float, default=0.0)
     flagged = db.Column(db.Boolean, default=False)
     flag_reason = db.Column(db.String(255))
+    # None: resolved at insert time; "pending" until the background lookup backfills it
+    enrichment_status = db.Column(db.String(16), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     @property
@@ -66,7 +103,8 @@ class Meal(db.Model):
             "carbs_g": float(self.carbs_g or 0.0),
             "fat_g": float(self.fat_g or 0.0),
             "flagged": bool(self.flagged),
-            "flag_reason": self.flag_reason
+            "flag_reason": self.flag_reason,
+            "enrichment_status": self.enrichment_status
         }
 
 class Activity(db.Model):
@@ -95,6 +133,7 @@ class Activity(db.Model):
 
 class FitnessData(db.Model):
     __tablename__ = "fitness_data"
+    __table_args__ = (db.UniqueConstraint("user_id", "date", name="uq_fitness_data_user_date"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     date = db.Column(db.Date, nullable=False, index=True)
@@ -116,12 +155,15 @@ class FitnessData(db.Model):
 
 class LifestylePoint(db.Model):
     __tablename__ = "lifestyle_points"
+    __table_args__ = (db.UniqueConstraint("user_id", "date", name="uq_lifestyle_points_user_date"),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     date = db.Column(db.Date, nullable=False, index=True)
     points = db.Column(db.Float, default=0.0)
     reason = db.Column(db.String(512), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # polled by the in-process leaderboard engine for other workers' writes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def as_dict(self):
         return {
@@ -131,3 +173,104 @@ class LifestylePoint(db.Model):
             "points": float(self.points or 0.0),
             "reason": self.reason
         }
+
+class DailyAggregate(db.Model):
+    """Running per-day totals that lifestyle points are derived from; kept in step with Activity/FitnessData writes."""
+    __tablename__ = "daily_aggregates"
+    __table_args__ = (db.UniqueConstraint("user_id", "date", name="uq_daily_aggregates_user_date"),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    activity_minutes = db.Column(db.Float, nullable=False, default=0.0)
+    activity_kcal = db.Column(db.Float, nullable=False, default=0.0)
+    fit_kcal = db.Column(db.Float, nullable=True)
+    avg_bpm = db.Column(db.Float, nullable=True)
+    sleep_hours = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def totals(self):
+        return {
+            "activity_count": int(self.activity_count or 0),
+            "activity_minutes": float(self.activity_minutes or 0.0),
+            "activity_kcal": float(self.activity_kcal or 0.0),
+            "fit_kcal": self.fit_kcal,
+            "avg_bpm": self.avg_bpm,
+            "sleep_hours": self.sleep_hours,
+        }
+
+class LeaderboardRollup(db.Model):
+    """
+    Running leaderboard totals per user: period "day" (anchor = the date), "week"
+    (anchor = its Monday) and "rollingN" (anchor = the last day of the N-day window).
+    Maintained by delta from lifestyle point writes; see leaderboard.apply_points_delta.
+    """
+    __tablename__ = "leaderboard_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("period", "anchor_date", "user_id", name="uq_leaderboard_rollup_period_user"),
+        # matches the ranking order (total desc, user_id asc) so rank counts and keyset pages are index range scans
+        db.Index("ix_leaderboard_rollup_rank", "period", "anchor_date", db.text("total_points DESC"), "user_id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(16), nullable=False)
+    anchor_date = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    total_points = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LeaderboardRankBucket(db.Model):
+    """
+    How many users of one rollup window have a total in each score bucket of
+    leaderboard.RANK_BUCKET_WIDTH points, so a rank is a sum over a few bucket rows
+    plus a count inside one bucket. Maintained together with leaderboard_rollup.
+    """
+    __tablename__ = "leaderboard_rank_buckets"
+    __table_args__ = (
+        db.UniqueConstraint("period", "anchor_date", "bucket", name="uq_leaderboard_rank_buckets_window_bucket"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(16), nullable=False)
+    anchor_date = db.Column(db.Date, nullable=False)
+    bucket = db.Column(db.Integer, nullable=False)
+    users = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Group(db.Model):
+    """A team for challenges. Members' points are summed into group_leaderboard_rollup as they change."""
+    __tablename__ = "groups"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, index=True)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # kept by join/leave so team averages don't count memberships per request
+    member_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class GroupMembership(db.Model):
+    __tablename__ = "group_memberships"
+    __table_args__ = (db.UniqueConstraint("group_id", "user_id", name="uq_group_memberships_group_user"),)
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class GroupRollup(db.Model):
+    """
+    Per-group totals of the members' leaderboard_rollup rows, same periods and
+    anchors. Maintained by delta from point writes and membership changes; see
+    leaderboard.apply_points_delta and leaderboard.move_member_totals.
+    """
+    __tablename__ = "group_leaderboard_rollup"
+    __table_args__ = (
+        db.UniqueConstraint("period", "anchor_date", "group_id", name="uq_group_leaderboard_rollup_period_group"),
+        db.Index("ix_group_leaderboard_rollup_rank", "period", "anchor_date", db.text("total_points DESC"), "group_id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(16), nullable=False)
+    anchor_date = db.Column(db.Date, nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
+    total_points = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
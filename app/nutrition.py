@@ -1,22 +1,51 @@
 import os
 import json
 import pickle
+import hashlib
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import date
 from pathlib import Path
 from typing import Optional, Any, Dict
 
-import requests
+import numpy as np
+
 from requests.exceptions import RequestException, Timeout, HTTPError, ConnectionError, TooManyRedirects, SSLError
 
+from . import http_client
+from .cache import nutrition_cache, normalize_query
+from .fooddb import lookup_local_food
+from .metrics import MODEL_LOAD_SECONDS, MODEL_PREDICT_SECONDS
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(os.getcwd(), "instance", "target_cal_model.pkl"))
 MODEL_URL = os.environ.get("MODEL_URL", None)
+FEATURE_NAMES = ("age", "sex", "height_cm", "weight_kg", "activity", "goal")
+# seconds between checks of MODEL_PATH for a new version; 0 disables hot reload
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 30))
+MODEL_REQUIRED = str(os.environ.get("MODEL_REQUIRED", "")).strip().lower() in ("1", "true", "yes")
+
+
+class _LoadedModel:
+    """One immutable model version. Swapped in whole, so readers never see a partial load."""
+
+    def __init__(self, model, version, stamp, checksum):
+        self.model = model
+        self.version = version
+        self.stamp = stamp
+        self.checksum = checksum
+        self.loaded_at = time.time()
+
 
 # internal cache for loaded model
-_model_cache: Optional[Any] = None
+_model_current: Optional[_LoadedModel] = None
+_model_attempted = False
+_model_checked_at = 0.0
+_model_lock = threading.Lock()
 
 def _download_model_if_needed(model_url: str, model_path: str, timeout: int = 60) -> bool:
     """
@@ -35,8 +64,7 @@ def _download_model_if_needed(model_url: str, model_path: str, timeout: int = 60
     try:
         p.parent.mkdir(parents=True, exist_ok=True)
         logger.info("Downloading model from %s to %s", model_url, model_path)
-        with requests.Session() as s:
-            r = s.get(model_url, timeout=timeout, stream=True)
+        with http_client.get("model_download", model_url, timeout=timeout, stream=True) as r:
             r.raise_for_status()
             # Write to temp file then move — avoids partial files on failure
             tmp_path = model_path + ".part"
@@ -59,45 +87,307 @@ def _download_model_if_needed(model_url: str, model_path: str, timeout: int = 60
         return False
 
 
-def load_target_model() -> Optional[Any]:
+def _file_stamp(path: str):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def _file_checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TreeEnsemble:
     """
-    Load the pickled model from disk (MODEL_PATH). If MODEL_URL is set and the file
-    doesn't exist, attempt to download it first.
-    Returns the raw model object or None on failure.
+    A boosted tree ensemble flattened into NumPy arrays, so serving the calorie model
+    needs neither xgboost nor sklearn. All trees share one node table; `roots` holds
+    each tree's first node. predict() walks every tree for the whole batch at once,
+    one tree level per step.
     """
-    global _model_cache
 
-    if _model_cache is not None:
-        return _model_cache
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "missing_left", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots,
+                 base_score=0.0, strict=False, max_depth=None, float32_sum=False):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.missing_left = np.asarray(missing_left, dtype=bool)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_score = float(base_score)
+        # xgboost sends x < threshold left; sklearn sends x <= threshold left
+        self.strict = bool(strict)
+        # xgboost accumulates tree outputs in float32, tree by tree, starting from base_score
+        self.float32_sum = bool(float32_sum)
+        self.max_depth = int(max_depth) if max_depth is not None else self._depth()
+
+    def _depth(self) -> int:
+        depth, nodes = 0, self.roots
+        while True:
+            nodes = nodes[self.feature[nodes] >= 0]
+            if not len(nodes):
+                return depth
+            nodes = np.concatenate([self.left[nodes], self.right[nodes]])
+            depth += 1
+
+    def _walk_tables(self):
+        # leaves loop back to themselves so every row can take exactly max_depth steps
+        # without masking; children[2 * node + go_right] is the next node
+        if getattr(self, "_children", None) is None:
+            n = len(self.feature)
+            leaf = self.feature < 0
+            ids = np.arange(n, dtype=np.int64)
+            children = np.empty(2 * n, dtype=np.int64)
+            children[0::2] = np.where(leaf, ids, self.left)
+            children[1::2] = np.where(leaf, ids, self.right)
+            self._children = children
+            self._feat = np.where(leaf, 0, self.feature).astype(np.int64)
+            self._thr = np.where(leaf, np.inf, self.threshold)
+            self._missing_right = (~self.missing_left).astype(np.int64)
+        return self._children, self._feat, self._thr, self._missing_right
+
+    def predict(self, X, chunk_size: int = 2048) -> np.ndarray:
+        # both libraries compare features as float32
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_size):
+            out[start:start + chunk_size] = self._predict_chunk(X[start:start + chunk_size])
+        return out
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        children, feat, thr, missing_right = self._walk_tables()
+        flat = np.ascontiguousarray(X).ravel()
+        row_base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        has_nan = bool(np.isnan(flat).any())
+        nodes = np.broadcast_to(self.roots.astype(np.int64), (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = flat[row_base + feat[nodes]]
+            t = thr[nodes]
+            go_right = (x >= t) if self.strict else (x > t)
+            go_right = go_right.astype(np.int64)
+            if has_nan:
+                go_right = np.where(np.isnan(x), missing_right[nodes], go_right)
+            nodes = children[2 * nodes + go_right]
+        leaves = self.value[nodes]
+        if self.float32_sum:
+            acc = np.full(len(X), self.base_score, dtype=np.float32)
+            for t in range(leaves.shape[1]):
+                acc += leaves[:, t].astype(np.float32)
+            return acc.astype(np.float64)
+        return leaves.sum(axis=1) + self.base_score
+
+    def save(self, path: str) -> None:
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        with open(path, "wb") as f:
+            np.savez(f, base_score=self.base_score, strict=self.strict, max_depth=self.max_depth,
+                     float32_sum=self.float32_sum, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        with np.load(path, allow_pickle=False) as data:
+            kwargs = {name: data[name] for name in cls.ARRAYS}
+            return cls(base_score=float(data["base_score"]), strict=bool(data["strict"]),
+                       max_depth=int(data["max_depth"]), float32_sum=bool(data["float32_sum"]), **kwargs)
+
+    @classmethod
+    def from_model(cls, model, feature_names=FEATURE_NAMES) -> "TreeEnsemble":
+        """Flatten a fitted xgboost XGBRegressor/Booster or sklearn GradientBoostingRegressor."""
+        if hasattr(model, "get_booster") or hasattr(model, "get_dump"):
+            return cls._from_xgboost(model, feature_names)
+        if hasattr(model, "estimators_"):
+            return cls._from_sklearn_gbr(model)
+        raise TypeError(f"Don't know how to export {type(model).__name__}")
+
+    @classmethod
+    def _from_sklearn_gbr(cls, model) -> "TreeEnsemble":
+        init = getattr(model, "init_", None)
+        if isinstance(init, str) and init == "zero":
+            base = 0.0
+        elif hasattr(init, "constant_"):
+            base = float(np.ravel(init.constant_)[0])
+        else:
+            raise TypeError("Only a constant (mean/quantile/zero) init estimator can be exported")
+        cols = {name: [] for name in cls.ARRAYS}
+        offset = 0
+        for est in np.ravel(model.estimators_):
+            t = est.tree_
+            n = t.node_count
+            leaf = t.children_left == -1
+            cols["roots"].append([offset])
+            cols["feature"].append(np.where(leaf, -1, t.feature))
+            cols["threshold"].append(t.threshold)
+            cols["left"].append(np.where(leaf, 0, t.children_left) + offset)
+            cols["right"].append(np.where(leaf, 0, t.children_right) + offset)
+            cols["value"].append(model.learning_rate * t.value[:, 0, 0])
+            missing = getattr(t, "missing_go_to_left", None)
+            cols["missing_left"].append(np.asarray(missing, dtype=bool) if missing is not None else np.zeros(n, dtype=bool))
+            offset += n
+        return cls(base_score=base, strict=False, **{k: np.concatenate(v) for k, v in cols.items()})
+
+    @classmethod
+    def _from_xgboost(cls, model, feature_names) -> "TreeEnsemble":
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        names = list(booster.feature_names or feature_names)
+        config = json.loads(booster.save_config())
+        base = config["learner"]["learner_model_param"]["base_score"]
+        base = float(str(base).strip("[]").split(",")[0])
+        objective = config["learner"].get("objective", {}).get("name", "reg:squarederror")
+        if not objective.startswith("reg:") or objective in ("reg:logistic", "reg:gamma", "reg:tweedie"):
+            raise TypeError(f"Unsupported xgboost objective {objective}")
+
+        feature, threshold, left, right, value, missing_left, roots = [], [], [], [], [], [], []
+        for dump in booster.get_dump(dump_format="json"):
+            tree = json.loads(dump)
+            base_index = len(feature)
+            roots.append(base_index)
+            flat = {}
+            stack = [tree]
+            while stack:
+                node = stack.pop()
+                flat[node["nodeid"]] = node
+                stack.extend(node.get("children", ()))
+            ids = sorted(flat)
+            index = {nid: base_index + i for i, nid in enumerate(ids)}
+            for nid in ids:
+                node = flat[nid]
+                if "leaf" in node:
+                    feature.append(-1)
+                    threshold.append(0.0)
+                    left.append(0)
+                    right.append(0)
+                    value.append(float(np.float32(node["leaf"])))
+                    missing_left.append(False)
+                else:
+                    split = node["split"]
+                    feature.append(names.index(split) if split in names else int(str(split).lstrip("f")))
+                    threshold.append(float(np.float32(node["split_condition"])))
+                    left.append(index[node["yes"]])
+                    right.append(index[node["no"]])
+                    value.append(0.0)
+                    missing_left.append(node.get("missing") == node["yes"])
+        return cls(feature, threshold, left, right, value, missing_left, roots,
+                   base_score=base, strict=True, float32_sum=True)
+
+
+def _read_model_file(path: str):
+    if path.endswith(".npz"):
+        return TreeEnsemble.load(path)
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    return data.get("model") if isinstance(data, dict) else data
+
+
+def _refresh_model() -> None:
+    """
+    (Re)load MODEL_PATH if it is new or has changed since the current version. The
+    replacement is fully unpickled before it is published; on failure the previous
+    version keeps serving. Caller holds _model_lock.
+    """
+    global _model_current, _model_attempted, _model_checked_at
+
+    _model_attempted = True
+    _model_checked_at = time.monotonic()
 
     # If a remote MODEL_URL is provided, try to download it first (only if file missing)
     if MODEL_URL and not Path(MODEL_PATH).exists():
         _download_model_if_needed(MODEL_URL, MODEL_PATH)
 
-    if not Path(MODEL_PATH).exists():
-        logger.warning("Model file not found at %s", MODEL_PATH)
-        return None
+    stamp = _file_stamp(MODEL_PATH)
+    if stamp is None:
+        if _model_current is None:
+            logger.warning("Model file not found at %s", MODEL_PATH)
+        return
+    current = _model_current
+    if current is not None and current.stamp == stamp:
+        return
 
     try:
-        with open(MODEL_PATH, "rb") as f:
-            data = pickle.load(f)
+        t0 = time.perf_counter()
+        checksum = _file_checksum(MODEL_PATH)
+        if current is not None and current.checksum == checksum:
+            # touched but identical; remember the new stamp and keep the loaded object
+            _model_current = _LoadedModel(current.model, current.version, stamp, checksum)
+            return
+        model = _read_model_file(MODEL_PATH)
     except (pickle.UnpicklingError, EOFError, AttributeError, IndexError, Exception) as e:
         # Catch common pickle-related errors and log them
         logger.exception("Failed to unpickle model at %s: %s", MODEL_PATH, e)
-        return None
+        return
 
-    model = data.get("model") if isinstance(data, dict) else data
-    _model_cache = model
-    logger.info("Model loaded successfully from %s", MODEL_PATH)
-    return model
+    version = current.version + 1 if current is not None else 1
+    _model_current = _LoadedModel(model, version, stamp, checksum)
+    MODEL_LOAD_SECONDS.observe(time.perf_counter() - t0)
+    logger.info("Model v%d loaded from %s in %.3fs (sha256 %s, pid %d)",
+                version, MODEL_PATH, time.perf_counter() - t0, checksum[:12], os.getpid())
 
 
-def predict_target_from_model(user) -> Optional[float]:
+def load_target_model() -> Optional[Any]:
+    """
+    Return the current model object, loading MODEL_PATH on first use. If MODEL_URL
+    is set and the file doesn't exist, attempt to download it first. Every
+    MODEL_RELOAD_INTERVAL seconds the file's mtime/size is checked and a changed
+    file (by checksum) is loaded as a new version without a restart.
+    Returns the raw model object or None on failure.
+    """
+    current = _model_current
+    if not _model_attempted:
+        with _model_lock:
+            if not _model_attempted:
+                _refresh_model()
+        current = _model_current
+    elif MODEL_RELOAD_INTERVAL > 0 and time.monotonic() - _model_checked_at >= MODEL_RELOAD_INTERVAL:
+        # one thread checks; the rest keep serving the current version meanwhile
+        if _model_lock.acquire(blocking=False):
+            try:
+                if time.monotonic() - _model_checked_at >= MODEL_RELOAD_INTERVAL:
+                    _refresh_model()
+            finally:
+                _model_lock.release()
+        current = _model_current
+    return current.model if current is not None else None
 
+
+def preload_target_model() -> Optional[Any]:
+    """
+    Load the model eagerly. Called from create_app when PRELOAD_MODEL is set so that,
+    under gunicorn --preload, the master loads it once and workers share the pages.
+    """
     model = load_target_model()
-    if model is None:
-        return None
+    if model is not None:
+        logger.info("Preloaded target model in pid %d", os.getpid())
+    return model
 
+
+def model_status() -> Dict[str, Any]:
+    """Readiness info for the target model in this process."""
+    current = _model_current
+    ready = current is not None or (_model_attempted and not MODEL_REQUIRED)
+    return {
+        "ready": ready,
+        "loaded": current is not None,
+        "version": current.version if current else None,
+        "sha256": current.checksum if current else None,
+        "loaded_at": current.loaded_at if current else None,
+        "path": MODEL_PATH,
+        "pid": os.getpid(),
+    }
+
+
+_GOAL_CODES = {"lose": -1, "gain": 1}
+
+
+def user_features(user) -> list:
+    """The model's 6-feature row for one user, with the same defaults as the batch path."""
     try:
         age = date.today().year - user.birth_date.year if getattr(user, "birth_date", None) else 30
     except Exception:
@@ -115,15 +405,17 @@ def predict_target_from_model(user) -> Optional[float]:
         activity = float(getattr(user, "activity_multiplier", 1.3) or 1.3)
     except Exception:
         activity = 1.3
+    goal = _GOAL_CODES.get(getattr(user, "goal", "maintain"), 0)
+    return [age, sex, height_cm, weight_kg, activity, goal]
+
+
+def predict_target_from_model(user) -> Optional[float]:
 
-    goal_raw = getattr(user, "goal", "maintain")
-    goal = 0
-    if goal_raw == "lose":
-        goal = -1
-    elif goal_raw == "gain":
-        goal = 1
+    model = load_target_model()
+    if model is None:
+        return None
 
-    X = [[age, sex, height_cm, weight_kg, activity, goal]]
+    X = [user_features(user)]
 
     predict_fn = getattr(model, "predict", None)
     if not callable(predict_fn):
@@ -131,7 +423,8 @@ def predict_target_from_model(user) -> Optional[float]:
         return None
 
     try:
-        pred = predict_fn(X)
+        with MODEL_PREDICT_SECONDS.time(path="single"):
+            pred = predict_fn(X)
         # handle array-like outputs
         if hasattr(pred, "__iter__"):
             result = float(pred[0])
@@ -170,17 +463,52 @@ def _activity_multiplier_from_level(level: str) -> float:
     return mapping.get(level, 1.2)
 
 
-def compute_daily_targets(user) -> Dict[str, float]:
+_target_memo_lock = threading.Lock()
+_target_memo_stats = {"hits": 0, "misses": 0}
+
+
+def target_features_key(user) -> str:
+    """
+    The exact inputs a daily target is computed from. Age is in whole years as the
+    formulas use it, so the key changes (and the memo expires) when it rolls over.
+    The loaded model's checksum (empty without one) is part of it too, so a reloaded
+    model recomputes every target; the checksum, unlike the per-process version
+    number, is the same in every worker.
+    """
     try:
-        if getattr(user, "target_calories", None):
-            val = float(user.target_calories)
-            return {"target": val, "target_calories": val}
+        age = date.today().year - user.birth_date.year if getattr(user, "birth_date", None) else None
     except Exception:
-        pass
+        age = None
+    load_target_model()     # first load and the periodic reload check, as a prediction would
+    current = _model_current
+    parts = (current.checksum[:16] if current is not None else None, age, getattr(user, "sex", None), getattr(user, "height_cm", None), getattr(user, "weight_kg", None),
+             getattr(user, "activity_multiplier", None), getattr(user, "activity_level", None),
+             getattr(user, "goal", None))
+    return "|".join("" if p is None else str(p) for p in parts)
+
+
+def _count_target_memo(outcome: str) -> None:
+    with _target_memo_lock:
+        _target_memo_stats[outcome] += 1
+
+
+def target_memo_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the per-user target memo in this worker."""
+    with _target_memo_lock:
+        hits, misses = _target_memo_stats["hits"], _target_memo_stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 4) if total else None}
+
 
+def invalidate_daily_targets(user) -> None:
+    """Forget the memoized target so the next compute_daily_targets() recomputes it."""
+    user.target_key = None
+
+
+def _compute_target_calories(user) -> float:
     model_pred = predict_target_from_model(user)
     if model_pred:
-        return {"target": model_pred, "target_calories": model_pred}
+        return float(model_pred)
 
     bmr = compute_bmr(user)
     multiplier = getattr(user, "activity_multiplier", None) or _activity_multiplier_from_level(
@@ -196,78 +524,299 @@ def compute_daily_targets(user) -> Dict[str, float]:
         target -= 300
     elif goal == "gain":
         target += 300
-    target = max(1000, min(4500, target))
+    return max(1000, min(4500, target))
+
+
+def compute_daily_targets(user) -> Dict[str, float]:
+    """
+    Daily calorie target, memoized on the user: target_calories is reused while
+    target_key matches target_features_key(user), so repeat renders never touch the
+    model. On a miss the target is recomputed and both columns are updated in place;
+    callers that want the memo kept commit the session.
+    """
+    key = target_features_key(user)
+    try:
+        stored = getattr(user, "target_calories", None)
+        if stored and getattr(user, "target_key", None) == key:
+            _count_target_memo("hits")
+            val = float(stored)
+            return {"target": val, "target_calories": val}
+    except Exception:
+        pass
+
+    _count_target_memo("misses")
+    target = _compute_target_calories(user)
+    try:
+        user.target_calories = target
+        user.target_key = key
+    except Exception:
+        logger.debug("Could not store memoized target on %r", user)
     return {"target": target, "target_calories": target}
 
 
+def _column(users, attr, convert, default=np.nan) -> np.ndarray:
+    out = []
+    for u in users:
+        v = getattr(u, attr, None)
+        try:
+            out.append(convert(v) if v else default)
+        except Exception:
+            out.append(default)
+    return np.asarray(out, dtype=float)
+
+
+def user_columns(users) -> Dict[str, np.ndarray]:
+    """
+    Raw per-user columns with NaN for missing values. Works on User objects or on
+    lightweight result rows, e.g. db.session.query(User.id, User.birth_date, ...).
+    Defaults are applied later because the model and the BMR formula use different ones.
+    """
+    users = list(users)
+    today_year = date.today().year
+    return {
+        "age": _column(users, "birth_date", lambda d: today_year - d.year),
+        "male": np.asarray([getattr(u, "sex", None) == "male" for u in users], dtype=bool),
+        "height_cm": _column(users, "height_cm", float),
+        "weight_kg": _column(users, "weight_kg", float),
+        "activity_multiplier": _column(users, "activity_multiplier", float),
+        "level_multiplier": np.asarray([_activity_multiplier_from_level(getattr(u, "activity_level", None) or "sedentary")
+                                        for u in users], dtype=float),
+        "goal": np.asarray([_GOAL_CODES.get(getattr(u, "goal", "maintain"), 0) for u in users], dtype=float),
+    }
+
+
+def feature_matrix(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """(n, 6) model input matching user_features() row for row."""
+    def fill(a, default):
+        return np.where(np.isnan(a), default, a)
+    return np.column_stack([
+        fill(cols["age"], 30),
+        cols["male"].astype(float),
+        fill(cols["height_cm"], 165.0),
+        fill(cols["weight_kg"], 70.0),
+        fill(cols["activity_multiplier"], 1.3),
+        cols["goal"],
+    ])
+
+
+def compute_bmr_batch(age, male, height_cm, weight_kg) -> np.ndarray:
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + np.where(male, 5, -161)
+    return np.maximum(800.0, bmr)
+
+
+def compute_daily_targets_batch(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """Vectorized form of the formula fallback in compute_daily_targets()."""
+    def fill(a, default):
+        return np.where(np.isnan(a), default, a)
+    bmr = compute_bmr_batch(fill(cols["age"], 30), cols["male"], fill(cols["height_cm"], 170.0),
+                            fill(cols["weight_kg"], 70.0))
+    multiplier = np.where(np.isnan(cols["activity_multiplier"]), cols["level_multiplier"], cols["activity_multiplier"])
+    target = bmr * multiplier + 300.0 * cols["goal"]
+    return np.clip(target, 1000.0, 4500.0)
+
+
+def _columns_from_features(X: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        "age": X[:, 0], "male": X[:, 1] == 1, "height_cm": X[:, 2], "weight_kg": X[:, 3],
+        "activity_multiplier": X[:, 4], "level_multiplier": np.full(len(X), 1.2), "goal": X[:, 5],
+    }
+
+
+def predict_targets_batch(data, chunk_size: int = 50000) -> np.ndarray:
+    """
+    Daily calorie targets for many users at once. `data` is an iterable of users
+    (or user rows), a DataFrame with FEATURE_NAMES columns, or an (n, 6) array.
+    The model is called on fixed-size chunks; rows it can't score (no model, a
+    failing chunk, non-finite or non-positive output) get the vectorized BMR formula.
+    """
+    if hasattr(data, "columns"):
+        X = np.asarray(data[list(FEATURE_NAMES)], dtype=float)
+        cols = _columns_from_features(X)
+    elif isinstance(data, np.ndarray):
+        X = np.asarray(data, dtype=float).reshape(-1, len(FEATURE_NAMES))
+        cols = _columns_from_features(X)
+    else:
+        cols = user_columns(data)
+        X = feature_matrix(cols)
+
+    preds = np.full(len(X), np.nan)
+    model = load_target_model()
+    predict_fn = getattr(model, "predict", None) if model is not None else None
+    if callable(predict_fn):
+        for start in range(0, len(X), chunk_size):
+            stop = start + chunk_size
+            try:
+                with MODEL_PREDICT_SECONDS.time(path="batch"):
+                    preds[start:stop] = np.asarray(predict_fn(X[start:stop]), dtype=float).reshape(-1)
+            except Exception:
+                logger.exception("Batch model prediction failed for rows %d-%d", start, min(stop, len(X)))
+
+    bad = ~np.isfinite(preds) | (preds <= 0)
+    if bad.any():
+        fallback = compute_daily_targets_batch({k: v[bad] for k, v in cols.items()})
+        preds[bad] = fallback
+    return preds
+
+
 def lookup_nutrition_text(text: str) -> Optional[Dict[str, float]]:
+    """
+    Resolve free text ("1 banana") to kcal and macros. Results, including "nothing
+    found", are kept in the shared nutrition cache keyed on the normalized text.
+    """
     if not text or not text.strip():
         return None
     text = text.strip()
+    key = normalize_query(text)
+    hit, cached = nutrition_cache.lookup(key)
+    if hit:
+        logger.debug("Nutrition cache hit for '%s'", key)
+        return cached
+
+    result, definitive = _lookup_nutrition_uncached(text)
+    # only remember a negative answer when every provider actually answered;
+    # a timeout or 5xx must not hide the food for the negative TTL
+    if result is not None or definitive:
+        nutrition_cache.set(key, result)
+    return result
+
+
+def _query_calorieninjas(text: str) -> Optional[Dict[str, float]]:
     api_key = os.environ.get("CALORIE_NINJAS_KEY") or os.environ.get("API_NINJAS_KEY")
-    session = requests.Session()
+    url = "https://api.calorieninjas.com/v1/nutrition"
+    params = {"query": text}
+    headers = {"X-Api-Key": api_key}
+    r = http_client.get("calorieninjas", url, params=params, headers=headers, timeout=8)
+    r.raise_for_status()
+    data = r.json()
+    items = data.get("items", [])
+    if not items:
+        return None
+    kcal = sum(float(i.get("calories", 0) or 0) for i in items)
+    prot = sum(float(i.get("protein_g", 0) or 0) for i in items)
+    carbs = sum(float(i.get("carbohydrates_total_g", 0) or 0) for i in items)
+    fat = sum(float(i.get("fat_total_g", 0) or 0) for i in items)
+    return {"kcal": kcal, "protein_g": prot, "carbs_g": carbs, "fat_g": fat, "source": "calorieninjas"}
+
+
+def _query_edamam(text: str) -> Optional[Dict[str, float]]:
+    url = "https://api.edamam.com/api/nutrition-data"
+    params = {"app_id": os.environ.get("EDAMAM_APP_ID"), "app_key": os.environ.get("EDAMAM_APP_KEY"), "ingr": text}
+    r = http_client.get("edamam", url, params=params, timeout=8)
+    r.raise_for_status()
+    data = r.json()
+    kcal = float(data.get("calories", 0) or 0)
+    tot = data.get("totalNutrients", {}) or {}
+    prot = float(tot.get("PROCNT", {}).get("quantity", 0) or 0)
+    carbs = float(tot.get("CHOCDF", {}).get("quantity", 0) or 0)
+    fat = float(tot.get("FAT", {}).get("quantity", 0) or 0)
+    return {"kcal": kcal, "protein_g": prot, "carbs_g": carbs, "fat_g": fat, "source": "edamam"}
+
+
+def _remote_providers():
+    """Configured remote providers, in sequential-mode preference order."""
+    providers = []
+    if os.environ.get("CALORIE_NINJAS_KEY") or os.environ.get("API_NINJAS_KEY"):
+        providers.append(("CalorieNinjas", _query_calorieninjas))
+    if os.environ.get("EDAMAM_APP_ID") and os.environ.get("EDAMAM_APP_KEY"):
+        providers.append(("Edamam", _query_edamam))
+    return providers
+
+
+def nutrition_lookup_mode() -> str:
+    return (os.environ.get("NUTRITION_LOOKUP_MODE") or "sequential").strip().lower()
+
+
+def _lookup_nutrition_uncached(text: str):
+    if nutrition_lookup_mode() == "hedged":
+        return _lookup_nutrition_hedged(text)
+    return _lookup_nutrition_sequential(text)
+
+
+def _lookup_nutrition_sequential(text: str):
+    """Query providers in order. Returns (result, definitive)."""
+    definitive = True
+    for name, query in _remote_providers():
+        try:
+            result = query(text)
+            if result is not None:
+                return result, True
+        except (RequestException, ValueError) as e:
+            definitive = False
+            logger.debug("%s lookup failed for '%s': %s", name, text, e)
+
     try:
-        if api_key:
-            try:
-                url = "https://api.calorieninjas.com/v1/nutrition"
-                params = {"query": text}
-                headers = {"X-Api-Key": api_key}
-                r = session.get(url, params=params, headers=headers, timeout=8)
-                r.raise_for_status()
-                data = r.json()
-                items = data.get("items", [])
-                if items:
-                    kcal = sum(float(i.get("calories", 0) or 0) for i in items)
-                    prot = sum(float(i.get("protein_g", 0) or 0) for i in items)
-                    carbs = sum(float(i.get("carbohydrates_total_g", 0) or 0) for i in items)
-                    fat = sum(float(i.get("fat_total_g", 0) or 0) for i in items)
-                    return {"kcal": kcal, "protein_g": prot, "carbs_g": carbs, "fat_g": fat, "source": "calorieninjas"}
-            except (RequestException, ValueError) as e:
-                logger.debug("CalorieNinjas lookup failed for '%s': %s", text, e)
-
-        ed_id = os.environ.get("EDAMAM_APP_ID")
-        ed_key = os.environ.get("EDAMAM_APP_KEY")
-        if ed_id and ed_key:
-            try:
-                url = "https://api.edamam.com/api/nutrition-data"
-                params = {"app_id": ed_id, "app_key": ed_key, "ingr": text}
-                r = session.get(url, params=params, timeout=8)
-                r.raise_for_status()
-                data = r.json()
-                kcal = float(data.get("calories", 0) or 0)
-                tot = data.get("totalNutrients", {}) or {}
-                prot = float(tot.get("PROCNT", {}).get("quantity", 0) or 0)
-                carbs = float(tot.get("CHOCDF", {}).get("quantity", 0) or 0)
-                fat = float(tot.get("FAT", {}).get("quantity", 0) or 0)
-                return {"kcal": kcal, "protein_g": prot, "carbs_g": carbs, "fat_g": fat, "source": "edamam"}
-            except (RequestException, ValueError) as e:
-                logger.debug("Edamam lookup failed for '%s': %s", text, e)
+        local = lookup_local_food(text)
+        if local is not None:
+            return local, True
+    except Exception as e:
+        definitive = False
+        logger.debug("Local nutrition DB lookup failed for '%s': %s", text, e)
 
-        try:
-            indb_path = os.path.join(os.getcwd(), "instance", "indian_nutrition.json")
-            if os.path.exists(indb_path):
-                with open(indb_path, "r", encoding="utf-8") as f:
-                    db = json.load(f)
-                key = text.lower()
-                if key in db:
-                    rec = db[key]
-                    return {
-                        "kcal": float(rec.get("energy_kcal", rec.get("kcal", 0) or 0)),
-                        "protein_g": float(rec.get("protein_g", 0) or 0),
-                        "carbs_g": float(rec.get("carbs_g", 0) or 0),
-                        "fat_g": float(rec.get("fat_g", 0) or 0),
-                        "source": "indian_db"
-                    }
-        except Exception as e:
-            logger.debug("Local nutrition DB lookup failed for '%s': %s", text, e)
+    return None, definitive
 
-    finally:
-        try:
-            session.close()
-        except Exception:
-            pass
 
-    return None
+_lookup_pool_state = {"pid": None, "pool": None}
+_lookup_pool_lock = threading.Lock()
+
+
+def _lookup_pool() -> ThreadPoolExecutor:
+    pid = os.getpid()
+    if _lookup_pool_state["pid"] != pid:
+        with _lookup_pool_lock:
+            if _lookup_pool_state["pid"] != pid:
+                workers = int(os.environ.get("NUTRITION_LOOKUP_WORKERS", 4))
+                _lookup_pool_state["pool"] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nutrition-lookup")
+                _lookup_pool_state["pid"] = pid
+    return _lookup_pool_state["pool"]
+
+
+def _lookup_nutrition_hedged(text: str, deadline: Optional[float] = None):
+    """
+    Check the local table inline, then race the remote providers on a bounded pool.
+    The first non-empty answer wins; anything still running at the deadline is
+    abandoned (its result is discarded), so the caller never waits longer than
+    NUTRITION_LOOKUP_DEADLINE seconds. Returns (result, definitive).
+    """
+    if deadline is None:
+        deadline = float(os.environ.get("NUTRITION_LOOKUP_DEADLINE", 3.0))
+    definitive = True
+    try:
+        local = lookup_local_food(text)
+        if local is not None:
+            return local, True
+    except Exception as e:
+        definitive = False
+        logger.debug("Local nutrition DB lookup failed for '%s': %s", text, e)
+
+    providers = _remote_providers()
+    if not providers:
+        return None, definitive
+
+    pool = _lookup_pool()
+    pending = {pool.submit(query, text): name for name, query in providers}
+    stop_at = time.monotonic() + deadline
+    try:
+        while pending:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                logger.debug("Nutrition lookup deadline (%.2fs) hit for '%s'; pending=%s",
+                             deadline, text, list(pending.values()))
+                return None, False
+            done, _ = wait(list(pending), timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    definitive = False
+                    logger.debug("%s lookup failed for '%s': %s", name, text, e)
+                    continue
+                if result is not None:
+                    return result, True
+        return None, definitive
+    finally:
+        for fut in pending:
+            fut.cancel()
 
 
 def compute_flags_for_meal(meal) -> (bool, str):
@@ -317,3 +866,60 @@ def compute_lifestyle_points(calories_burned, sleep_hours, avg_meal_interval_hou
     total = (0.28 * burn_score + 0.25 * sleep_score + 0.18 * meal_interval_score + 0.20 * cal_score + 0.09 * bpm_score)
     points = round(total * 100, 2)
     return points
+
+
+def _batch_input(values, default) -> np.ndarray:
+    """Float array where None and zero become `default`, as `value or default` does in the scalar scorer."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiu":
+        arr = values.astype(float)
+    else:
+        obj = np.asarray(values, dtype=object)
+        arr = np.where(obj == None, default, obj).astype(float)  # noqa: E711 (elementwise)
+    if default:
+        arr = np.where(arr == 0, default, arr)
+    return arr
+
+
+def _score_range_batch(v: np.ndarray, low: float, mid: float, high: float) -> np.ndarray:
+    out = np.where(v < mid, (v - low) / (mid - low), (high - v) / (high - mid))
+    out = np.where(v == mid, 1.0, out)
+    return np.where((v <= low) | (v >= high), 0.0, out)
+
+
+def _round_like_python(x: np.ndarray, ndigits: int) -> np.ndarray:
+    """np.round, corrected to Python's round() where the scaled value sits on a near-tie."""
+    out = np.round(x, ndigits)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = x * 10.0 ** ndigits
+        near_tie = np.isfinite(scaled) & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in np.flatnonzero(near_tie):
+        out.flat[i] = round(float(x.flat[i]), ndigits)
+    return out
+
+
+def compute_lifestyle_points_batch(calories_burned, sleep_hours, avg_meal_interval_hours,
+                                   calories_intake, target_calories, avg_bpm) -> np.ndarray:
+    """
+    compute_lifestyle_points() over arrays, one element per user-day; scalars broadcast.
+    None and 0 take the scalar defaults, NaN propagates the way it does there, and
+    results match the scalar function exactly, rounding included.
+    """
+    burned = _batch_input(calories_burned, 0.0)
+    sleep = _batch_input(sleep_hours, 0.0)
+    interval = _batch_input(avg_meal_interval_hours, 3.5)
+    intake = _batch_input(calories_intake, 0.0)
+    target = _batch_input(target_calories, 0.0)
+    bpm = _batch_input(avg_bpm, 60.0)
+
+    burn = burned / 400.0
+    # min(1.0, x) keeps 1.0 unless x < 1.0, so NaN scores 1.0
+    burn_score = np.where(burn < 1.0, burn, 1.0)
+    sleep_score = _score_range_batch(sleep, 4.0, 7.5, 9.5)
+    meal_interval_score = _score_range_batch(interval, 0.5, 3.5, 6.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cal_ratio = np.where(target <= 0, 1.0, intake / target)
+    cal_score = _score_range_batch(cal_ratio, 0.6, 1.0, 1.3)
+    bpm_score = _score_range_batch(bpm, 40, 64, 86)
+    total = (0.28 * burn_score + 0.25 * sleep_score + 0.18 * meal_interval_score + 0.20 * cal_score + 0.09 * bpm_score)
+    return _round_like_python(total * 100, 2)
+
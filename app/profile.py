@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from .extensions import db
 from .models import User
-from .nutrition import compute_bmr, predict_target_from_model
+from .nutrition import compute_bmr, compute_daily_targets, invalidate_daily_targets
 from .utils import login_required, get_current_user
 from datetime import datetime
 
@@ -46,21 +46,10 @@ def profile():
     user.sex = sex
     user.activity_multiplier = activity_multiplier
     user.goal = goal
+    # a profile save always recomputes, e.g. to pick up a newly deployed model
+    invalidate_daily_targets(user)
     try:
-        model_pred = predict_target_from_model(user)
-        if model_pred:
-            user.target_calories = float(model_pred)
-        else:
-            bmr = compute_bmr(user)
-            if user.activity_multiplier:
-                t = bmr * user.activity_multiplier
-            else:
-                t = bmr * 1.3
-            if user.goal == "lose":
-                t = t - 300
-            elif user.goal == "gain":
-                t = t + 300
-            user.target_calories = max(1000, t)
+        compute_daily_targets(user)
     except Exception as exc:
         current_app.logger.exception("Error predicting target calories")
         bmr = compute_bmr(user)
@@ -0,0 +1,224 @@
+"""
+Opt-in request profiling for production. With PROFILE_REQUESTS on, a WSGI
+middleware runs cProfile around a request that carries a valid signed
+X-Profile header (minted by an admin at /admin/profiles/token) or that falls
+in the PROFILE_SAMPLE_RATE sample, and writes a pstats file to PROFILE_DIR.
+The oldest files go once the directory passes PROFILE_MAX_FILES or
+PROFILE_MAX_BYTES. With PROFILE_REQUESTS off the middleware isn't installed.
+"""
+import io
+import os
+import re
+import time
+import random
+import pstats
+import logging
+import cProfile
+import threading
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request, send_from_directory, abort
+from itsdangerous import TimestampSigner, BadSignature, SignatureExpired
+
+from .utils import admin_required
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INSTANCE_DIR = os.path.join(os.getcwd(), "instance")
+
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "0").lower() in ("1", "true", "yes")
+# share of all requests profiled without a header; 0 profiles only requests that ask
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(INSTANCE_DIR, "profiles"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 200))
+PROFILE_MAX_BYTES = int(os.environ.get("PROFILE_MAX_BYTES", 50 * 1024 * 1024))
+PROFILE_TOKEN_MAX_AGE = int(os.environ.get("PROFILE_TOKEN_MAX_AGE", 3600))
+
+PROFILE_HEADER = "X-Profile"
+
+# one profiled request at a time per worker: profilers can't nest, and it bounds the overhead
+_profile_lock = threading.Lock()
+
+
+def _signer(app):
+    return TimestampSigner(app.secret_key, salt="request-profiler")
+
+
+def make_token(app):
+    return _signer(app).sign("profile").decode("ascii")
+
+
+def token_valid(app, token):
+    try:
+        _signer(app).unsign(token, max_age=PROFILE_TOKEN_MAX_AGE)
+        return True
+    except (BadSignature, SignatureExpired):
+        return False
+
+
+def _file_name(environ, elapsed):
+    path = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_")[:60] or "root"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    return f"{stamp}-{environ.get('REQUEST_METHOD', 'GET')}-{path}-{elapsed * 1000:.0f}ms-{os.getpid()}.prof"
+
+
+def rotate(directory, max_files=PROFILE_MAX_FILES, max_bytes=PROFILE_MAX_BYTES):
+    """Delete the oldest profiles until the directory is within both caps."""
+    entries = list_profiles(directory)
+    total = sum(e["bytes"] for e in entries)
+    while entries and (len(entries) > max_files or total > max_bytes):
+        oldest = entries.pop()
+        total -= oldest["bytes"]
+        try:
+            os.remove(os.path.join(directory, oldest["name"]))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles(directory):
+    """Saved profiles, newest first."""
+    out = []
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(".prof")]
+    except FileNotFoundError:
+        return out
+    for name in names:
+        try:
+            st = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        out.append({"name": name, "bytes": st.st_size, "created": datetime.utcfromtimestamp(st.st_mtime).isoformat()})
+    out.sort(key=lambda e: e["name"], reverse=True)
+    return out
+
+
+def _is_stream(response):
+    headers = response[1] if response else ()
+    return any(k.lower() == "content-type" and v.startswith("text/event-stream") for k, v in headers)
+
+
+class RequestProfiler:
+    """
+    WSGI middleware; see the module docstring. Profiled responses are buffered
+    whole, except event streams, which are passed on unprofiled.
+    """
+
+    def __init__(self, wsgi_app, app, directory, sample_rate):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+
+    def _wanted(self, environ):
+        token = environ.get("HTTP_X_PROFILE")
+        if token:
+            return token_valid(self.app, token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not _profile_lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler (a debugger, coverage) holds the hook; serve the request unprofiled
+            _profile_lock.release()
+            logger.warning("Request profiling skipped: another profiler is active")
+            return self.wsgi_app(environ, start_response)
+        name = None
+        try:
+            response = []
+            body = []
+
+            def catching_start_response(status, headers, exc_info=None):
+                response[:] = [status, headers, exc_info]
+                return body.append
+
+            t0 = time.perf_counter()
+            try:
+                app_iter = self.wsgi_app(environ, catching_start_response)
+                streaming = _is_stream(response)
+                if not streaming:
+                    try:
+                        body.extend(app_iter)
+                    finally:
+                        if hasattr(app_iter, "close"):
+                            app_iter.close()
+            finally:
+                profiler.disable()
+            if not streaming:
+                name = self._save(profiler, environ, time.perf_counter() - t0)
+        finally:
+            _profile_lock.release()
+
+        status, headers, exc_info = response
+        if streaming:
+            # an event stream can stay open for minutes: hand it on unbuffered and unprofiled
+            start_response(status, headers, exc_info)
+            return app_iter
+        if name:
+            headers = list(headers) + [("X-Profile-File", name)]
+        start_response(status, headers, exc_info)
+        return [b"".join(body)]
+
+    def _save(self, profiler, environ, elapsed):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = _file_name(environ, elapsed)
+            profiler.dump_stats(os.path.join(self.directory, name))
+            rotate(self.directory)
+            logger.info("Profiled %s %s in %.0fms -> %s", environ.get("REQUEST_METHOD"),
+                        environ.get("PATH_INFO"), elapsed * 1000, name)
+            return name
+        except Exception:
+            logger.exception("Saving a request profile failed")
+            return None
+
+
+def init_profiling(app):
+    """Install the profiling middleware when PROFILE_REQUESTS is on; otherwise leave the app untouched."""
+    if not app.config.get("PROFILE_REQUESTS", PROFILE_REQUESTS):
+        return
+    directory = app.config.get("PROFILE_DIR", PROFILE_DIR)
+    rate = float(app.config.get("PROFILE_SAMPLE_RATE", PROFILE_SAMPLE_RATE))
+    app.wsgi_app = RequestProfiler(app.wsgi_app, app, directory, rate)
+    logger.info("Request profiling on (sample rate %.4f, writing to %s)", rate, directory)
+
+
+profiles_bp = Blueprint("profiles", __name__)
+
+
+def _directory():
+    return current_app.config.get("PROFILE_DIR", PROFILE_DIR)
+
+
+@profiles_bp.route("/", methods=["GET"])
+@admin_required
+def index():
+    return jsonify({"enabled": bool(current_app.config.get("PROFILE_REQUESTS", PROFILE_REQUESTS)),
+                    "profiles": list_profiles(_directory())})
+
+
+@profiles_bp.route("/token", methods=["POST"])
+@admin_required
+def token():
+    """A header value that gets a request profiled, for PROFILE_TOKEN_MAX_AGE seconds."""
+    return jsonify({"header": PROFILE_HEADER, "token": make_token(current_app), "expires_in": PROFILE_TOKEN_MAX_AGE})
+
+
+@profiles_bp.route("/<name>", methods=["GET"])
+@admin_required
+def download(name):
+    """The pstats file, or with ?format=text the top functions by cumulative time."""
+    if not name.endswith(".prof") or os.path.basename(name) != name:
+        abort(404)
+    path = os.path.join(_directory(), name)
+    if not os.path.isfile(path):
+        abort(404)
+    if request.args.get("format") == "text":
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(request.args.get("limit", 40, type=int))
+        return out.getvalue(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+    return send_from_directory(_directory(), name, as_attachment=True)
@@ -0,0 +1,237 @@
+"""
+Server-side sessions. The cookie carries only a signed, random session id; the
+session itself lives in a SessionStore (a SQLite file shared by the workers on
+the box by default, any key/value store that implements load/save/touch/delete
+in production). Sessions are stored as compact tagged JSON, zlib-compressed
+when large, and written back only when their contents changed.
+"""
+import os
+import time
+import zlib
+import logging
+import secrets
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INSTANCE_DIR = os.path.join(os.getcwd(), "instance")
+
+# "server" (default) or "cookie" for Flask's signed-cookie sessions
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "server").strip().lower()
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", os.path.join(INSTANCE_DIR, "sessions.sqlite3"))
+# expired sessions are purged by whichever worker saves first after this interval
+SESSION_PURGE_SECONDS = float(os.environ.get("SESSION_PURGE_SECONDS", 3600))
+# payloads at least this long are stored zlib-compressed
+COMPRESS_MIN_BYTES = 256
+
+_serializer = TaggedJSONSerializer()
+
+
+def encode_session(data: dict) -> bytes:
+    """Tagged JSON (keeps bytes, datetimes, tuples...) with a one-byte format prefix."""
+    raw = _serializer.dumps(data).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw)
+    return b"j" + raw
+
+
+def decode_session(blob: bytes) -> dict:
+    kind, body = blob[:1], blob[1:]
+    if kind == b"z":
+        body = zlib.decompress(body)
+    elif kind != b"j":
+        raise ValueError(f"unknown session encoding {kind!r}")
+    return _serializer.loads(body.decode("utf-8"))
+
+
+class SessionStore:
+    """Where session payloads live. Subclass this to back sessions with another store."""
+
+    def load(self, sid: str) -> Optional[Tuple[bytes, float]]:
+        """(payload, expires_at) for a live session, or None."""
+        raise NotImplementedError
+
+    def save(self, sid: str, payload: bytes, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, sid: str) -> None:
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite file, one connection per thread (as SQLiteCache does)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_ready = False
+        self._purged_at = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if not self._schema_ready:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                         "sid TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute("SELECT payload, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+                                      (sid, time.time())).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def save(self, sid, payload, expires_at):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO sessions (sid, payload, expires_at) VALUES (?, ?, ?)",
+                     (sid, sqlite3.Binary(payload), expires_at))
+        if time.monotonic() - self._purged_at >= SESSION_PURGE_SECONDS:
+            self._purged_at = time.monotonic()
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def touch(self, sid, expires_at):
+        self._connect().execute("UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def count(self) -> int:
+        (n,) = self._connect().execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)).fetchone()
+        return n
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, payload=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.payload = payload          # encoded contents as loaded, to detect changes
+        self.expires_at = expires_at
+        self.rotated_from = None
+        self.modified = False
+
+    def regenerate(self):
+        """Move the contents to a fresh id (call on login, against session fixation)."""
+        self.rotated_from = self.sid
+        self.sid = None
+        self.new = True
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps only a signed session id in the cookie. A modified session is written
+    to the store when its encoded contents differ from what was loaded;
+    otherwise only its expiry is pushed out, once less than half its lifetime
+    is left.
+    """
+
+    session_class = ServerSideSession
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return self.session_class()
+        try:
+            sid = self._signer(app).unsign(cookie).decode("ascii")
+            found = self.store.load(sid)
+            if found is not None:
+                payload, expires_at = found
+                return self.session_class(decode_session(payload), sid, payload, expires_at)
+        except BadSignature:
+            pass
+        except Exception:
+            logger.exception("Loading the session failed; starting a new one")
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        try:
+            if session.rotated_from:
+                self.store.delete(session.rotated_from)
+            if not session:
+                if session.sid is not None:
+                    self.store.delete(session.sid)
+                if session.sid is not None or session.modified:
+                    response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                           partitioned=self.get_cookie_partitioned(app),
+                                           httponly=self.get_cookie_httponly(app),
+                                           samesite=self.get_cookie_samesite(app))
+                    response.vary.add("Cookie")
+                return
+            if session.accessed:
+                response.vary.add("Cookie")
+
+            lifetime = app.permanent_session_lifetime.total_seconds()
+            now = time.time()
+            expires_at = now + lifetime
+            # as with Flask's cookie sessions, in-place changes to nested values must set session.modified
+            payload = encode_session(dict(session)) if session.modified or session.sid is None else session.payload
+            if session.sid is None:
+                session.sid = secrets.token_urlsafe(24)
+                self.store.save(session.sid, payload, expires_at)
+            elif payload != session.payload:
+                self.store.save(session.sid, payload, expires_at)
+            elif session.expires_at - now < lifetime / 2:
+                # unchanged but past half its lifetime: extend it, and the cookie with it
+                self.store.touch(session.sid, expires_at)
+            else:
+                return
+        except Exception:
+            logger.exception("Saving the session failed")
+            return
+        self._set_cookie(app, response, session.sid, self.get_expiration_time(app, session))
+
+    def _set_cookie(self, app, response, sid, expires):
+        response.set_cookie(
+            self.get_cookie_name(app),
+            self._signer(app).sign(sid).decode("ascii"),
+            expires=expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=self.get_cookie_domain(app),
+            path=self.get_cookie_path(app),
+            secure=self.get_cookie_secure(app),
+            partitioned=self.get_cookie_partitioned(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+
+def init_sessions(app):
+    """Install server-side sessions unless SESSION_BACKEND=cookie."""
+    if SESSION_BACKEND == "cookie":
+        return
+    path = app.config.get("SESSION_STORE_PATH", SESSION_STORE_PATH)
+    app.session_interface = ServerSideSessionInterface(SQLiteSessionStore(path))
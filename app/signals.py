@@ -0,0 +1,11 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent after a lifestyle_points row is committed, with the app as sender and
+# user_id, date, points (new value) and delta (change from the old value).
+lifestyle_points_changed = _signals.signal("lifestyle-points-changed")
+
+# Sent after a commit that changed or deleted users whose display name the
+# leaderboard shows (full_name or email), with the app as sender and user_ids.
+display_name_changed = _signals.signal("display-name-changed")
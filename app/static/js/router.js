@@ -1,7 +1,82 @@
 (function(){
+  if(window.__fitgenixRouter) return;
+  window.__fitgenixRouter = true;
+
   const main = document.getElementById('main-content');
   const header = document.getElementById('site-header');
 
+  // live leaderboard: a table with data-stream is patched in place from the server's
+  // SSE stream (a snapshot, then deltas), so the page doesn't need refreshing
+  let liveSource = null;
+
+  function liveRow(row){
+    const tr = document.createElement('tr');
+    tr.className = 'table-row';
+    tr.dataset.userId = row.user_id;
+    [['80px'], [''], ['150px']].forEach(([width])=>{
+      const td = document.createElement('td');
+      td.className = 'table-cell';
+      if(width) td.style.width = width;
+      tr.appendChild(td);
+    });
+    return tr;
+  }
+
+  function fillRow(tr, row){
+    tr.dataset.position = row.position;
+    tr.cells[0].textContent = row.position;
+    tr.cells[1].textContent = row.display_name;
+    tr.cells[2].textContent = row.total_points;
+  }
+
+  function applyLive(tbody, rows, removed, size){
+    const byUser = new Map(Array.from(tbody.rows, tr => [tr.dataset.userId, tr]));
+    (removed || []).forEach(uid => {
+      const tr = byUser.get(String(uid));
+      if(tr){ tr.remove(); byUser.delete(String(uid)); }
+    });
+    rows.forEach(row => {
+      let tr = byUser.get(String(row.user_id));
+      if(!tr){ tr = liveRow(row); byUser.set(String(row.user_id), tr); }
+      fillRow(tr, row);
+    });
+    const ordered = Array.from(byUser.values()).sort((a, b) => a.dataset.position - b.dataset.position);
+    ordered.slice(0, size).forEach(tr => tbody.appendChild(tr));
+    ordered.slice(size).forEach(tr => tr.remove());
+  }
+
+  function detachLiveLeaderboard(){
+    if(liveSource){ liveSource.close(); liveSource = null; }
+  }
+
+  function attachLiveLeaderboard(root){
+    detachLiveLeaderboard();
+    const table = (root || document).querySelector('table[data-stream]');
+    if(!table || !table.tBodies[0] || !window.EventSource) return;
+    const tbody = table.tBodies[0];
+    Array.from(tbody.rows).forEach((tr, i) => { tr.dataset.position = i + 1; });
+    const source = new EventSource(table.dataset.stream);
+    liveSource = source;
+    source.addEventListener('snapshot', ev => {
+      const data = JSON.parse(ev.data);
+      const keep = new Set(data.rows.map(r => String(r.user_id)));
+      const removed = Array.from(tbody.rows, tr => tr.dataset.userId).filter(uid => !keep.has(uid));
+      applyLive(tbody, data.rows, removed, data.rows.length);
+    });
+    source.addEventListener('delta', ev => {
+      const data = JSON.parse(ev.data);
+      applyLive(tbody, data.changed, data.removed, data.size);
+    });
+    // closed for good (e.g. 503 when the worker is full): the page just stays static
+    source.onerror = () => { if(source.readyState === EventSource.CLOSED && liveSource === source) liveSource = null; };
+  }
+
+  if(document.readyState === 'loading'){
+    document.addEventListener('DOMContentLoaded', () => attachLiveLeaderboard(document));
+  } else {
+    attachLiveLeaderboard(document);
+  }
+
   if(!main) return;
 
   const DASHBOARD1_HTML = `
@@ -39,6 +114,7 @@
         requestAnimationFrame(()=> main.classList.add('page-enter-active'));
       }, 120);
       if(!replace) history.pushState({url}, '', '/dashboard1');
+      detachLiveLeaderboard();
       return;
     }
     setHeaderVisible(true);
@@ -57,6 +133,7 @@
           main.classList.add('page-enter');
           requestAnimationFrame(()=> main.classList.add('page-enter-active'));
           Array.from(main.querySelectorAll('script')).forEach(s=>{ try{ eval(s.textContent) } catch(e){ console.warn(e) } });
+          attachLiveLeaderboard(main);
         }, 140);
         if(!replace) history.pushState({url}, '', url);
       } else {
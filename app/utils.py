@@ -1,22 +1,103 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash, current_app, g  # <-- Import g
+from flask import session, redirect, url_for, flash, current_app, g, has_request_context, abort
+from flask.ctx import _AppCtxGlobals
+from datetime import datetime
 from .models import User
 from .extensions import db
 
 def login_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        if "user_id" not in session:
+        if get_current_user() is None:
             flash("Please log in to access this page", "warning")
             return redirect(url_for("auth.login"))
         return fn(*args, **kwargs)
     return wrapper
 
+def admin_required(fn):
+    """login_required, and the user's email must be listed in the ADMIN_EMAILS config (comma-separated)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        user = get_current_user()
+        if user is None:
+            flash("Please log in to access this page", "warning")
+            return redirect(url_for("auth.login"))
+        admins = {e.strip().lower() for e in (current_app.config.get("ADMIN_EMAILS") or "").split(",") if e.strip()}
+        if (user.email or "").lower() not in admins:
+            abort(403)
+        return fn(*args, **kwargs)
+    return wrapper
+
 def get_current_user():
+    """
+    The logged-in User, loaded on first use and kept on g for the rest of the
+    request, so login_required, the view and the layout share one query.
+    """
+    if not has_request_context():
+        return None
     uid = session.get("user_id")
     if not uid:
         return None
-    return User.query.get(uid)
+    cached = g.get("_current_user")
+    if cached is None or cached[0] != uid:
+        cached = g._current_user = (uid, db.session.get(User, uid))
+    return cached[1]
+
+class RequestGlobals(_AppCtxGlobals):
+    """
+    Flask's g with the user fields computed on access, so requests that never
+    touch them (static files, health checks, JSON endpoints) never query users.
+    """
+
+    @property
+    def user(self):
+        return get_current_user()
+
+    @property
+    def fit_integrated(self):
+        user = get_current_user()
+        return bool(user and user.google_tokens)
+
+def upsert(model, values, index_elements=("user_id", "date"), update_fields=None, increments=(), returning=False):
+    """
+    One-statement INSERT ... ON CONFLICT (index_elements) DO UPDATE on SQLite and
+    Postgres. `values` is a dict or a list of dicts. Conflicting rows get
+    `update_fields` copied from the new values (default: every non-key field) and
+    `increments` added to what is stored; update_fields=() means DO NOTHING.
+    With returning=True (single dict only) the written row is returned, or None
+    when DO NOTHING skipped it. Does not commit.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upsert() does not support the {dialect} dialect")
+
+    table = model.__table__
+    rows = values if isinstance(values, list) else [values]
+    if not rows:
+        return None
+    stmt = insert(table)
+    if update_fields is None:
+        update_fields = [k for k in rows[0] if k not in index_elements and k not in increments]
+    set_ = {k: stmt.excluded[k] for k in update_fields}
+    set_.update({k: table.c[k] + stmt.excluded[k] for k in increments})
+    if set_:
+        if "updated_at" in table.c and "updated_at" not in set_:
+            set_["updated_at"] = datetime.utcnow()
+        stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+
+    if returning:
+        return db.session.execute(stmt.values(rows[0]).returning(*table.c)).first()
+    if len(rows) == 1:
+        db.session.execute(stmt.values(rows[0]))
+    else:
+        db.session.execute(stmt, rows)
+    return None
 
 def safe_div(a, b, default=0.0):
     try:
@@ -32,26 +113,3 @@ def register_error_handlers(app):
     def server_error(e):
         current_app.logger.exception(e)
         return ("Server Error", 500)
-
-def load_user_into_g():
-    """
-    Loads the current user from the session into the Flask g object.
-    Also checks for Google Fit integration.
-    """
-    g.user = None
-    g.fit_integrated = False
-    
-    user_id = session.get("user_id")
-    if user_id:
-        user = User.query.get(user_id)
-        if user:
-            g.user = user
-            if user.google_tokens:
-                g.fit_integrated = True
-
-    if g.user and 'user' not in session:
-         session['user'] = g.user
-    if 'user_id' in session and not g.user:
-        g.user = get_current_user()
-        if g.user and g.user.google_tokens:
-            g.fit_integrated = True
\ No newline at end of file
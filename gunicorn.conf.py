@@ -0,0 +1,37 @@
+# gunicorn.conf.py — picked up automatically by `gunicorn run:app`
+import gc
+import os
+
+
+def _env_bool(name):
+    return str(os.environ.get(name, "")).strip().lower() in ("1", "true", "yes")
+
+
+# gthread workers, so an open live-leaderboard stream (Server-Sent Events) holds a
+# thread rather than a whole worker; LEADERBOARD_STREAM_MAX_SUBSCRIBERS caps how
+# many of a worker's threads streams may take.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 64))
+
+# With PRELOAD_MODEL set, create_app() runs (and loads the target model) in the
+# master before workers are forked, so the model's pages are shared copy-on-write.
+preload_app = _env_bool("PRELOAD_MODEL")
+
+
+def when_ready(server):
+    if preload_app:
+        # keep the preloaded objects out of the cyclic GC so collections in the
+        # workers don't write to (and un-share) their pages
+        gc.freeze()
+
+
+def on_starting(server):
+    # metrics files left by a previous run's workers would be added to this run's
+    from app.metrics import clear_metrics_dir
+    clear_metrics_dir()
+
+
+def worker_exit(server, worker):
+    # the last samples since the worker's periodic flush
+    from app.metrics import flush
+    flush()
@@ -0,0 +1,28 @@
+"""Add meal enrichment status
+
+Revision ID: 3f6b2c9d41a7
+Revises: eef466759785
+Create Date: 2026-10-17 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2c9d41a7'
+down_revision = 'eef466759785'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meals', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('enrichment_status', sa.String(length=16), nullable=True))
+        batch_op.create_index(batch_op.f('ix_meals_enrichment_status'), ['enrichment_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('meals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_meals_enrichment_status'))
+        batch_op.drop_column('enrichment_status')
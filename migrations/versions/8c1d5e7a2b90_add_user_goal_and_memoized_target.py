@@ -0,0 +1,38 @@
+"""Add user goal and memoized target columns
+
+Revision ID: 8c1d5e7a2b90
+Revises: 3f6b2c9d41a7
+Create Date: 2026-10-17 14:03:52.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d5e7a2b90'
+down_revision = '3f6b2c9d41a7'
+branch_labels = None
+depends_on = None
+
+
+def _existing_columns():
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+
+
+def upgrade():
+    # scripts/add.py may already have added target_calories by hand
+    existing = _existing_columns()
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        if 'goal' not in existing:
+            batch_op.add_column(sa.Column('goal', sa.String(length=16), nullable=True))
+        if 'target_calories' not in existing:
+            batch_op.add_column(sa.Column('target_calories', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('target_key', sa.String(length=128), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('target_key')
+        batch_op.drop_column('target_calories')
+        batch_op.drop_column('goal')
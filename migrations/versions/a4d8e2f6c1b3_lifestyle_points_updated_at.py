@@ -0,0 +1,28 @@
+"""Add lifestyle_points.updated_at
+
+Revision ID: a4d8e2f6c1b3
+Revises: f1c7d3a9e2b6
+Create Date: 2026-10-17 20:04:51.772190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d8e2f6c1b3'
+down_revision = 'f1c7d3a9e2b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('lifestyle_points', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_lifestyle_points_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lifestyle_points', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_lifestyle_points_updated_at'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,46 @@
+"""Add daily aggregates
+
+Revision ID: b7e4a1c9d3f2
+Revises: 8c1d5e7a2b90
+Create Date: 2026-10-17 15:21:07.530961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4a1c9d3f2'
+down_revision = '8c1d5e7a2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # rows are seeded lazily from activities/fitness_data the first time a day is touched
+    op.create_table('daily_aggregates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=False),
+    sa.Column('activity_minutes', sa.Float(), nullable=False),
+    sa.Column('activity_kcal', sa.Float(), nullable=False),
+    sa.Column('fit_kcal', sa.Float(), nullable=True),
+    sa.Column('avg_bpm', sa.Float(), nullable=True),
+    sa.Column('sleep_hours', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'date', name='uq_daily_aggregates_user_date')
+    )
+    with op.batch_alter_table('daily_aggregates', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_aggregates_date'), ['date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_daily_aggregates_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('daily_aggregates', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_aggregates_user_id'))
+        batch_op.drop_index(batch_op.f('ix_daily_aggregates_date'))
+
+    op.drop_table('daily_aggregates')
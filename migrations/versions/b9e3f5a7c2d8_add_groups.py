@@ -0,0 +1,76 @@
+"""Add groups, memberships and group leaderboard rollup
+
+Revision ID: b9e3f5a7c2d8
+Revises: a4d8e2f6c1b3
+Create Date: 2026-10-17 21:12:09.418337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e3f5a7c2d8'
+down_revision = 'a4d8e2f6c1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('groups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('member_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_groups_name'), ['name'], unique=False)
+
+    op.create_table('group_memberships',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('joined_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('group_id', 'user_id', name='uq_group_memberships_group_user')
+    )
+    with op.batch_alter_table('group_memberships', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_group_memberships_group_id'), ['group_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_group_memberships_user_id'), ['user_id'], unique=False)
+
+    op.create_table('group_leaderboard_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('anchor_date', sa.Date(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('total_points', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'anchor_date', 'group_id', name='uq_group_leaderboard_rollup_period_group')
+    )
+    with op.batch_alter_table('group_leaderboard_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_group_leaderboard_rollup_rank', ['period', 'anchor_date', sa.text('total_points DESC'), 'group_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_group_leaderboard_rollup_group_id'), ['group_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('group_leaderboard_rollup', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_group_leaderboard_rollup_group_id'))
+        batch_op.drop_index('ix_group_leaderboard_rollup_rank')
+
+    op.drop_table('group_leaderboard_rollup')
+    with op.batch_alter_table('group_memberships', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_group_memberships_user_id'))
+        batch_op.drop_index(batch_op.f('ix_group_memberships_group_id'))
+
+    op.drop_table('group_memberships')
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_groups_name'))
+
+    op.drop_table('groups')
@@ -0,0 +1,39 @@
+"""Unique (user_id, date) on fitness_data and lifestyle_points
+
+Revision ID: d2f8c6b1e5a3
+Revises: b7e4a1c9d3f2
+Create Date: 2026-10-17 16:48:20.907315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8c6b1e5a3'
+down_revision = 'b7e4a1c9d3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep the oldest row per day: it is the one the app's .first() reads returned
+    for table in ('fitness_data', 'lifestyle_points'):
+        op.execute(sa.text(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY user_id, date) AS keep)"
+        ))
+
+    with op.batch_alter_table('fitness_data', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_fitness_data_user_date', ['user_id', 'date'])
+
+    with op.batch_alter_table('lifestyle_points', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_lifestyle_points_user_date', ['user_id', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('lifestyle_points', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_lifestyle_points_user_date', type_='unique')
+
+    with op.batch_alter_table('fitness_data', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_fitness_data_user_date', type_='unique')
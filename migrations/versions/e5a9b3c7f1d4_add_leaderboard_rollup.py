@@ -0,0 +1,42 @@
+"""Add leaderboard rollup
+
+Revision ID: e5a9b3c7f1d4
+Revises: d2f8c6b1e5a3
+Create Date: 2026-10-17 18:02:44.615093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9b3c7f1d4'
+down_revision = 'd2f8c6b1e5a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # populate with scripts/rebuild_leaderboard_rollup.py after upgrading
+    op.create_table('leaderboard_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('anchor_date', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_points', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'anchor_date', 'user_id', name='uq_leaderboard_rollup_period_user')
+    )
+    with op.batch_alter_table('leaderboard_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_leaderboard_rollup_rank', ['period', 'anchor_date', 'total_points'], unique=False)
+        batch_op.create_index(batch_op.f('ix_leaderboard_rollup_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_rollup', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leaderboard_rollup_user_id'))
+        batch_op.drop_index('ix_leaderboard_rollup_rank')
+
+    op.drop_table('leaderboard_rollup')
@@ -0,0 +1,42 @@
+"""Leaderboard rank index in ranking order, and rank buckets
+
+Revision ID: f1c7d3a9e2b6
+Revises: e5a9b3c7f1d4
+Create Date: 2026-10-17 19:10:27.308514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7d3a9e2b6'
+down_revision = 'e5a9b3c7f1d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('leaderboard_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_rollup_rank')
+        batch_op.create_index('ix_leaderboard_rollup_rank', ['period', 'anchor_date', sa.text('total_points DESC'), 'user_id'], unique=False)
+
+    # populate with scripts/rebuild_leaderboard_rollup.py after upgrading
+    op.create_table('leaderboard_rank_buckets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=16), nullable=False),
+    sa.Column('anchor_date', sa.Date(), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period', 'anchor_date', 'bucket', name='uq_leaderboard_rank_buckets_window_bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('leaderboard_rank_buckets')
+
+    with op.batch_alter_table('leaderboard_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_rollup_rank')
+        batch_op.create_index('ix_leaderboard_rollup_rank', ['period', 'anchor_date', 'total_points'], unique=False)
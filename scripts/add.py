@@ -1,7 +1,8 @@
 # scripts/add_target_cal_column.py
 import sys
 import os
-from sqlalchemy import text
+import time
+from sqlalchemy import text, func
 from sqlalchemy.exc import OperationalError
 
 THIS_FILE = os.path.abspath(__file__)
@@ -13,7 +14,7 @@ try:
     from app import create_app
     from app.extensions import db
     from app.models import User
-    from app.nutrition import compute_daily_targets
+    from app.nutrition import predict_targets_batch, target_features_key
 except Exception as e:
     print("Failed to import app modules. Are you running this from the project root and is your virtualenv active?")
     print("Error:", e)
@@ -39,30 +40,31 @@ def add_column_sqlite(engine, table_name, col_def_sql):
         print("Error adding column:", e)
         return False
 
-def populate_targets(app, session):
-    users = session.query(User).all()
-    print(f"Found {len(users)} users — computing and saving targets...")
+def populate_targets(app, session, chunk_size=50000):
+    """Compute targets for every user with the batch API and write them back in chunks."""
+    columns = (User.id, User.birth_date, User.sex, User.height_cm, User.weight_kg,
+               User.activity_multiplier, User.activity_level, User.goal)
+    total = session.query(func.count(User.id)).scalar() or 0
+    print(f"Found {total} users — computing and saving targets...")
+    t0 = time.perf_counter()
     updated = 0
-    for u in users:
+    last_id = 0
+    while True:
+        rows = session.query(*columns).filter(User.id > last_id).order_by(User.id.asc()).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
         try:
-            tgt = compute_daily_targets(u)
-            if isinstance(tgt, dict):
-                value = float(tgt.get("target") or tgt.get("target_calories") or tgt.get("calories") or 0)
-            elif isinstance(tgt, (int, float)):
-                value = float(tgt)
-            else:
-                value = 0.0
-            if value and (getattr(u, "target_calories", None) != value):
-                u.target_calories = float(value)
-                session.add(u)
-                updated += 1
+            targets = predict_targets_batch(rows, chunk_size=chunk_size)
+            params = [{"id": r.id, "t": float(t), "k": target_features_key(r)} for r, t in zip(rows, targets)]
+            session.execute(text("UPDATE users SET target_calories = :t, target_key = :k WHERE id = :id"), params)
+            session.commit()
+            updated += len(params)
         except Exception as e:
-            app.logger.exception("Failed to compute target for user %s: %s", getattr(u, "id", None), e)
-    try:
-        session.commit()
-    except Exception:
-        session.rollback()
-    print(f"Updated target_calories for {updated} users.")
+            session.rollback()
+            app.logger.exception("Failed to compute targets for users up to id %s: %s", last_id, e)
+        print(f"  {updated}/{total} users ({updated / max(time.perf_counter() - t0, 1e-9):.0f}/s)")
+    print(f"Updated target_calories for {updated} users in {time.perf_counter() - t0:.1f}s.")
 
 def main():
     app = create_app()
@@ -0,0 +1,128 @@
+# scripts/bench_food_db.py
+"""
+Compare the old per-call json.load lookup with the compiled, mmapped food table
+on a synthetic table. Each mode runs in its own subprocess so RSS is comparable.
+
+    python scripts/bench_food_db.py [--entries 100000] [--lookups 2000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+import subprocess
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def rss_kb(field="VmRSS"):
+    """Current (VmRSS) or peak (VmHWM) resident set size in KiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_table(path, entries):
+    rnd = random.Random(7)
+    data = {}
+    for i in range(entries):
+        data[f"food item {i} {rnd.choice(['curry', 'roti', 'dal', 'rice', 'sabzi'])}"] = {
+            "energy_kcal": round(rnd.uniform(20, 700), 1),
+            "protein_g": round(rnd.uniform(0, 40), 1),
+            "carbs_g": round(rnd.uniform(0, 90), 1),
+            "fat_g": round(rnd.uniform(0, 40), 1),
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return list(data)
+
+
+def json_lookup(path, text):
+    # the pre-compilation code path from nutrition.lookup_nutrition_text
+    with open(path, "r", encoding="utf-8") as f:
+        db = json.load(f)
+    rec = db.get(text.lower())
+    return float(rec.get("energy_kcal", 0)) if rec else None
+
+
+def run_mode(mode, json_path, bin_path, keys_path, lookups):
+    from app.fooddb import FoodDB
+    with open(keys_path) as f:
+        keys = json.load(f)
+    base_rss, base_peak = rss_kb(), rss_kb("VmHWM")
+    if mode == "json":
+        fn = lambda k: json_lookup(json_path, k)
+        # a per-call json.load is too slow for thousands of calls; sample fewer
+        lookups = min(lookups, 50)
+    else:
+        table = FoodDB(bin_path)
+        fn = table.get
+    rnd = random.Random(11)
+    sample = [rnd.choice(keys) for _ in range(lookups)]
+    timings = []
+    for k in sample:
+        t0 = time.perf_counter()
+        assert fn(k) is not None
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    print(json.dumps({
+        "mode": mode,
+        "lookups": lookups,
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99) - 1] * 1e6,
+        "rss_delta_kb": rss_kb() - base_rss,
+        "peak_delta_kb": rss_kb("VmHWM") - base_peak,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--mode", choices=("json", "compiled"))
+    parser.add_argument("--json-path")
+    parser.add_argument("--bin-path")
+    parser.add_argument("--keys-path")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.json_path, args.bin_path, args.keys_path, args.lookups)
+        return
+
+    from app.fooddb import compile_food_db
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "table.json")
+        bin_path = os.path.join(tmp, "table.bin")
+        keys_path = os.path.join(tmp, "keys.json")
+        keys = make_table(json_path, args.entries)
+        with open(keys_path, "w") as f:
+            json.dump(keys, f)
+        t0 = time.perf_counter()
+        compile_food_db([json_path], bin_path)
+        print(f"table: {args.entries} entries, json {os.path.getsize(json_path)} bytes, "
+              f"compiled {os.path.getsize(bin_path)} bytes in {time.perf_counter() - t0:.2f}s")
+        for mode in ("json", "compiled"):
+            out = subprocess.run(
+                [sys.executable, THIS_FILE, "--mode", mode, "--lookups", str(args.lookups),
+                 "--json-path", json_path, "--bin-path", bin_path, "--keys-path", keys_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            r = json.loads(out)
+            print(f"{r['mode']:>9}: {r['lookups']} lookups  mean {r['mean_us']:.1f}us  "
+                  f"p50 {r['p50_us']:.1f}us  p99 {r['p99_us']:.1f}us  rss +{r['rss_delta_kb']} KiB  peak +{r['peak_delta_kb']} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# scripts/bench_leaderboard_engine.py
+"""
+Compare the in-process rolling-window engine against SQL for the 7-day board at
+several user counts: the GROUP BY over lifestyle_points the leaderboard view used
+to run, the rollup query it runs now, and the engine's build, top-100, rank and
+update costs. Each size gets a scratch SQLite database.
+
+    python scripts/bench_leaderboard_engine.py [--sizes 10000,100000,1000000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select, func
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import User, LifestylePoint, LeaderboardRollup
+from app.leaderboard import leaderboard_rows
+from app import leaderboard_engine
+from app.leaderboard_engine import SlidingWindowBoard
+
+DAYS = 7
+CHUNK = 50000
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def fill(n, today, seed=1):
+    """Users active on ~3 of the last 7 days, plus their rolling7 rollup rows."""
+    rnd = random.Random(seed)
+    days = [today - timedelta(days=k) for k in range(DAYS)]
+    for lo in range(1, n + 1, CHUNK):
+        ids = range(lo, min(lo + CHUNK, n + 1))
+        points, totals = [], defaultdict(float)
+        for uid in ids:
+            for day in rnd.sample(days, 3):
+                p = float(rnd.randrange(0, 100))
+                points.append({"user_id": uid, "date": day, "points": p})
+                totals[uid] += p
+        db.session.execute(insert(User), [{"id": i, "email": f"bench{i}@example.com"} for i in ids])
+        db.session.execute(insert(LifestylePoint), points)
+        db.session.execute(insert(LeaderboardRollup), [
+            {"period": f"rolling{DAYS}", "anchor_date": today, "user_id": uid, "total_points": t}
+            for uid, t in totals.items()])
+        db.session.commit()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def group_by_top(date_from, date_to):
+    total = func.sum(LifestylePoint.points)
+    q = (select(LifestylePoint.user_id, total.label("total")).where(
+        LifestylePoint.date >= date_from, LifestylePoint.date <= date_to)
+         .group_by(LifestylePoint.user_id).order_by(total.desc()).limit(100))
+    return db.session.execute(q).all()
+
+
+def bench(n):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")})
+    today = date.today()
+    date_from = today - timedelta(days=DAYS - 1)
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        fill(n, today)
+        print(f"{n} users: filled in {time.perf_counter() - t0:.1f}s")
+
+        print(f"  SQL GROUP BY top 100      {timed(lambda: group_by_top(date_from, today), 3):9.2f} ms")
+        leaderboard_engine.ENGINE_ENABLED = False
+        print(f"  rollup top 100            {timed(lambda: leaderboard_rows(date_from, today)):9.2f} ms")
+
+        base = rss_kb()
+        t0 = time.perf_counter()
+        board = SlidingWindowBoard(DAYS, today)
+        board.load(db.session.execute(select(LifestylePoint.user_id, LifestylePoint.date, LifestylePoint.points)
+                                      .where(LifestylePoint.date >= date_from)))
+        print(f"  engine build              {(time.perf_counter() - t0) * 1000:9.2f} ms, "
+              f"+{(rss_kb() - base) / 1024:.0f} MiB RSS")
+        print(f"  engine top 100            {timed(lambda: board.top(100)):9.3f} ms")
+        rnd = random.Random(2)
+        probes = rnd.sample(range(1, n + 1), 200)
+        t0 = time.perf_counter()
+        for uid in probes:
+            board.rank(uid, around=5)
+        print(f"  engine rank (+-5)         {(time.perf_counter() - t0) * 1000 / len(probes):9.3f} ms")
+        t0 = time.perf_counter()
+        for uid in probes:
+            board.set_points(uid, today, float(rnd.randrange(0, 100)))
+        print(f"  engine update             {(time.perf_counter() - t0) * 1000 / len(probes):9.3f} ms")
+        t0 = time.perf_counter()
+        board.advance(today + timedelta(days=1))
+        print(f"  engine slide one day      {(time.perf_counter() - t0) * 1000:9.2f} ms")
+
+        leaderboard_engine.ENGINE_ENABLED = True
+        leaderboard_engine.reset_boards()
+        leaderboard_engine.build_board(DAYS, today)
+        print(f"  leaderboard_rows (engine) {timed(lambda: leaderboard_rows(date_from, today)):9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-process leaderboard engine against SQL")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+    for n in (int(s) for s in args.sizes.split(",")):
+        bench(n)
+
+
+if __name__ == "__main__":
+    main()
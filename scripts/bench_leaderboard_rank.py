@@ -0,0 +1,82 @@
+# scripts/bench_leaderboard_rank.py
+"""
+Time user_rank() and keyset leaderboard_page() against a synthetic ranking of N
+users in one rolling window (default 1M). Runs on a scratch SQLite database
+unless --database-url points elsewhere; the tables are created and filled first.
+
+    python scripts/bench_leaderboard_rank.py [--users 1000000] [--database-url URL]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import User, LeaderboardRollup
+from app.leaderboard import user_rank, leaderboard_page, recount_rank_buckets
+
+CHUNK = 50000
+
+
+def fill(n, anchor, seed=1):
+    """Users and their rolling7 totals, written straight into the rollup, then the rank buckets."""
+    rnd = random.Random(seed)
+    for lo in range(1, n + 1, CHUNK):
+        ids = range(lo, min(lo + CHUNK, n + 1))
+        db.session.execute(insert(User), [{"id": i, "email": f"bench{i}@example.com"} for i in ids])
+        # whole-ish numbers give plenty of ties, as real point totals do
+        db.session.execute(insert(LeaderboardRollup), [
+            {"period": "rolling7", "anchor_date": anchor, "user_id": i, "total_points": round(rnd.uniform(0, 700), 1)}
+            for i in ids])
+        db.session.commit()
+    recount_rank_buckets()
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark leaderboard rank lookups and deep pages")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--database-url")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": url})
+    anchor = date.today()
+    date_from = anchor - timedelta(days=6)
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        fill(args.users, anchor)
+        print(f"Filled {args.users} users in {time.perf_counter() - t0:.1f}s ({url})")
+
+        for uid in random.Random(2).sample(range(1, args.users + 1), 5):
+            standing = user_rank(uid, date_from, anchor)
+            ms = timed(lambda: user_rank(uid, date_from, anchor), args.repeat)
+            cursor = standing["next_cursor"]
+            page_ms = timed(lambda: leaderboard_page(date_from, anchor, cursor, limit=100), args.repeat)
+            print(f"rank {standing['rank']:>8}: user_rank {ms:6.2f} ms, next 100 rows {page_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# scripts/bench_tree_model.py
+"""
+Compare serving the pickled calorie model against the exported NumPy TreeEnsemble:
+import + load time, RSS, and per-batch prediction latency. Each side runs in a fresh
+subprocess so imports and memory are measured from a clean interpreter.
+
+    python scripts/bench_tree_model.py [instance/target_cal_model.pkl]
+
+If the pickle doesn't exist a model is trained first with scripts/train.py.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+BATCH_SIZES = (1, 100, 10000)
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_side(mode, path):
+    base_rss = rss_kb()
+    t0 = time.perf_counter()
+    import numpy as np
+    if mode == "pickle":
+        import pickle
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        model = data.get("model") if isinstance(data, dict) else data
+    else:
+        # importing app.nutrition pulls in the app package (Flask etc.), which the
+        # server pays anyway; the saving is not importing xgboost/sklearn
+        from app.nutrition import TreeEnsemble
+        model = TreeEnsemble.load(path)
+    load_s = time.perf_counter() - t0
+    loaded_rss = rss_kb()
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in BATCH_SIZES:
+        X = np.column_stack([
+            rng.integers(18, 70, n), rng.integers(0, 2, n), rng.normal(165, 10, n),
+            rng.normal(70, 15, n), rng.choice([1.2, 1.55, 1.9], n), rng.choice([-1, 0, 1], n),
+        ]).astype(float)
+        reps = max(3, min(200, 20000 // n))
+        model.predict(X)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            model.predict(X)
+        results[str(n)] = (time.perf_counter() - t0) / reps * 1000
+    print(json.dumps({"mode": mode, "import_load_s": load_s, "rss_kb": loaded_rss - base_rss,
+                      "peak_rss_kb": rss_kb() - base_rss, "batch_ms": results}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", default=os.path.join("instance", "target_cal_model.pkl"))
+    parser.add_argument("--side", choices=("pickle", "numpy"))
+    args = parser.parse_args()
+
+    if args.side:
+        run_side(args.side, args.model)
+        return
+
+    if not os.path.exists(args.model):
+        print("Training a model first (scripts/train.py)...")
+        sys.path.insert(0, os.path.join(PROJECT_ROOT, "scripts"))
+        from train import train_and_save
+        train_and_save(args.model)
+    npz = os.path.splitext(args.model)[0] + ".npz"
+    from export_tree_model import export
+    _, diff = export(args.model, npz)
+    print(f"max |numpy - original| on 5000 rows: {diff:.3g}")
+
+    for side, path in (("pickle", args.model), ("numpy", npz)):
+        out = subprocess.run([sys.executable, THIS_FILE, path, "--side", side],
+                             check=True, capture_output=True, text=True, cwd=PROJECT_ROOT).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        batches = "  ".join(f"n={n}: {ms:.3f}ms" for n, ms in r["batch_ms"].items())
+        print(f"{side:>7}: import+load {r['import_load_s']:.2f}s  rss +{r['rss_kb'] / 1024:.1f} MiB  "
+              f"peak +{r['peak_rss_kb'] / 1024:.1f} MiB  {batches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# scripts/build_food_db.py
+"""
+Compile local food tables (instance/indian_nutrition.json by default, plus any
+extra JSON/CSV tables given on the command line) into instance/food_db.bin.
+
+    python scripts/build_food_db.py [extra_table.json ...] [--out PATH]
+"""
+import os
+import sys
+import argparse
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.fooddb import compile_food_db, FOOD_DB_JSON_PATH, FOOD_DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile local food tables into the mmap-able lookup format.")
+    parser.add_argument("tables", nargs="*", help="extra JSON/CSV tables; later tables override earlier ones")
+    parser.add_argument("--out", default=FOOD_DB_PATH, help="output path (default: %(default)s)")
+    parser.add_argument("--no-default", action="store_true", help="do not include %s" % FOOD_DB_JSON_PATH)
+    args = parser.parse_args()
+
+    sources = []
+    if not args.no_default and os.path.exists(FOOD_DB_JSON_PATH):
+        sources.append(FOOD_DB_JSON_PATH)
+    sources.extend(args.tables)
+    if not sources:
+        print("No food tables found. Pass a table path or create", FOOD_DB_JSON_PATH)
+        sys.exit(1)
+
+    count = compile_food_db(sources, args.out)
+    print(f"Compiled {count} foods from {len(sources)} table(s) into {args.out} ({os.path.getsize(args.out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# scripts/check_daily_aggregates.py
+"""
+Compare the running per-day aggregates against a full recompute from activities
+and fitness_data. Exits non-zero on drift; --fix rewrites drifted days.
+
+    python scripts/check_daily_aggregates.py [--user-id N] [--fix]
+"""
+import os
+import sys
+import json
+import argparse
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.activities import check_daily_aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check daily aggregates against a full recompute")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--fix", action="store_true")
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        mismatches = check_daily_aggregates(user_id=args.user_id, fix=args.fix)
+    for m in mismatches:
+        print(json.dumps(m, default=str))
+    print(f"{len(mismatches)} drifted day(s){' fixed' if args.fix and mismatches else ''}.")
+    if mismatches and not args.fix:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
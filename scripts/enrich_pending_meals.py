@@ -0,0 +1,24 @@
+# scripts/enrich_pending_meals.py
+"""Backfill nutrition for meals still marked pending (e.g. after a worker restart)."""
+import os
+import sys
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.enrichment import enrich_pending_meals
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = create_app()
+    with app.app_context():
+        done = enrich_pending_meals(limit=limit)
+    print(f"Enriched {done} pending meals.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# scripts/export_tree_model.py
+"""
+Flatten the pickled calorie model (XGBRegressor or GradientBoostingRegressor from
+scripts/train.py) into NumPy arrays that app.nutrition.TreeEnsemble serves without
+importing xgboost/sklearn. Point MODEL_PATH at the .npz to use it.
+
+    python scripts/export_tree_model.py [instance/target_cal_model.pkl] [--out instance/target_cal_model.npz]
+"""
+import os
+import sys
+import pickle
+import argparse
+
+import numpy as np
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.nutrition import TreeEnsemble, FEATURE_NAMES
+
+
+def export(pkl_path, out_path, check_rows=5000):
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+    model = data.get("model") if isinstance(data, dict) else data
+    ensemble = TreeEnsemble.from_model(model)
+    ensemble.save(out_path)
+
+    # sanity check against the original on synthetic feature rows
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(18, 70, check_rows), rng.integers(0, 2, check_rows),
+        rng.normal(165, 10, check_rows), rng.normal(70, 15, check_rows),
+        rng.choice([1.2, 1.375, 1.55, 1.725, 1.9], check_rows), rng.choice([-1, 0, 1], check_rows),
+    ]).astype(float)
+    try:
+        import pandas as pd
+        X_ref = pd.DataFrame(X, columns=FEATURE_NAMES)
+    except ImportError:
+        X_ref = X
+    diff = np.abs(TreeEnsemble.load(out_path).predict(X) - np.asarray(model.predict(X_ref), dtype=float)).max()
+    return ensemble, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a tree-ensemble calorie model to .npz")
+    parser.add_argument("model", nargs="?", default=os.path.join("instance", "target_cal_model.pkl"))
+    parser.add_argument("--out")
+    args = parser.parse_args()
+    out = args.out or os.path.splitext(args.model)[0] + ".npz"
+    ensemble, diff = export(args.model, out)
+    print(f"Exported {len(ensemble.roots)} trees / {len(ensemble.feature)} nodes (max depth {ensemble.max_depth}) "
+          f"to {out}; max |diff| vs original on 5000 rows: {diff:.3g}")
+
+
+if __name__ == "__main__":
+    main()
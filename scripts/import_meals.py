@@ -0,0 +1,51 @@
+# scripts/import_meals.py
+"""
+Bulk-import meals for one user from a CSV or NDJSON export.
+
+    python scripts/import_meals.py user@example.com meals.csv [--format csv|ndjson] [--chunk-size 1000]
+
+CSV columns / NDJSON keys: name, date (YYYY-MM-DD), time (HH:MM), and optionally
+calories, protein_g, carbs_g, fat_g. Rows without calories are resolved in batch.
+"""
+import os
+import sys
+import time
+import argparse
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.models import User
+from app.meal_import import import_meals, iter_import_rows, detect_format, IMPORT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import meals for a user.")
+    parser.add_argument("email")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "ndjson"))
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        user = User.query.filter_by(email=args.email.strip().lower()).first()
+        if not user:
+            print("No user with email", args.email)
+            sys.exit(1)
+        fmt = args.format or detect_format(args.path)
+        t0 = time.perf_counter()
+        with open(args.path, "r", encoding="utf-8-sig", newline="") as f:
+            summary = import_meals(user.id, iter_import_rows(f, fmt), chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - t0
+    print(f"Read {summary['rows']} rows, inserted {summary['inserted']} meals in {elapsed:.1f}s "
+          f"({summary['foods_resolved']} distinct foods, {summary['days_rescored']} days rescored)")
+    for err in summary["errors"]:
+        print(f"  row {err['row']}: {err['error']}")
+
+
+if __name__ == "__main__":
+    main()
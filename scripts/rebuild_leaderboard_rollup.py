@@ -0,0 +1,52 @@
+# scripts/rebuild_leaderboard_rollup.py
+"""
+Rebuild leaderboard_rollup from lifestyle_points, then recount the rank buckets
+and rebuild the group rollup. Run once after the tables are created, or to
+repair drift; normal writes keep all three current by delta.
+
+    python scripts/rebuild_leaderboard_rollup.py [--chunk-users 1000]
+"""
+import os
+import sys
+import time
+import argparse
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.leaderboard import (rebuild_leaderboard_rollup, recount_rank_buckets, rebuild_group_rollup,
+                             invalidate_leaderboard_cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild leaderboard rollups from lifestyle points")
+    parser.add_argument("--chunk-users", type=int, default=1000)
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        last_id, written = 0, 0
+        while True:
+            ids = [uid for (uid,) in db.session.query(User.id).filter(User.id > last_id)
+                   .order_by(User.id.asc()).limit(args.chunk_users)]
+            if not ids:
+                break
+            written += rebuild_leaderboard_rollup(ids[0], ids[-1])
+            db.session.commit()
+            last_id = ids[-1]
+            print(f"  users up to id {last_id}: {written} rollup rows")
+        buckets = recount_rank_buckets()
+        rebuild_group_rollup()
+        db.session.commit()
+        print(f"  {buckets} rank buckets, group rollup rebuilt")
+        invalidate_leaderboard_cache()
+        print(f"Rebuilt {written} rollup rows in {time.perf_counter() - t0:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
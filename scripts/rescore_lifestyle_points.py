@@ -0,0 +1,167 @@
+# scripts/rescore_lifestyle_points.py
+"""
+Rescore lifestyle points for every user over a date range, e.g. after the scoring
+rules change. Users are processed in id-ordered chunks: per chunk, grouped SQL
+over activities and fitness_data gives each day's totals, the batch scorer turns
+them into points, and lifestyle_points and daily_aggregates are written with
+INSERT ... ON CONFLICT upserts, the chunk's leaderboard rollups are rebuilt, and
+everything is committed; group rollups are rebuilt once at the end. A checkpoint file records the last finished user id, so
+an interrupted run continues where it stopped with --resume.
+
+    python scripts/rescore_lifestyle_points.py [--start 2024-01-01] [--end 2024-12-31] [--resume]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date
+
+from sqlalchemy import func
+
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(THIS_FILE), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.extensions import db
+from app.models import User, Activity, FitnessData, LifestylePoint, DailyAggregate
+from app.activities import lifestyle_points_from_totals_batch
+from app.utils import upsert
+from app.leaderboard import rebuild_leaderboard_rollup, rebuild_group_rollup, invalidate_leaderboard_cache
+
+DEFAULT_CHECKPOINT = os.path.join(PROJECT_ROOT, "instance", "rescore_checkpoint.json")
+
+NAN = float("nan")
+
+
+def _in_range(q, col, start, end):
+    if start is not None:
+        q = q.filter(col >= start)
+    if end is not None:
+        q = q.filter(col <= end)
+    return q
+
+
+def day_totals(first_id, last_id, start, end):
+    """(user_id, date) -> totals for a user id range, from two grouped queries."""
+    totals = {}
+    q = db.session.query(
+        Activity.user_id, Activity.date, func.count(Activity.id),
+        func.coalesce(func.sum(Activity.duration_minutes), 0.0),
+        func.coalesce(func.sum(Activity.calories_burned), 0.0),
+    ).filter(Activity.user_id.between(first_id, last_id))
+    q = _in_range(q, Activity.date, start, end).group_by(Activity.user_id, Activity.date)
+    for uid, day, count, minutes, kcal in q:
+        totals[(uid, day)] = {"activity_count": int(count), "activity_minutes": float(minutes),
+                              "activity_kcal": float(kcal), "fit_kcal": None, "avg_bpm": None, "sleep_hours": None}
+
+    # first row per day wins, as FitnessData.query...first() does in the app
+    first_fd = db.session.query(func.min(FitnessData.id)).filter(FitnessData.user_id.between(first_id, last_id))
+    first_fd = _in_range(first_fd, FitnessData.date, start, end).group_by(FitnessData.user_id, FitnessData.date)
+    q = db.session.query(FitnessData.user_id, FitnessData.date, FitnessData.calories_burned,
+                         FitnessData.avg_bpm, FitnessData.sleep_hours).filter(FitnessData.id.in_(first_fd))
+    for uid, day, kcal, bpm, sleep in q:
+        t = totals.setdefault((uid, day), {"activity_count": 0, "activity_minutes": 0.0, "activity_kcal": 0.0})
+        t.update(fit_kcal=kcal, avg_bpm=bpm, sleep_hours=sleep)
+    return totals
+
+
+def _existing_days(model, first_id, last_id, start, end):
+    q = db.session.query(model.user_id, model.date).filter(model.user_id.between(first_id, last_id))
+    return set(_in_range(q, model.date, start, end))
+
+
+def rescore_chunk(first_id, last_id, start, end):
+    totals = day_totals(first_id, last_id, start, end)
+    # days that have points but no longer any source rows score zero
+    for key in _existing_days(LifestylePoint, first_id, last_id, start, end):
+        totals.setdefault(key, {"activity_count": 0, "activity_minutes": 0.0, "activity_kcal": 0.0,
+                                "fit_kcal": None, "avg_bpm": None, "sleep_hours": None})
+    if not totals:
+        return 0
+    keys = list(totals)
+    col = lambda name: [NAN if totals[k][name] is None else totals[k][name] for k in keys]
+    points, reasons = lifestyle_points_from_totals_batch(col("activity_minutes"), col("activity_kcal"),
+                                                         col("fit_kcal"), col("avg_bpm"), col("sleep_hours"))
+    lp_rows = [{"user_id": uid, "date": day, "points": p, "reason": r}
+               for (uid, day), p, r in zip(keys, points, reasons)]
+    upsert(LifestylePoint, lp_rows)
+    upsert(DailyAggregate, [{"user_id": uid, "date": day, **totals[(uid, day)]} for uid, day in keys])
+    rebuild_leaderboard_rollup(first_id, last_id)
+    return len(keys)
+
+
+def _load_checkpoint(path, start, end):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if cp.get("start") != (start.isoformat() if start else None) or cp.get("end") != (end.isoformat() if end else None):
+        print(f"Checkpoint {path} is for a different date range; starting over.")
+        return 0
+    return int(cp.get("last_user_id") or 0)
+
+
+def _save_checkpoint(path, start, end, last_user_id):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"start": start.isoformat() if start else None, "end": end.isoformat() if end else None,
+                   "last_user_id": last_user_id}, f)
+    os.replace(tmp, path)
+
+
+def rescore(start=None, end=None, chunk_users=500, checkpoint=DEFAULT_CHECKPOINT, resume=False):
+    last_id = _load_checkpoint(checkpoint, start, end) if resume else 0
+    total_users = db.session.query(func.count(User.id)).filter(User.id > last_id).scalar() or 0
+    if last_id:
+        print(f"Resuming after user id {last_id}.")
+    print(f"Rescoring {total_users} users, dates {start or 'min'}..{end or 'max'}")
+    t0 = time.perf_counter()
+    users_done = days_done = 0
+    while True:
+        ids = [uid for (uid,) in db.session.query(User.id).filter(User.id > last_id)
+               .order_by(User.id.asc()).limit(chunk_users)]
+        if not ids:
+            break
+        try:
+            days_done += rescore_chunk(ids[0], ids[-1], start, end)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            print(f"Failed on users {ids[0]}..{ids[-1]}; rerun with --resume to continue from here.")
+            raise
+        last_id = ids[-1]
+        users_done += len(ids)
+        if checkpoint:
+            _save_checkpoint(checkpoint, start, end, last_id)
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+        print(f"  {users_done}/{total_users} users, {days_done} days ({days_done / elapsed:.0f} days/s)")
+    # group totals span user chunks, so they're summed once at the end
+    rebuild_group_rollup()
+    db.session.commit()
+    invalidate_leaderboard_cache()
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    print(f"Rescored {days_done} days for {users_done} users in {time.perf_counter() - t0:.1f}s.")
+    return days_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-rescore lifestyle points")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    parser.add_argument("--chunk-users", type=int, default=500)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--resume", action="store_true", help="continue after the last finished chunk")
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        rescore(args.start, args.end, args.chunk_users, args.checkpoint, args.resume)
+
+
+if __name__ == "__main__":
+    main()
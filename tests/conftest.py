@@ -1,7 +1,14 @@
 import pytest
+import tempfile, os
+
+# keep the shared leaderboard cache, the session store and metrics out of the developer's instance/ folder
+os.environ.setdefault("LEADERBOARD_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "leaderboard_cache.sqlite3"))
+os.environ.setdefault("SESSION_STORE_PATH", os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"))
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp())
+
 from app import create_app
 from app.extensions import db as _db
-import tempfile, os
+from app.cache import leaderboard_cache
 
 @pytest.fixture
 def app():
@@ -12,8 +19,8 @@ def app():
         "SECRET_KEY": "test-secret",
         "WTF_CSRF_ENABLED": False
     }
-    app = create_app()
-    app.config.update(cfg)
+    app = create_app(cfg)
+    leaderboard_cache.clear()
     with app.app_context():
         _db.create_all()
     yield app
@@ -23,3 +30,23 @@ def app():
 @pytest.fixture
 def client(app):
     return app.test_client()
+
+@pytest.fixture
+def query_budget(client):
+    """
+    query_budget(url, queries, commits=0, method="get", **kwargs) makes the
+    request and fails if it ran more SQL statements or commits than allowed.
+    Returns the response.
+    """
+    from app.instrumentation import capture_requests
+
+    def check(url, queries, commits=0, method="get", **kwargs):
+        # a fresh app context, so nothing loaded by earlier requests in the test is reused
+        with client.application.app_context(), capture_requests() as captured:
+            resp = getattr(client, method)(url, **kwargs)
+        (endpoint, stats), = captured
+        assert stats.queries <= queries and stats.commits <= commits, (
+            f"{method.upper()} {url} ({endpoint}) ran {stats.queries} statements and {stats.commits} commits, "
+            f"budget {queries} and {commits}; slowest: {stats.slowest_statement}")
+        return resp
+    return check
@@ -0,0 +1,139 @@
+from datetime import date, time
+
+from app.extensions import db
+from app.models import User, Activity, FitnessData, DailyAggregate, LifestylePoint
+from app.activities import (
+    record_activity_change, record_fitness_change, compute_lifestyle_points_for_user_date,
+    check_daily_aggregates, totals_from_rows, lifestyle_points_from_totals,
+)
+
+
+def _add_activity(user_id, day, minutes, kcal):
+    a = Activity(user_id=user_id, date=day, time=time(8, 0), activity_type="run",
+                 duration_minutes=minutes, calories_burned=kcal)
+    db.session.add(a)
+    db.session.flush()
+    record_activity_change(a, 1)
+    db.session.commit()
+    return a
+
+
+def test_aggregate_tracks_deltas_and_matches_full_recompute(app):
+    day = date(2024, 5, 1)
+    with app.app_context():
+        u = User(email="agg@example.com")
+        db.session.add(u)
+        db.session.commit()
+        # a day with history before the aggregate existed is seeded from the tables
+        db.session.add(Activity(user_id=u.id, date=day, time=time(7, 0), activity_type="walk",
+                                duration_minutes=20, calories_burned=None))
+        db.session.commit()
+
+        a1 = _add_activity(u.id, day, 30, 250)
+        a2 = _add_activity(u.id, day, None, 120.5)
+        fd = FitnessData(user_id=u.id, date=day, calories_burned=400, avg_bpm=95, sleep_hours=7.5)
+        db.session.add(fd)
+        db.session.flush()
+        record_fitness_change(fd)
+        db.session.commit()
+
+        for a in (a1, a2):
+            db.session.delete(a)
+            db.session.flush()
+            record_activity_change(a, -1)
+            db.session.commit()
+
+        agg = DailyAggregate.query.filter_by(user_id=u.id, date=day).one()
+        assert agg.totals() == totals_from_rows(u.id, day)
+        assert check_daily_aggregates() == []
+
+        points = compute_lifestyle_points_for_user_date(u.id, day)
+        assert points == lifestyle_points_from_totals(20, 0, 400, 95, 7.5)[0]
+        assert LifestylePoint.query.filter_by(user_id=u.id, date=day).one().points == points
+
+        agg.activity_minutes = 999
+        db.session.commit()
+        drift = check_daily_aggregates(fix=True)
+        assert [m["date"] for m in drift] == [day.isoformat()]
+        assert check_daily_aggregates() == []
+
+
+def test_concurrent_activity_posts_keep_one_row_per_day(app):
+    import threading
+    from app.activities import totals_from_rows
+
+    with app.app_context():
+        u = User(email="race@example.com")
+        db.session.add(u)
+        db.session.commit()
+        uid = u.id
+
+    threads, per_thread, errors = 8, 5, []
+
+    def worker(n):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["user_id"] = uid
+        for i in range(per_thread):
+            resp = client.post("/activities/add", data={
+                "activity_type": "run", "duration_minutes": "10", "calories_burned": "50",
+                "avg_bpm": str(70 + n), "sleep_hours": "8",
+            })
+            if resp.status_code != 302:
+                errors.append(resp.status_code)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    assert errors == []
+    with app.app_context():
+        day = Activity.query.filter_by(user_id=uid).first().date
+        assert Activity.query.filter_by(user_id=uid).count() == threads * per_thread
+        assert FitnessData.query.filter_by(user_id=uid).count() == 1
+        assert LifestylePoint.query.filter_by(user_id=uid).count() == 1
+        agg = DailyAggregate.query.filter_by(user_id=uid, date=day).one()
+        assert agg.totals() == totals_from_rows(uid, day)
+        expected = lifestyle_points_from_totals(**{k: v for k, v in agg.totals().items() if k != "activity_count"})[0]
+        assert LifestylePoint.query.filter_by(user_id=uid).one().points == expected
+
+
+def test_concurrent_first_point_writes_move_rollups_once(app, monkeypatch):
+    import threading
+    import time as clock
+    from app import activities
+    from app.models import LeaderboardRollup
+
+    with app.app_context():
+        u = User(email="first-writers@example.com")
+        db.session.add(u)
+        db.session.commit()
+        uid, day = u.id, date(2024, 5, 6)
+        _add_activity(uid, day, 30, 250)
+
+    write = activities.upsert
+
+    def slow_upsert(model, *args, **kwargs):
+        if model is LifestylePoint:
+            clock.sleep(0.2)    # both writers get as far as the points upsert before either commits
+        return write(model, *args, **kwargs)
+
+    monkeypatch.setattr(activities, "upsert", slow_upsert)
+
+    def worker():
+        with app.app_context():
+            compute_lifestyle_points_for_user_date(uid, day)
+
+    pool = [threading.Thread(target=worker) for _ in range(2)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    with app.app_context():
+        points = LifestylePoint.query.filter_by(user_id=uid, date=day).one().points
+        assert points > 0
+        totals = {(r.period, r.anchor_date): r.total_points for r in LeaderboardRollup.query.filter_by(user_id=uid)}
+        assert totals and all(t == points for t in totals.values())
@@ -0,0 +1,66 @@
+import time
+from app.cache import SQLiteCache, normalize_query
+
+def make_cache(tmp_path, **kw):
+    opts = {"ttl": 60, "max_entries": 3, "negative_ttl": 60}
+    opts.update(kw)
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"), "test", **opts)
+
+def test_normalize_query():
+    assert normalize_query("  1  Banana\n") == "1 banana"
+    assert normalize_query(None) == ""
+
+def test_hit_miss_and_negative(tmp_path):
+    c = make_cache(tmp_path)
+    assert c.lookup("1 banana") == (False, None)
+    c.set("1 banana", {"kcal": 105.0})
+    c.set("unobtainium", None)
+    assert c.lookup("1 banana") == (True, {"kcal": 105.0})
+    assert c.lookup("unobtainium") == (True, None)
+    stats = c.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+def test_shared_between_instances(tmp_path):
+    make_cache(tmp_path).set("apple", {"kcal": 95.0})
+    assert make_cache(tmp_path).get("apple") == {"kcal": 95.0}
+
+def test_ttl_expiry(tmp_path):
+    c = make_cache(tmp_path, ttl=0.05)
+    c.set("apple", {"kcal": 95.0})
+    time.sleep(0.1)
+    assert c.lookup("apple") == (False, None)
+
+def test_lru_eviction(tmp_path):
+    c = make_cache(tmp_path)
+    for k in ("a", "b", "c"):
+        c.set(k, 1)
+        time.sleep(0.01)
+    c.get("a")
+    c.set("d", 1)
+    assert c.lookup("b") == (False, None)
+    assert c.lookup("a")[0] and c.lookup("d")[0]
+
+def test_set_if_generation_skips_after_invalidation(tmp_path):
+    c = make_cache(tmp_path)
+    gen = c.generation()
+    c.delete_where(lambda key: True)
+    c.set("a", 1, if_generation=gen)
+    assert c.lookup("a") == (False, None)
+    c.set("a", 1, if_generation=c.generation())
+    assert c.get("a") == 1
+
+def test_lookups_take_no_write_lock(tmp_path):
+    c = make_cache(tmp_path)
+    c.set("apple", {"kcal": 95.0})
+    other = make_cache(tmp_path)._connect()
+    other.execute("BEGIN IMMEDIATE")     # another process holds the write lock
+    try:
+        t0 = time.monotonic()
+        assert c.lookup("apple") == (True, {"kcal": 95.0})
+        assert c.lookup("pear") == (False, None)
+        assert time.monotonic() - t0 < 1
+    finally:
+        other.execute("ROLLBACK")
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+    c.set("pear", None)
+    assert make_cache(tmp_path).stats()["hits"] == 1    # written with the next store
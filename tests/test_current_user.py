@@ -0,0 +1,50 @@
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User
+
+
+def _user_queries(app, fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, [s for s in statements if "FROM users" in s]
+
+
+def test_user_loaded_once_per_request(app, client):
+    with app.app_context():
+        u = User(email="once@example.com", full_name="Once")
+        db.session.add(u)
+        db.session.commit()
+        uid = u.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    # login_required, the view and the layout's g.user all share one load
+    resp, queries = _user_queries(app, lambda: client.get("/leaderboard/?days=7"))
+    assert resp.status_code == 200
+    assert b"Once" in resp.data
+    assert len(queries) == 1
+
+    resp, queries = _user_queries(app, lambda: client.get("/static/js/router.js"))
+    assert resp.status_code == 200
+    assert queries == []
+    resp.close()
+
+    # the session cookie carries only the id
+    with client.session_transaction() as sess:
+        assert set(sess) == {"user_id"}
+
+
+def test_login_required_rejects_unknown_user(app, client):
+    with client.session_transaction() as sess:
+        sess["user_id"] = 10**6
+    resp = client.get("/leaderboard/")
+    assert resp.status_code == 302
+    assert "/login" in resp.headers["Location"]
@@ -0,0 +1,25 @@
+from datetime import date, time
+from app import enrichment
+from app.extensions import db
+from app.models import User, Meal, LifestylePoint
+
+def test_enrich_pending_meal_backfills_row(app, monkeypatch):
+    monkeypatch.setattr(enrichment, "lookup_nutrition_text",
+                        lambda text: {"kcal": 105.0, "protein_g": 1.3, "carbs_g": 27.0, "fat_g": 0.4})
+    with app.app_context():
+        u = User(email="eater@example.com", password_hash="x")
+        db.session.add(u)
+        db.session.commit()
+        meal = Meal(user_id=u.id, name="1 banana", calories=0.0, date=date.today(), time=time(8, 0),
+                    enrichment_status=enrichment.PENDING)
+        db.session.add(meal)
+        db.session.commit()
+
+        assert enrichment.enrich_meal(meal.id) == enrichment.DONE
+        db.session.expire_all()
+        meal = db.session.get(Meal, meal.id)
+        assert meal.calories == 105.0 and meal.carbs_g == 27.0
+        assert meal.enrichment_status == enrichment.DONE and not meal.flagged
+        assert LifestylePoint.query.filter_by(user_id=u.id, date=meal.date).count() == 1
+        # already enriched: a second run is a no-op
+        assert enrichment.enrich_meal(meal.id) is None
@@ -0,0 +1,23 @@
+import json
+from app.fooddb import FoodDB, compile_food_db
+
+def test_compile_and_lookup(tmp_path):
+    src = tmp_path / "foods.json"
+    src.write_text(json.dumps({
+        "Roti": {"energy_kcal": 120, "protein_g": 3, "carbs_g": 18, "fat_g": 3.5},
+        "dal  tadka": {"kcal": 180, "protein_g": 9},
+        "aloo paratha": {"energy_kcal": 290},
+    }))
+    extra = tmp_path / "extra.csv"
+    extra.write_text("name,kcal,protein_g,carbs_g,fat_g\nroti,110,3,17,3\n")
+    out = tmp_path / "food_db.bin"
+    assert compile_food_db([str(src), str(extra)], str(out)) == 3
+
+    table = FoodDB(str(out))
+    assert len(table) == 3
+    assert table.get("ROTI") == (110.0, 3.0, 17.0, 3.0)
+    assert table.get("dal tadka") == (180.0, 9.0, 0.0, 0.0)
+    assert table.get("aloo paratha")[0] == 290.0
+    assert table.get("paneer") is None
+    assert table.get("") is None
+    table.close()
@@ -0,0 +1,110 @@
+import random
+from collections import defaultdict
+from datetime import date, time, timedelta
+
+from app.extensions import db
+from app.models import User, Activity, Group, GroupMembership, GroupRollup, LeaderboardRollup
+from app.activities import record_activity_change, compute_lifestyle_points_for_user_date
+from app.groups import join_group, leave_group
+from app.leaderboard import rebuild_group_rollup, group_rows, group_member_rows
+
+
+def _expected_group_totals():
+    members = defaultdict(set)
+    for m in GroupMembership.query:
+        members[m.group_id].add(m.user_id)
+    totals = defaultdict(float)
+    for r in LeaderboardRollup.query:
+        for gid, uids in members.items():
+            if r.user_id in uids:
+                totals[(r.period, r.anchor_date, gid)] += r.total_points
+    return {k: round(v, 6) for k, v in totals.items() if round(v, 6)}
+
+
+def _stored_group_totals():
+    return {(r.period, r.anchor_date, r.group_id): round(r.total_points, 6)
+            for r in GroupRollup.query if round(r.total_points, 6)}
+
+
+def test_group_rollup_tracks_points_and_membership(app):
+    rnd = random.Random(19)
+    start = date(2024, 2, 1)
+    with app.app_context():
+        users = [User(email=f"g{i}@example.com") for i in range(8)]
+        groups = [Group(name=f"Team {i}") for i in range(4)]
+        db.session.add_all(users + groups)
+        db.session.commit()
+        for u in users:
+            # overlapping membership: everyone is in one or two groups
+            for g in rnd.sample(groups, rnd.choice((1, 2))):
+                join_group(g.id, u.id)
+
+        for step in range(80):
+            u = rnd.choice(users)
+            day = start + timedelta(days=rnd.randrange(20))
+            a = Activity(user_id=u.id, date=day, time=time(7, 0), activity_type="x",
+                         duration_minutes=rnd.uniform(5, 60), calories_burned=rnd.uniform(0, 300))
+            db.session.add(a)
+            db.session.flush()
+            record_activity_change(a, 1)
+            db.session.commit()
+            compute_lifestyle_points_for_user_date(u.id, day)
+            if step % 10 == 0:
+                g = rnd.choice(groups)
+                if not join_group(g.id, u.id):
+                    assert leave_group(g.id, u.id)
+
+        assert _stored_group_totals() == _expected_group_totals()
+        counts = defaultdict(int)
+        for m in GroupMembership.query:
+            counts[m.group_id] += 1
+        assert {g.id: g.member_count for g in Group.query} == {g.id: counts[g.id] for g in groups}
+
+        date_to = start + timedelta(days=12)
+        date_from = date_to - timedelta(days=6)
+        rows = group_rows(date_from, date_to)
+        expected = _expected_group_totals()
+        assert [r["total_points"] for r in rows] == sorted((r["total_points"] for r in rows), reverse=True)
+        assert all(r["total_points"] == round(expected.get(("rolling7", date_to, r["group_id"]), 0.0), 2) for r in rows)
+        by_avg = group_rows(date_from, date_to, by="average")
+        assert [r["average_points"] for r in by_avg] == sorted((r["average_points"] for r in by_avg), reverse=True)
+
+        g = groups[0]
+        members = group_member_rows(g.id, date_from, date_to)
+        assert sorted(r["user_id"] for r in members) == sorted(m.user_id for m in GroupMembership.query.filter_by(group_id=g.id))
+        assert round(sum(r["total_points"] for r in members), 1) == round(
+            expected.get(("rolling7", date_to, g.id), 0.0), 1)
+        # a window with no rollup row of its own sums the day rows
+        odd = group_member_rows(g.id, date_to - timedelta(days=8), date_to)
+        assert sorted(r["user_id"] for r in odd) == sorted(r["user_id"] for r in members)
+
+        before = _stored_group_totals()
+        rebuild_group_rollup()
+        db.session.commit()
+        assert _stored_group_totals() == before
+
+
+def test_group_views(app, client):
+    with app.app_context():
+        u = User(email="gv@example.com")
+        db.session.add(u)
+        db.session.commit()
+        uid = u.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    resp = client.post("/groups/", data={"name": "Walkers"})
+    assert resp.status_code == 302
+    with app.app_context():
+        group = Group.query.filter_by(name="Walkers").one()
+        gid = group.id
+        assert group.member_count == 1
+    assert client.get("/groups/?q=walk").status_code == 200
+    assert client.get(f"/groups/{gid}").status_code == 200
+    assert client.get("/groups/board?days=30&by=average").status_code == 200
+    assert client.post(f"/groups/{gid}/leave").status_code == 302
+    assert client.post(f"/groups/{gid}/join").status_code == 302
+    assert client.post(f"/groups/{gid}/join").status_code == 302
+    with app.app_context():
+        assert db.session.get(Group, gid).member_count == 1
+    assert client.get("/groups/999").status_code == 404
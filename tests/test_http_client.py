@@ -0,0 +1,57 @@
+import pytest
+from requests.exceptions import ConnectionError
+from app import http_client
+from app.http_client import CircuitBreaker, CircuitOpenError
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+    def close(self):
+        pass
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    calls = []
+    outcomes = []
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+    monkeypatch.setattr(http_client.get_session(), "request", fake_request)
+    monkeypatch.setattr(http_client, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(http_client, "_breakers", {})
+    monkeypatch.setattr(http_client, "_stats", {})
+    return calls, outcomes
+
+def test_retries_then_succeeds(fake_session):
+    calls, outcomes = fake_session
+    outcomes.extend([ConnectionError("boom"), 503, 200])
+    resp = http_client.get("prov", "https://example.test/a", retries=2)
+    assert resp.status_code == 200
+    assert len(calls) == 3
+    stats = http_client.provider_stats()["prov"]
+    assert stats["retries"] == 2 and stats["errors"] == 2 and stats["circuit"] == "closed"
+
+def test_breaker_opens_and_fails_fast(fake_session, monkeypatch):
+    calls, outcomes = fake_session
+    monkeypatch.setattr(http_client, "_breakers", {"prov": CircuitBreaker(threshold=2, reset_after=60)})
+    monkeypatch.setattr(http_client, "_stats", {"prov": http_client.ProviderStats()})
+    outcomes.extend([ConnectionError("down"), ConnectionError("down")])
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            http_client.get("prov", "https://example.test/a", retries=0)
+    with pytest.raises(CircuitOpenError):
+        http_client.get("prov", "https://example.test/a", retries=0)
+    assert len(calls) == 2
+    assert http_client.provider_stats()["prov"]["rejected"] == 1
+
+def test_half_open_trial_closes_breaker():
+    b = CircuitBreaker(threshold=1, reset_after=0)
+    b.record_failure()
+    assert b.state == "half_open"
+    assert b.allow()
+    assert not b.allow()
+    b.record_success()
+    assert b.state == "closed"
@@ -0,0 +1,356 @@
+import random
+from datetime import date, time, timedelta
+
+from sqlalchemy import event, func
+
+from app.extensions import db
+from app.models import User, Activity, LifestylePoint, LeaderboardRollup, LeaderboardRankBucket
+from app.activities import record_activity_change, compute_lifestyle_points_for_user_date
+from app.leaderboard import (leaderboard_rows, rebuild_leaderboard_rollup, cached_leaderboard, leaderboard_page,
+                             user_rank, recount_rank_buckets)
+
+
+def _raw_totals(date_from, date_to):
+    rows = db.session.query(LifestylePoint.user_id, func.sum(LifestylePoint.points)).filter(
+        LifestylePoint.date >= date_from, LifestylePoint.date <= date_to).group_by(LifestylePoint.user_id)
+    return {uid: round(total, 2) for uid, total in rows}
+
+
+def _seed(rnd, users, start, days):
+    for _ in range(120):
+        u = rnd.choice(users)
+        day = start + timedelta(days=rnd.randrange(days))
+        a = Activity(user_id=u.id, date=day, time=time(7, 0), activity_type="x",
+                     duration_minutes=rnd.uniform(5, 60), calories_burned=rnd.uniform(0, 400))
+        db.session.add(a)
+        db.session.flush()
+        record_activity_change(a, 1)
+        if rnd.random() < 0.2:
+            # deletes move the rollups down as well
+            db.session.delete(a)
+            db.session.flush()
+            record_activity_change(a, -1)
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(u.id, day)
+
+
+def test_rollup_matches_raw_sums_and_rebuild(app):
+    rnd = random.Random(5)
+    start = date(2024, 1, 1)
+    with app.app_context():
+        users = [User(email=f"lb{i}@example.com", full_name=(f"Name {i}" if i % 2 else None)) for i in range(6)]
+        db.session.add_all(users)
+        db.session.commit()
+        _seed(rnd, users, start, 40)
+
+        windows = [(start + timedelta(days=10), 1), (start + timedelta(days=20), 7), (start + timedelta(days=39), 30),
+                   (start + timedelta(days=25), 12), (date(2024, 1, 8), 7)]
+        for date_to, days in windows:
+            date_from = date_to - timedelta(days=days - 1)
+            raw = _raw_totals(date_from, date_to)
+            got = leaderboard_rows(date_from, date_to)
+            assert {r["user_id"]: r["total_points"] for r in got} == {k: v for k, v in raw.items()
+                                                                     if k in {r["user_id"] for r in got}}
+            assert {k for k, v in raw.items() if v} <= {r["user_id"] for r in got}
+            assert [r["total_points"] for r in got] == sorted((r["total_points"] for r in got), reverse=True)
+            names = {u.id: u.display_name() for u in users}
+            assert all(r["display_name"] == names[r["user_id"]] for r in got)
+
+        before = {(r.period, r.anchor_date, r.user_id): round(r.total_points, 6) for r in LeaderboardRollup.query}
+        rebuild_leaderboard_rollup()
+        db.session.commit()
+        after = {(r.period, r.anchor_date, r.user_id): round(r.total_points, 6) for r in LeaderboardRollup.query}
+        assert {k: v for k, v in before.items() if v} == {k: v for k, v in after.items() if v}
+
+
+def test_leaderboard_view_is_one_query(app):
+    with app.app_context():
+        users = [User(email=f"q{i}@example.com") for i in range(30)]
+        db.session.add_all(users)
+        db.session.commit()
+        today = date.today()
+        for u in users:
+            db.session.add(Activity(user_id=u.id, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+        db.session.commit()
+        for u in users:
+            compute_lifestyle_points_for_user_date(u.id, today)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            rows = leaderboard_rows(today - timedelta(days=6), today)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+        assert len(rows) == 30
+        assert len(statements) == 1
+
+
+def _count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return result, statements
+
+
+def test_cached_window_invalidated_by_point_write(app):
+    with app.app_context():
+        u = User(email="cache@example.com")
+        db.session.add(u)
+        db.session.commit()
+        today = date.today()
+        date_from = today - timedelta(days=6)
+
+        first, _ = _count_statements(lambda: cached_leaderboard(date_from, today))
+        again, statements = _count_statements(lambda: cached_leaderboard(date_from, today))
+        assert again == first
+        assert not any("leaderboard_rollup" in s for s in statements)
+
+        # a write outside the window leaves it cached
+        old_day = today - timedelta(days=30)
+        db.session.add(Activity(user_id=u.id, date=old_day, time=time(7, 0), activity_type="x", duration_minutes=30))
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(u.id, old_day)
+        assert cached_leaderboard(date_from, today)["etag"] == first["etag"]
+
+        db.session.add(Activity(user_id=u.id, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(u.id, today)
+        fresh = cached_leaderboard(date_from, today)
+        assert fresh["etag"] != first["etag"]
+        assert [r["user_id"] for r in fresh["rows"]] == [u.id]
+
+
+def test_fill_racing_a_point_write_is_not_cached(app, monkeypatch):
+    from app import leaderboard
+    from app.cache import leaderboard_cache
+    with app.app_context():
+        today = date.today()
+        date_from = today - timedelta(days=6)
+        read_rows = leaderboard.leaderboard_rows
+
+        def rows_then_write(*args, **kwargs):
+            rows = read_rows(*args, **kwargs)
+            leaderboard.invalidate_leaderboard_cache(today)    # a write lands after the rows were read
+            return rows
+
+        monkeypatch.setattr(leaderboard, "leaderboard_rows", rows_then_write)
+        cached_leaderboard(date_from, today)
+        assert leaderboard_cache.lookup(leaderboard._cache_key(date_from, today)) == (False, None)
+
+        monkeypatch.setattr(leaderboard, "leaderboard_rows", read_rows)
+        cached_leaderboard(date_from, today)
+        assert leaderboard_cache.lookup(leaderboard._cache_key(date_from, today))[0]
+
+
+def test_leaderboard_revalidates_with_etag(app, client):
+    with app.app_context():
+        u = User(email="etag@example.com")
+        db.session.add(u)
+        db.session.commit()
+        uid = u.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    first = client.get("/leaderboard/?days=7")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    second = client.get("/leaderboard/?days=7", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert not second.data
+
+    other = client.get("/leaderboard/?days=30", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_etag_changes_with_standing_below_the_top_rows(app, client, monkeypatch):
+    from app import leaderboard
+    from app.utils import upsert
+    from app.leaderboard import apply_points_delta
+
+    read_rows = leaderboard.leaderboard_rows
+    monkeypatch.setattr(leaderboard, "leaderboard_rows", lambda date_from, date_to: read_rows(date_from, date_to, 1))
+    today = date.today()
+
+    def give(user_id, points, delta):
+        upsert(LifestylePoint, {"user_id": user_id, "date": today, "points": points, "reason": ""})
+        apply_points_delta(user_id, today, delta)
+        db.session.commit()
+
+    with app.app_context():
+        leader, viewer = User(email="top@example.com"), User(email="below@example.com")
+        db.session.add_all([leader, viewer])
+        db.session.commit()
+        give(leader.id, 100.0, 100.0)
+        give(viewer.id, 10.0, 10.0)
+        uid = viewer.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    first = client.get("/leaderboard/?days=7")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get("/leaderboard/?days=7", headers={"If-None-Match": etag}).status_code == 304
+
+    # the top row and the cached entry stay the same; only the viewer's own total moves
+    with app.app_context():
+        give(uid, 20.0, 10.0)
+    moved = client.get("/leaderboard/?days=7", headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["ETag"] != etag
+    assert b"20.0" in moved.data
+
+
+def test_rename_and_layout_state_reach_cache_and_etag(app, client):
+    today = date.today()
+    with app.app_context():
+        u = User(email="renamed@example.com", full_name="Old Name")
+        db.session.add(u)
+        db.session.commit()
+        db.session.add(Activity(user_id=u.id, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(u.id, today)
+        uid = u.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    def get(**kwargs):
+        with app.app_context():     # a fresh g per request, as in production
+            return client.get("/leaderboard/?days=7", **kwargs)
+
+    first = get()
+    etag = first.headers["ETag"]
+    assert b"Old Name" in first.data
+
+    with app.app_context():
+        db.session.get(User, uid).full_name = "New Name"
+        db.session.commit()
+        assert cached_leaderboard(today - timedelta(days=6), today)["rows"][0]["display_name"] == "New Name"
+    renamed = get(headers={"If-None-Match": etag})
+    assert renamed.status_code == 200 and b"Old Name" not in renamed.data
+
+    # connecting Google Fit changes the sidebar only
+    etag = renamed.headers["ETag"]
+    assert get(headers={"If-None-Match": etag}).status_code == 304
+    with app.app_context():
+        db.session.get(User, uid).google_tokens = "{}"
+        db.session.commit()
+    assert get(headers={"If-None-Match": etag}).status_code == 200
+
+
+def _brute_ranking(date_from, date_to):
+    totals = _raw_totals(date_from, date_to)
+    return sorted(((round(t, 6), uid) for uid, t in totals.items()), key=lambda x: (-x[0], x[1]))
+
+
+def test_rank_and_pages_match_full_ranking(app):
+    rnd = random.Random(11)
+    start = date(2024, 3, 1)
+    with app.app_context():
+        users = [User(email=f"rk{i}@example.com") for i in range(12)]
+        db.session.add_all(users)
+        db.session.commit()
+        _seed(rnd, users, start, 20)
+        # identical days for two users give tied totals
+        for u in users[:2]:
+            db.session.add(Activity(user_id=u.id, date=start + timedelta(days=30), time=time(7, 0),
+                                    activity_type="x", duration_minutes=45))
+            db.session.commit()
+            compute_lifestyle_points_for_user_date(u.id, start + timedelta(days=30))
+
+        for date_to, days in [(start + timedelta(days=10), 7), (start + timedelta(days=19), 30),
+                              (start + timedelta(days=15), 9), (start + timedelta(days=30), 1)]:
+            date_from = date_to - timedelta(days=days - 1)
+            expected = [uid for _, uid in _brute_ranking(date_from, date_to)]
+            got, cursor = [], None
+            while True:
+                rows, cursor = leaderboard_page(date_from, date_to, cursor, limit=3)
+                got.extend(rows)
+                if cursor is None:
+                    break
+            assert [r["position"] for r in got] == list(range(1, len(got) + 1))
+            # users whose rows net to zero may or may not have a rollup row; order the rest exactly
+            assert [r["user_id"] for r in got if r["total_points"]] == [uid for uid in expected
+                                                                        if _raw_totals(date_from, date_to)[uid]]
+
+            for row in got:
+                standing = user_rank(row["user_id"], date_from, date_to, around=2)
+                assert standing["position"] == row["position"]
+                assert standing["rank"] == 1 + sum(1 for r in got if r["total_points"] > row["total_points"])
+                assert [n["user_id"] for n in standing["neighbors"]] == [
+                    r["user_id"] for r in got[max(0, row["position"] - 3):row["position"] + 2]]
+
+        buckets = {(b.period, b.anchor_date, b.bucket): b.users for b in LeaderboardRankBucket.query if b.users}
+        recount_rank_buckets()
+        db.session.commit()
+        assert buckets == {(b.period, b.anchor_date, b.bucket): b.users for b in LeaderboardRankBucket.query}
+        assert user_rank(10**6, start, start) is None
+
+
+def test_rank_api(app, client):
+    with app.app_context():
+        users = [User(email=f"api{i}@example.com") for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        today = date.today()
+        for i, u in enumerate(users):
+            db.session.add(Activity(user_id=u.id, date=today, time=time(7, 0), activity_type="x",
+                                    duration_minutes=10 + 20 * i))
+        db.session.commit()
+        for u in users:
+            compute_lifestyle_points_for_user_date(u.id, today)
+        uid, other = users[0].id, users[2].id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+    data = client.get("/leaderboard/rank?days=7").get_json()
+    assert (data["user_id"], data["position"]) == (uid, 3)
+    assert [n["user_id"] for n in data["neighbors"]][-1] == uid
+    assert client.get(f"/leaderboard/rank?days=7&user_id={other}").get_json()["position"] == 1
+    assert client.get("/leaderboard/rank?days=7&date_to=2001-01-01").status_code == 404
+    assert client.get("/leaderboard/rank?user_id=abc").status_code == 400
+
+    page = client.get("/leaderboard/page?days=7&limit=2").get_json()
+    assert [r["position"] for r in page["rows"]] == [1, 2]
+    rest = client.get(f"/leaderboard/page?days=7&limit=2&cursor={page['next_cursor']}").get_json()
+    assert [r["user_id"] for r in rest["rows"]] == [uid] and rest["next_cursor"] is None
+    assert client.get("/leaderboard/page?cursor=!!").status_code == 400
+
+
+def test_user_with_only_zero_points_is_on_the_board(app):
+    from app.utils import upsert
+    from app.leaderboard import apply_points_delta
+
+    with app.app_context():
+        scorer, idle = User(email="scorer@example.com"), User(email="zero@example.com")
+        db.session.add_all([scorer, idle])
+        db.session.commit()
+        today = date.today()
+        db.session.add(Activity(user_id=scorer.id, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(scorer.id, today)
+        # a points row of 0, written the way compute_lifestyle_points_for_user_date does
+        upsert(LifestylePoint, {"user_id": idle.id, "date": today, "points": 0.0, "reason": ""})
+        apply_points_delta(idle.id, today, 0.0)
+        db.session.commit()
+
+        date_from = today - timedelta(days=6)
+        members = {uid for uid, in db.session.query(LifestylePoint.user_id).filter(
+            LifestylePoint.date >= date_from, LifestylePoint.date <= today).group_by(LifestylePoint.user_id)}
+        rows = leaderboard_rows(date_from, today)
+        assert {r["user_id"] for r in rows} == members == {scorer.id, idle.id}
+        assert rows[-1]["user_id"] == idle.id and rows[-1]["total_points"] == 0.0
+        standing = user_rank(idle.id, date_from, today)
+        assert standing["position"] == 2 and standing["total_points"] == 0.0
+
+        buckets = {(b.period, b.anchor_date, b.bucket): b.users for b in LeaderboardRankBucket.query if b.users}
+        recount_rank_buckets()
+        db.session.commit()
+        assert buckets == {(b.period, b.anchor_date, b.bucket): b.users for b in LeaderboardRankBucket.query}
@@ -0,0 +1,118 @@
+import random
+import threading
+from datetime import date, time, timedelta
+
+from app.extensions import db
+from app.models import User, Activity, LifestylePoint
+from app.activities import compute_lifestyle_points_for_user_date
+from app.utils import upsert
+from app import leaderboard_engine
+from app.leaderboard_engine import SortedKeys, SlidingWindowBoard
+from app.leaderboard import leaderboard_rows, user_rank
+
+
+def test_sorted_keys_matches_sorted_list():
+    rnd = random.Random(3)
+    keys = SortedKeys(load=4)
+    ref = []
+    for _ in range(2000):
+        if ref and rnd.random() < 0.4:
+            k = rnd.choice(ref)
+            ref.remove(k)
+            keys.remove(k)
+        else:
+            k = (rnd.randrange(50), rnd.randrange(1000))
+            if k in ref:
+                continue
+            ref.append(k)
+            keys.add(k)
+        ref.sort()
+        assert len(keys) == len(ref)
+        probe = (rnd.randrange(50), rnd.randrange(1000))
+        assert keys.index(probe) == sum(1 for x in ref if x < probe)
+        a = rnd.randrange(len(ref) + 1)
+        assert keys.slice(a, a + 7) == ref[a:a + 7]
+
+
+def test_board_matches_brute_force_as_window_slides():
+    rnd = random.Random(8)
+    start = date(2024, 5, 1)
+    board = SlidingWindowBoard(7, start)
+    points = {}
+    for step in range(1500):
+        day = start + timedelta(days=step // 60 + rnd.randrange(-8, 2))
+        uid = rnd.randrange(1, 40)
+        p = float(rnd.randrange(0, 30))
+        board.set_points(uid, day, p)
+        points[(uid, day)] = p
+
+        first = board.first_day
+        totals = {}
+        for (u, d), v in points.items():
+            if first <= d <= board.anchor:
+                totals[u] = totals.get(u, 0.0) + v
+        expected = sorted(totals.items(), key=lambda x: (-x[1], x[0]))
+        assert board.top(10) == expected[:10]
+        if step % 50 == 0:
+            for pos, (u, total) in enumerate(expected, start=1):
+                found = board.rank(u, around=1)
+                assert found["position"] == pos
+                assert found["rank"] == 1 + sum(1 for _, t in expected if t > total)
+                assert [n[1] for n in found["neighbors"]] == [x[0] for x in expected[max(0, pos - 2):pos + 1]]
+    assert board.rank(10**6) is None
+
+
+def test_get_board_builds_in_background(app, monkeypatch):
+    leaderboard_engine.reset_boards()
+    today = date.today()
+    with app.app_context():
+        db.session.add(User(email="bg@example.com"))
+        db.session.commit()
+        upsert(LifestylePoint, {"user_id": 1, "date": today, "points": 5.0})
+        db.session.commit()
+        assert leaderboard_engine.get_board(7, today) is None
+        for _ in range(200):
+            board = leaderboard_engine.get_board(7, today)
+            if board is not None:
+                break
+            threading.Event().wait(0.01)
+        assert board.top(5) == [(1, 5.0)]
+    leaderboard_engine.reset_boards()
+
+
+def test_engine_serves_rolling_window_and_syncs_other_writers(app, monkeypatch):
+    monkeypatch.setattr(leaderboard_engine, "ENGINE_ENABLED", True)
+    monkeypatch.setattr(leaderboard_engine, "ENGINE_SYNC_SECONDS", 0.0)
+    leaderboard_engine.reset_boards()
+    today = date.today()
+    with app.app_context():
+        users = [User(email=f"eng{i}@example.com", full_name=f"Eng {i}") for i in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        for i, u in enumerate(users[:3]):
+            db.session.add(Activity(user_id=u.id, date=today - timedelta(days=i), time=time(7, 0),
+                                    activity_type="x", duration_minutes=15 * (i + 1)))
+            db.session.commit()
+            compute_lifestyle_points_for_user_date(u.id, today - timedelta(days=i))
+        date_from = today - timedelta(days=6)
+        leaderboard_engine.build_board(7, today)
+
+        engine_rows = leaderboard_rows(date_from, today)
+        monkeypatch.setattr(leaderboard_engine, "ENGINE_ENABLED", False)
+        assert engine_rows == leaderboard_rows(date_from, today)
+        monkeypatch.setattr(leaderboard_engine, "ENGINE_ENABLED", True)
+
+        # written in this worker: the signal updates the board
+        db.session.add(Activity(user_id=users[3].id, date=today, time=time(7, 0), activity_type="x",
+                                duration_minutes=90))
+        db.session.commit()
+        compute_lifestyle_points_for_user_date(users[3].id, today)
+        assert leaderboard_rows(date_from, today)[0]["user_id"] == users[3].id
+
+        # written by another worker: picked up by the updated_at poll
+        upsert(LifestylePoint, {"user_id": users[4].id, "date": today - timedelta(days=2), "points": 999.0})
+        db.session.commit()
+        standing = user_rank(users[4].id, date_from, today, around=1)
+        assert (standing["rank"], standing["total_points"]) == (1, 999.0)
+        assert [n["display_name"] for n in standing["neighbors"]] == ["Eng 4", "Eng 3"]
+    leaderboard_engine.reset_boards()
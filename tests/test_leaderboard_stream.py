@@ -0,0 +1,91 @@
+import json
+from datetime import date, time
+
+from app.extensions import db
+from app.models import User, Activity
+from app.activities import compute_lifestyle_points_for_user_date
+from app import leaderboard_stream
+from app.leaderboard_stream import WindowFeed
+
+
+def _events(chunks):
+    """Parse SSE chunks into (event, data) pairs, skipping comments and retry lines."""
+    out = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n") if ": " in line)
+        if "event" in fields:
+            out.append((fields["event"], json.loads(fields["data"])))
+    return out
+
+
+def test_window_feed_publishes_only_differences():
+    rows = [{"user_id": 1, "position": 1, "display_name": "a", "total_points": 5.0},
+            {"user_id": 2, "position": 2, "display_name": "b", "total_points": 3.0}]
+    w = WindowFeed(date(2024, 1, 1), date(2024, 1, 7), {"etag": "e1", "rows": rows})
+    assert w.publish({"etag": "e1", "rows": rows}) is None
+    new_rows = [{"user_id": 2, "position": 1, "display_name": "b", "total_points": 9.0},
+                {"user_id": 1, "position": 2, "display_name": "a", "total_points": 5.0},
+                {"user_id": 3, "position": 3, "display_name": "c", "total_points": 1.0}]
+    delta = w.publish({"etag": "e2", "rows": new_rows})
+    assert [r["user_id"] for r in delta["changed"]] == [2, 1, 3]
+    assert delta["removed"] == [] and delta["size"] == 3 and w.seq == 1
+    delta = w.publish({"etag": "e3", "rows": new_rows[:1]})
+    assert delta["changed"] == [] and delta["removed"] == [1, 3]
+
+
+def test_stream_sends_snapshot_then_coalesced_delta(app, client, monkeypatch):
+    monkeypatch.setattr(leaderboard_stream, "STREAM_COALESCE_SECONDS", 0.05)
+    monkeypatch.setattr(leaderboard_stream, "STREAM_HEARTBEAT_SECONDS", 5.0)
+    with app.app_context():
+        users = [User(email=f"sse{i}@example.com") for i in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        uids = [u.id for u in users]
+    with client.session_transaction() as sess:
+        sess["user_id"] = uids[0]
+
+    resp = client.get("/leaderboard/stream?days=7", buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    body = iter(resp.response)
+    assert next(body).startswith(b"retry:")
+    (event, snapshot), = _events([next(body)])
+    assert event == "snapshot" and snapshot["rows"] == []
+    feed = leaderboard_stream.get_feed(app)
+    assert feed.stats() == {"subscribers": 1, "windows": 1}
+
+    # a burst of writes goes out as a single delta
+    today = date.today()
+    with app.app_context():
+        for uid in uids:
+            db.session.add(Activity(user_id=uid, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+            db.session.commit()
+            compute_lifestyle_points_for_user_date(uid, today)
+    (event, delta), = _events([next(body)])
+    assert event == "delta"
+    assert sorted(r["user_id"] for r in delta["changed"]) == sorted(uids) and delta["size"] == 2
+
+    resp.close()
+    assert feed.stats() == {"subscribers": 0, "windows": 0}
+
+    # reconnecting with the current state skips the snapshot
+    monkeypatch.setattr(leaderboard_stream, "STREAM_HEARTBEAT_SECONDS", 0.05)
+    resp = client.get("/leaderboard/stream?days=7", buffered=False, headers={"Last-Event-ID": delta["etag"]})
+    body = iter(resp.response)
+    assert next(body).startswith(b"retry:")
+    assert next(body) == b": keepalive\n\n"
+    resp.close()
+
+
+def test_stream_refuses_past_subscriber_limit(app, client, monkeypatch):
+    monkeypatch.setattr(leaderboard_stream, "STREAM_MAX_SUBSCRIBERS", 0)
+    with app.app_context():
+        u = User(email="full@example.com")
+        db.session.add(u)
+        db.session.commit()
+        uid = u.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+    resp = client.get("/leaderboard/stream")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "30"
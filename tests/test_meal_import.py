@@ -0,0 +1,64 @@
+import io
+from app import meal_import
+from app.cache import SQLiteCache
+from app.extensions import db
+from app.models import User, Meal, LifestylePoint
+
+CSV = """name,date,time,calories
+1 banana,2025-01-01,08:00,
+2 eggs,2025-01-01,09:00,
+1 Banana,2025-01-02,08:00,
+toast,2025-01-02,,80
+,2025-01-02,,
+"""
+
+def test_import_dedupes_and_batches(app, monkeypatch, tmp_path):
+    batches = []
+    def fake_batch(names):
+        batches.append(list(names))
+        return [{"kcal": 100.0 + i, "protein_g": 1.0, "carbs_g": 2.0, "fat_g": 3.0} for i, _ in enumerate(names)]
+    monkeypatch.setattr(meal_import, "_query_calorieninjas_batch", fake_batch)
+    monkeypatch.setattr(meal_import, "lookup_nutrition_text", lambda text: None)
+    monkeypatch.setattr(meal_import, "nutrition_cache", SQLiteCache(str(tmp_path / "c.sqlite3"), "n", 60, 100))
+    with app.app_context():
+        u = User(email="importer@example.com", password_hash="x")
+        db.session.add(u)
+        db.session.commit()
+        rows = meal_import.iter_import_rows(io.StringIO(CSV), "csv")
+        summary = meal_import.import_meals(u.id, rows, chunk_size=2)
+
+        assert summary["rows"] == 5 and summary["inserted"] == 4
+        assert len(summary["errors"]) == 1
+        assert batches == [["1 banana", "2 eggs"]]
+        assert summary["days_rescored"] == 2
+        kcal = {m.name: m.calories for m in Meal.query.filter_by(user_id=u.id)}
+        assert kcal == {"1 banana": 100.0, "2 eggs": 101.0, "1 Banana": 100.0, "toast": 80.0}
+        assert LifestylePoint.query.filter_by(user_id=u.id).count() == 2
+
+def test_ndjson_rows():
+    stream = io.StringIO('{"name": "dal", "date": "2025-01-01"}\n\nnot json\n')
+    rows = list(meal_import.iter_import_rows(stream, "ndjson"))
+    assert rows[0]["name"] == "dal"
+    assert "_error" in rows[1]
+
+def test_batch_items_must_name_their_food_exactly(monkeypatch):
+    class FakeResponse:
+        def __init__(self, items):
+            self.items = items
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {"items": self.items}
+
+    responses = []
+    monkeypatch.setenv("CALORIE_NINJAS_KEY", "test")
+    monkeypatch.setattr(meal_import.http_client, "get", lambda *a, **kw: FakeResponse(responses.pop(0)))
+    names = ["1 banana", "100g rice"]
+
+    responses.append([{"name": "banana", "calories": 105}, {"name": "Rice", "calories": 130}])
+    assert [r["kcal"] for r in meal_import._query_calorieninjas_batch(names)] == [105.0, 130.0]
+    # a missing name, or one that is only part of the food, can't be mapped back
+    responses.append([{"calories": 105}, {"name": "rice", "calories": 130}])
+    assert meal_import._query_calorieninjas_batch(names) is None
+    responses.append([{"name": "ban", "calories": 105}, {"name": "rice", "calories": 130}])
+    assert meal_import._query_calorieninjas_batch(names) is None
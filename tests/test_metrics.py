@@ -0,0 +1,102 @@
+import multiprocessing
+
+from app import metrics, http_client
+from app.metrics import Histogram, REQUEST_LATENCY, IN_FLIGHT, OUTBOUND_LATENCY
+
+
+def _sample(text, line_start):
+    found = [line for line in text.splitlines() if line.startswith(line_start)]
+    assert len(found) == 1, (line_start, found)
+    return float(found[0].rsplit(" ", 1)[1])
+
+
+def test_metrics_endpoint_reports_request_latency(client):
+    client.get("/")
+    client.get("/")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = resp.get_data(as_text=True)
+    assert "# TYPE fitgenix_http_request_duration_seconds histogram" in text
+    base = 'fitgenix_http_request_duration_seconds_bucket{endpoint="index",method="GET",le='
+    assert _sample(text, base + '"+Inf"}') >= 2
+    assert _sample(text, base + '"10"}') == _sample(text, base + '"+Inf"}')
+    assert _sample(text, 'fitgenix_http_requests_total{endpoint="index",method="GET",status="200"}') >= 2
+    # the scrape itself is still in flight
+    assert _sample(text, 'fitgenix_http_requests_in_flight{endpoint="metrics"}') == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("fitgenix_test_seconds", "test", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        h.observe(value, kind="a")
+    text = metrics.render()
+    assert 'fitgenix_test_seconds_bucket{kind="a",le="0.1"} 2' in text
+    assert 'fitgenix_test_seconds_bucket{kind="a",le="1"} 3' in text
+    assert 'fitgenix_test_seconds_bucket{kind="a",le="+Inf"} 4' in text
+    assert 'fitgenix_test_seconds_count{kind="a"} 4' in text
+    assert _sample(text, 'fitgenix_test_seconds_sum{kind="a"}') == 3.65
+    metrics._registry.pop("fitgenix_test_seconds")
+
+
+def test_non_finite_values_render():
+    g = metrics.Gauge("fitgenix_test_limit", "test", ("kind",))
+    g.set(float("inf"), kind="up")
+    g.set(float("-inf"), kind="down")
+    g.set(float("nan"), kind="unknown")
+    h = Histogram("fitgenix_test_wait_seconds", "test", buckets=(1.0,))
+    h.observe(float("inf"))
+    try:
+        text = metrics.render()
+    finally:
+        metrics._registry.pop("fitgenix_test_limit")
+        metrics._registry.pop("fitgenix_test_wait_seconds")
+    assert 'fitgenix_test_limit{kind="up"} +Inf' in text
+    assert 'fitgenix_test_limit{kind="down"} -Inf' in text
+    assert 'fitgenix_test_limit{kind="unknown"} NaN' in text
+    assert "fitgenix_test_wait_seconds_sum +Inf" in text
+
+
+def _worker(ready):
+    # a forked worker starts from zero, whatever the parent recorded
+    REQUEST_LATENCY.observe(0.2, endpoint="meals.index", method="GET")
+    REQUEST_LATENCY.observe(0.3, endpoint="meals.index", method="GET")
+    IN_FLIGHT.inc(endpoint="meals.index")
+    metrics.flush()
+    ready.set()
+
+
+def test_samples_add_up_across_worker_processes():
+    before = metrics.collect()["fitgenix_http_request_duration_seconds"].get(("meals.index", "GET"))
+    before_count = sum(before[:-1]) if before else 0
+    REQUEST_LATENCY.observe(0.1, endpoint="meals.index", method="GET")
+    IN_FLIGHT.inc(endpoint="meals.index")
+    ctx = multiprocessing.get_context("fork")
+    ready = ctx.Event()
+    proc = ctx.Process(target=_worker, args=(ready,))
+    proc.start()
+    assert ready.wait(10)
+    proc.join(10)
+
+    merged = metrics.collect()
+    counts = merged["fitgenix_http_request_duration_seconds"][("meals.index", "GET")]
+    assert sum(counts[:-1]) == before_count + 3
+    # the exited worker's counts stay; its gauge doesn't
+    assert merged["fitgenix_http_requests_in_flight"][("meals.index",)] == 1
+    IN_FLIGHT.dec(endpoint="meals.index")
+
+
+class _Response:
+    status_code = 200
+
+    def close(self):
+        pass
+
+
+def test_outbound_calls_are_timed(monkeypatch):
+    monkeypatch.setattr(http_client.get_session(), "request", lambda method, url, **kw: _Response())
+    key = ("calorieninjas", "ok")
+    before = OUTBOUND_LATENCY._values.get(key, [0] * 13)
+    http_client.get("calorieninjas", "https://example.test/v1/nutrition")
+    after = OUTBOUND_LATENCY._values[key]
+    assert sum(after[:-1]) == sum(before[:-1]) + 1
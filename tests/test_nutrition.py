@@ -9,3 +9,183 @@ def test_compute_targets_basic():
     assert bmr > 1000
     assert targets["tdee"] > bmr
     assert targets["protein_g"] > 0
+
+def test_hedged_lookup_returns_first_answer_within_deadline(monkeypatch):
+    import time
+    from app import nutrition
+    def slow(text):
+        time.sleep(0.5)
+        return {"kcal": 1.0, "source": "slow"}
+    def fast(text):
+        return {"kcal": 105.0, "source": "fast"}
+    monkeypatch.setattr(nutrition, "lookup_local_food", lambda text: None)
+    monkeypatch.setattr(nutrition, "_remote_providers", lambda: [("slow", slow), ("fast", fast)])
+    t0 = time.monotonic()
+    result, definitive = nutrition._lookup_nutrition_hedged("1 banana", deadline=2.0)
+    assert result["source"] == "fast" and definitive
+    assert time.monotonic() - t0 < 0.4
+
+    monkeypatch.setattr(nutrition, "_remote_providers", lambda: [("slow", slow)])
+    t0 = time.monotonic()
+    result, definitive = nutrition._lookup_nutrition_hedged("1 banana", deadline=0.1)
+    assert result is None and not definitive
+    assert time.monotonic() - t0 < 0.4
+
+def _sample_users():
+    import random
+    from datetime import date as _date
+    rnd = random.Random(3)
+    users = []
+    for i in range(200):
+        users.append(User(
+            weight_kg=rnd.choice([None, 0, rnd.uniform(40, 150)]),
+            height_cm=rnd.choice([None, rnd.uniform(140, 200)]),
+            birth_date=rnd.choice([None, _date(rnd.randint(1950, 2005), 1, 1)]),
+            sex=rnd.choice(["male", "female", "other", None]),
+            activity_multiplier=rnd.choice([None, 1.2, 1.55, 1.9]),
+            activity_level=rnd.choice([None, "light", "very_active"]),
+        ))
+    return users
+
+def test_batch_targets_match_scalar_formula(monkeypatch):
+    from app import nutrition
+    monkeypatch.setattr(nutrition, "load_target_model", lambda: None)
+    users = _sample_users()
+    batch = nutrition.predict_targets_batch(users, chunk_size=64)
+    scalar = [compute_daily_targets(u)["target"] for u in users]
+    assert list(batch) == scalar
+
+def test_batch_targets_use_model_in_chunks(monkeypatch):
+    import numpy as np
+    from app import nutrition
+    calls = []
+    class FakeModel:
+        def predict(self, X):
+            X = np.asarray(X, dtype=float)
+            calls.append(len(X))
+            return X[:, 3] * 30.0 - (X[:, 0] > 60) * 10000.0
+    monkeypatch.setattr(nutrition, "load_target_model", lambda: FakeModel())
+    users = _sample_users()
+    batch = nutrition.predict_targets_batch(users, chunk_size=64)
+    assert calls == [64, 64, 64, 8]
+    for u, got in zip(users, batch):
+        pred = nutrition.predict_target_from_model(u)
+        if pred > 0:
+            assert got == pred
+        else:
+            monkeypatch.setattr(nutrition, "load_target_model", lambda: None)
+            assert got == compute_daily_targets(u)["target"]
+            monkeypatch.setattr(nutrition, "load_target_model", lambda: FakeModel())
+
+def test_model_hot_reload_swaps_versions(tmp_path, monkeypatch):
+    import os
+    import pickle
+    from app import nutrition
+    path = tmp_path / "model.pkl"
+    path.write_bytes(pickle.dumps({"model": "v1"}))
+    monkeypatch.setattr(nutrition, "MODEL_PATH", str(path))
+    monkeypatch.setattr(nutrition, "MODEL_URL", None)
+    monkeypatch.setattr(nutrition, "MODEL_RELOAD_INTERVAL", 0.0001)
+    monkeypatch.setattr(nutrition, "_model_current", None)
+    monkeypatch.setattr(nutrition, "_model_attempted", False)
+
+    assert nutrition.load_target_model() == "v1"
+    assert nutrition.model_status()["version"] == 1
+
+    # a truncated write is ignored; the old version keeps serving
+    path.write_bytes(b"\x80\x04garbage")
+    os.utime(path, ns=(1, 1))
+    assert nutrition.load_target_model() == "v1"
+
+    path.write_bytes(pickle.dumps({"model": "v2"}))
+    os.utime(path, ns=(2, 2))
+    assert nutrition.load_target_model() == "v2"
+    status = nutrition.model_status()
+    assert status["ready"] and status["version"] == 2
+
+def test_target_memo_misses_after_model_reload(tmp_path, monkeypatch):
+    import os
+    import pickle
+    from app import nutrition
+    path = tmp_path / "model.pkl"
+    path.write_bytes(pickle.dumps({"model": "v1"}))
+    monkeypatch.setattr(nutrition, "MODEL_PATH", str(path))
+    monkeypatch.setattr(nutrition, "MODEL_URL", None)
+    monkeypatch.setattr(nutrition, "MODEL_RELOAD_INTERVAL", 0.0001)
+    monkeypatch.setattr(nutrition, "_model_current", None)
+    monkeypatch.setattr(nutrition, "_model_attempted", False)
+    monkeypatch.setattr(nutrition, "predict_target_from_model",
+                        lambda u: {"v1": 2000.0, "v2": 2200.0}[nutrition.load_target_model()])
+    u = User(weight_kg=70, height_cm=175, birth_date=date(1990, 6, 1), sex="male", activity_multiplier=1.2)
+
+    assert compute_daily_targets(u)["target"] == 2000.0
+    before = nutrition.target_memo_stats()
+    assert compute_daily_targets(u)["target"] == 2000.0
+    assert nutrition.target_memo_stats()["hits"] == before["hits"] + 1
+
+    path.write_bytes(pickle.dumps({"model": "v2"}))
+    os.utime(path, ns=(2, 2))
+    assert compute_daily_targets(u)["target"] == 2200.0
+    assert nutrition.target_memo_stats()["misses"] == before["misses"] + 1
+
+def test_readiness_endpoint(client):
+    resp = client.get("/healthz/ready")
+    assert resp.status_code == 200
+    assert resp.get_json()["model"]["pid"]
+
+def test_targets_memoized_on_feature_tuple(monkeypatch):
+    from app import nutrition
+    calls = []
+    monkeypatch.setattr(nutrition, "predict_target_from_model", lambda u: calls.append(1) or 2100.0)
+    u = User(weight_kg=70, height_cm=175, birth_date=date(1990, 6, 1), sex="male", activity_multiplier=1.2)
+    before = nutrition.target_memo_stats()
+
+    assert compute_daily_targets(u)["target"] == 2100.0
+    assert compute_daily_targets(u)["target"] == 2100.0
+    assert len(calls) == 1 and u.target_key == nutrition.target_features_key(u)
+
+    u.weight_kg = 72
+    compute_daily_targets(u)
+    assert len(calls) == 2
+
+    # the age feature rolls over with the year, which changes the key
+    class NextYear(date):
+        @classmethod
+        def today(cls):
+            return date(date.today().year + 1, 1, 2)
+    monkeypatch.setattr(nutrition, "date", NextYear)
+    compute_daily_targets(u)
+    assert len(calls) == 3
+
+    nutrition.invalidate_daily_targets(u)
+    compute_daily_targets(u)
+    after = nutrition.target_memo_stats()
+    assert len(calls) == 4
+    assert after["hits"] - before["hits"] == 1 and after["misses"] - before["misses"] == 4
+
+def test_lifestyle_points_batch_matches_scalar():
+    import math
+    import random
+    import numpy as np
+    from app.nutrition import compute_lifestyle_points, compute_lifestyle_points_batch, _round_like_python
+    rnd = random.Random(11)
+    specials = [None, 0, 0.0, -0.0, float("nan"), float("inf"), -float("inf"), -5.0]
+
+    def draw(low, high, edges):
+        r = rnd.random()
+        if r < 0.15:
+            return rnd.choice(specials)
+        if r < 0.35:
+            return rnd.choice(edges)
+        return rnd.uniform(low, high) if rnd.random() < 0.8 else float(rnd.randint(int(low), int(high)))
+
+    rows = [(draw(-100, 900, [400, 399.999]), draw(0, 12, [4.0, 7.5, 9.5]), draw(0, 8, [0.5, 3.5, 6.0]),
+             draw(0, 4000, [1200, 2000]), draw(-10, 3500, [2000, 1]), draw(30, 120, [40, 64, 86]))
+            for _ in range(20000)]
+    batch = compute_lifestyle_points_batch(*zip(*rows))
+    for row, got in zip(rows, batch.tolist()):
+        want = compute_lifestyle_points(*row)
+        assert (math.isnan(want) and math.isnan(got)) or want == got, (row, want, got)
+
+    ties = np.array([0.125, 2.675, 1.005, 12.345, 99.995, -0.125, 50.0049999])
+    assert _round_like_python(ties, 2).tolist() == [round(float(v), 2) for v in ties]
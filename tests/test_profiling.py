@@ -0,0 +1,82 @@
+import os
+import pstats
+
+import pytest
+
+from app.extensions import db
+from app.models import User
+from app.profiling import RequestProfiler, make_token, rotate
+
+
+@pytest.fixture
+def profiled_app(app, tmp_path):
+    app.config.update(PROFILE_REQUESTS=True, PROFILE_DIR=str(tmp_path), ADMIN_EMAILS="boss@example.com")
+    app.wsgi_app = RequestProfiler(app.wsgi_app, app, str(tmp_path), sample_rate=0.0)
+    with app.app_context():
+        db.session.add_all([User(email="boss@example.com"), User(email="pleb@example.com")])
+        db.session.commit()
+    return app
+
+
+def _login(client, email):
+    with client.application.app_context():
+        uid = User.query.filter_by(email=email).first().id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+
+
+def test_off_by_default_leaves_the_app_untouched(app):
+    assert not isinstance(app.wsgi_app, RequestProfiler)
+
+
+def test_signed_header_profiles_the_request(profiled_app, client, tmp_path):
+    assert "X-Profile-File" not in client.get("/").headers
+    assert "X-Profile-File" not in client.get("/", headers={"X-Profile": "forged"}).headers
+    assert os.listdir(tmp_path) == []
+
+    _login(client, "boss@example.com")
+    token = client.post("/admin/profiles/token").get_json()["token"]
+    resp = client.get("/leaderboard/", headers={"X-Profile": token})
+    assert resp.status_code == 200 and b"Leaderboard" in resp.data
+    name = resp.headers["X-Profile-File"]
+    assert "leaderboard" in name
+    assert pstats.Stats(str(tmp_path / name)).total_calls > 0
+
+    listing = client.get("/admin/profiles/").get_json()
+    assert [p["name"] for p in listing["profiles"]] == [name]
+    text = client.get(f"/admin/profiles/{name}?format=text").get_data(as_text=True)
+    assert "cumulative" in text
+    assert client.get(f"/admin/profiles/{name}").data == (tmp_path / name).read_bytes()
+    assert client.get("/admin/profiles/..%2Fsecret.prof").status_code == 404
+
+
+def test_admin_endpoints_need_an_admin(profiled_app, client):
+    assert client.get("/admin/profiles/").status_code == 302
+    _login(client, "pleb@example.com")
+    assert client.get("/admin/profiles/").status_code == 403
+    assert client.post("/admin/profiles/token").status_code == 403
+
+
+def test_rotation_keeps_the_newest_within_caps(tmp_path):
+    for i in range(5):
+        (tmp_path / f"2024010{i}-GET-x-1ms-1.prof").write_bytes(b"x" * 100)
+    rotate(str(tmp_path), max_files=3, max_bytes=10_000)
+    assert sorted(os.listdir(tmp_path)) == [f"2024010{i}-GET-x-1ms-1.prof" for i in (2, 3, 4)]
+    rotate(str(tmp_path), max_files=3, max_bytes=150)
+    assert os.listdir(tmp_path) == ["20240104-GET-x-1ms-1.prof"]
+
+
+def test_event_stream_passes_through_unprofiled(profiled_app, client, tmp_path, monkeypatch):
+    from app import leaderboard_stream
+    # a buffered stream would come back whole, profiled, after this
+    monkeypatch.setattr(leaderboard_stream, "STREAM_MAX_SECONDS", 0.5)
+    _login(client, "boss@example.com")
+    token = client.post("/admin/profiles/token").get_json()["token"]
+    stream = client.get("/leaderboard/stream?days=7", buffered=False, headers={"X-Profile": token})
+    assert stream.mimetype == "text/event-stream" and "X-Profile-File" not in stream.headers
+    assert next(iter(stream.response)).startswith(b"retry:")
+
+    # the stream is still open and the worker can profile other requests
+    resp = client.get("/leaderboard/", headers={"X-Profile": token})
+    assert os.listdir(tmp_path) == [resp.headers["X-Profile-File"]]
+    stream.close()
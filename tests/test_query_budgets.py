@@ -0,0 +1,77 @@
+from datetime import date, time
+
+import pytest
+
+from app.extensions import db
+from app.models import User, Activity, Meal, Group
+from app.activities import compute_lifestyle_points_for_user_date
+from app.groups import join_group
+from app.instrumentation import capture_requests, endpoint_metrics, reset_metrics
+
+
+@pytest.fixture
+def populated(app, client):
+    """Twenty users with an activity, a meal and points today, all in one group; logged in as the first."""
+    with app.app_context():
+        users = [User(email=f"budget{i}@example.com", full_name=f"Budget {i}") for i in range(20)]
+        db.session.add_all(users)
+        db.session.commit()
+        group = Group(name="Budget", created_by=users[0].id)
+        db.session.add(group)
+        today = date.today()
+        for u in users:
+            db.session.add(Activity(user_id=u.id, date=today, time=time(7, 0), activity_type="x", duration_minutes=30))
+            db.session.add(Meal(user_id=u.id, date=today, time=time(8, 0), name="egg", calories=100))
+        db.session.commit()
+        for u in users:
+            join_group(group.id, u.id)
+            db.session.commit()
+            compute_lifestyle_points_for_user_date(u.id, today)
+        uid, gid = users[0].id, group.id
+    with client.session_transaction() as sess:
+        sess["user_id"] = uid
+    return {"user_id": uid, "group_id": gid}
+
+
+# statement budgets for each view, with twenty users on the board; none may grow with the user count
+@pytest.mark.parametrize("url,queries", [
+    ("/meals/", 3),
+    ("/activities/", 4),
+    ("/leaderboard/?days=7", 2),
+    ("/leaderboard/rank?days=7", 5),
+    ("/leaderboard/page?days=7", 2),
+    ("/groups/", 4),
+    ("/groups/board", 3),
+    ("/groups/{group_id}", 4),
+    ("/profile/profile", 1),
+    ("/", 1),
+])
+def test_view_query_budgets(populated, query_budget, url, queries):
+    url = url.format(**populated)
+    if url == "/meals/":
+        # the first visit computes and stores the day's targets
+        query_budget(url, queries=6, commits=1)
+    resp = query_budget(url, queries=queries)
+    assert resp.status_code in (200, 302)
+
+
+def test_add_activity_budget(populated, query_budget):
+    resp = query_budget("/activities/add", queries=14, commits=3, method="post",
+                        data={"activity_type": "run", "duration_minutes": "10"})
+    assert resp.status_code == 302
+
+
+def test_stats_header_and_endpoint_registry(app, client, populated, monkeypatch):
+    reset_metrics()
+    assert "X-DB-Stats" not in client.get("/activities/").headers
+    monkeypatch.setattr(app, "debug", True)
+    with app.app_context(), capture_requests() as captured:
+        header = client.get("/activities/").headers["X-DB-Stats"]
+    (endpoint, stats), = captured
+    assert endpoint == "activities.index"
+    assert header.startswith(f"queries={stats.queries}; db_ms=")
+    assert stats.slowest_statement.startswith("SELECT")
+
+    metrics = endpoint_metrics()["activities.index"]
+    assert metrics["requests"] == 2 and metrics["max_queries"] == stats.queries
+    assert metrics["commits"] == 0 and metrics["db_seconds"] > 0
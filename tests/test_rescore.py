@@ -0,0 +1,39 @@
+import random
+from datetime import date, time, timedelta
+
+from app.extensions import db
+from app.models import User, Activity, FitnessData, LifestylePoint
+from app.activities import compute_lifestyle_points_for_user_date
+from scripts.rescore_lifestyle_points import rescore
+
+
+def test_bulk_rescore_matches_per_day_compute(app, tmp_path):
+    rnd = random.Random(7)
+    start = date(2024, 3, 1)
+    with app.app_context():
+        users = [User(email=f"r{i}@example.com") for i in range(7)]
+        db.session.add_all(users)
+        db.session.commit()
+        for u in users:
+            for d in range(5):
+                day = start + timedelta(days=d)
+                for _ in range(rnd.randint(0, 3)):
+                    db.session.add(Activity(user_id=u.id, date=day, time=time(9, 0), activity_type="x",
+                                            duration_minutes=rnd.choice([None, rnd.uniform(5, 90)]),
+                                            calories_burned=rnd.choice([None, rnd.uniform(10, 600)])))
+                if rnd.random() < 0.6:
+                    db.session.add(FitnessData(user_id=u.id, date=day, calories_burned=rnd.uniform(0, 2500),
+                                               avg_bpm=rnd.choice([None, rnd.uniform(50, 130)]),
+                                               sleep_hours=rnd.choice([None, rnd.uniform(4, 11)])))
+        # a stale row for a day with no source data must be zeroed
+        db.session.add(LifestylePoint(user_id=users[0].id, date=start + timedelta(days=9), points=50.0, reason="old"))
+        db.session.commit()
+
+        checkpoint = str(tmp_path / "cp.json")
+        rescore(start, start + timedelta(days=9), chunk_users=3, checkpoint=checkpoint)
+        bulk = {(lp.user_id, lp.date): (lp.points, lp.reason) for lp in LifestylePoint.query}
+        assert bulk[(users[0].id, start + timedelta(days=9))] == (0.0, None)
+
+        for (uid, day), (points, reason) in bulk.items():
+            assert compute_lifestyle_points_for_user_date(uid, day) == points
+            assert LifestylePoint.query.filter_by(user_id=uid, date=day).one().reason == reason
@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+from app.extensions import db, bcrypt
+from app.models import User
+from app.sessions import encode_session, decode_session, SQLiteSessionStore
+
+
+def test_session_encoding_round_trips_and_compresses():
+    small = {"user_id": 7}
+    assert encode_session(small)[:1] == b"j"
+    assert decode_session(encode_session(small)) == small
+
+    big = {"google_oauth_credentials": {"token": "t" * 600, "scopes": ["a", "b"]},
+           "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "raw": b"\x00\x01", "pair": (1, 2)}
+    blob = encode_session(big)
+    assert blob[:1] == b"z" and len(blob) < 200
+    assert decode_session(blob) == big
+
+
+def _cookie(client, app):
+    cookie = client.get_cookie(app.config.get("SESSION_COOKIE_NAME", "session"))
+    return cookie.value if cookie else None
+
+
+def test_login_keeps_only_a_signed_id_in_the_cookie(app, client, monkeypatch):
+    store = app.session_interface.store
+    with app.app_context():
+        db.session.add(User(email="sess@example.com", password_hash=bcrypt.generate_password_hash("pw").decode()))
+        db.session.commit()
+
+    with client.session_transaction() as sess:
+        sess["google_oauth_state"] = "s" * 500
+    planted = _cookie(client, app)
+
+    resp = client.post("/login", json={"email": "sess@example.com", "password": "pw"})
+    assert resp.status_code == 200
+    cookie = _cookie(client, app)
+    # a new id on login, and the pre-login one is gone from the store
+    assert cookie != planted and len(cookie) < 80
+    assert store.load(planted.rsplit(".", 1)[0]) is None
+    with client.session_transaction() as sess:
+        assert sess["user_id"] and len(sess["google_oauth_state"]) == 500
+
+    # an unchanged session is neither written nor re-sent
+    writes = []
+    monkeypatch.setattr(SQLiteSessionStore, "save", lambda self, *a: writes.append(a))
+    resp = client.get("/leaderboard/")
+    assert resp.status_code == 200
+    assert writes == [] and "Set-Cookie" not in resp.headers
+    monkeypatch.undo()
+
+    # a forged id starts an anonymous session
+    client.set_cookie(app.config.get("SESSION_COOKIE_NAME", "session"), cookie[:-2] + "xx")
+    assert client.get("/leaderboard/").status_code == 302
+    client.set_cookie(app.config.get("SESSION_COOKIE_NAME", "session"), cookie)
+
+    # logging out drops everything, under a new id
+    client.get("/logout")
+    assert store.load(cookie.rsplit(".", 1)[0]) is None
+    with client.session_transaction() as sess:
+        assert "user_id" not in sess and "google_oauth_state" not in sess
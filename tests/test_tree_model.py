@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from app.nutrition import TreeEnsemble, FEATURE_NAMES
+
+def _data(n=2000, seed=0):
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "age": rng.integers(18, 70, n), "sex": rng.integers(0, 2, n),
+        "height_cm": rng.normal(165, 10, n), "weight_kg": rng.normal(70, 15, n),
+        "activity": rng.choice([1.2, 1.375, 1.55, 1.725, 1.9], n), "goal": rng.choice([-1, 0, 1], n),
+    })[list(FEATURE_NAMES)]
+    bmr = 10 * X.weight_kg + 6.25 * X.height_cm - 5 * X.age + np.where(X.sex == 1, 5, -161)
+    y = bmr * X.activity + 300 * X.goal + rng.normal(0, 120, n)
+    return X, y
+
+def _roundtrip(model, tmp_path):
+    path = str(tmp_path / "model.npz")
+    TreeEnsemble.from_model(model).save(path)
+    return TreeEnsemble.load(path)
+
+def test_sklearn_gbr_matches(tmp_path):
+    ensemble_mod = pytest.importorskip("sklearn.ensemble")
+    X, y = _data()
+    model = ensemble_mod.GradientBoostingRegressor(n_estimators=40, max_depth=4, learning_rate=0.1).fit(X, y)
+    flat = _roundtrip(model, tmp_path)
+    Xt, _ = _data(500, seed=1)
+    np.testing.assert_allclose(flat.predict(Xt.values), model.predict(Xt), rtol=0, atol=1e-6)
+
+def test_xgboost_matches(tmp_path):
+    xgb = pytest.importorskip("xgboost")
+    X, y = _data()
+    model = xgb.XGBRegressor(n_estimators=40, max_depth=5, learning_rate=0.1, verbosity=0).fit(X, y)
+    flat = _roundtrip(model, tmp_path)
+    Xt, _ = _data(500, seed=1)
+    Xt.iloc[::7, 2] = np.nan
+    np.testing.assert_allclose(flat.predict(Xt.values), model.predict(Xt), rtol=0, atol=1e-6)